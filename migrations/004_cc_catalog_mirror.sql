@@ -0,0 +1,21 @@
+-- =============================================================================
+-- TidolCore — Espejo local del catálogo CC/PD (MariaDB). Idempotente.
+-- =============================================================================
+
+-- cc_catalog: metadatos de ítems de colecciones legales (Internet Archive) con
+-- el mejor stream precalculado. Lo rellena el rastreador de fondo y el
+-- write-through de ArchiveProvider; búsqueda y resolve leen de aquí antes de
+-- salir a advancedsearch.php / metadata API.
+CREATE TABLE IF NOT EXISTS cc_catalog (
+    source          VARCHAR(20)  NOT NULL,
+    item_id         VARCHAR(255) NOT NULL,
+    title           VARCHAR(500) NOT NULL,
+    artist          VARCHAR(255) NOT NULL,
+    best_stream_url TEXT         DEFAULT NULL,
+    license_url     TEXT         DEFAULT NULL,
+    popularity      BIGINT       NOT NULL DEFAULT 0,
+    synced_at       TIMESTAMP    DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, item_id),
+    KEY idx_cc_catalog_stale (source, synced_at),
+    FULLTEXT KEY ft_cc_catalog (title, artist)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,19 @@
+-- =============================================================================
+-- TidolCore — Índice de la biblioteca local (MariaDB). Idempotente.
+-- =============================================================================
+
+-- local_files: un fichero de audio importado desde disco (feature
+-- local-library). (size, mtime) permite re-escaneos incrementales sin releer
+-- el fichero; content_hash deduplica copias idénticas hacia la misma pista.
+-- La ruta es TEXT, así que la PK es su hash (BLAKE3, hex).
+CREATE TABLE IF NOT EXISTS local_files (
+    path_hash    CHAR(64)    NOT NULL,
+    path         TEXT        NOT NULL,
+    size         BIGINT      NOT NULL,
+    mtime        BIGINT      NOT NULL,
+    content_hash CHAR(64)    NOT NULL,
+    track_mbid   VARCHAR(36) NOT NULL,
+    scanned_at   TIMESTAMP   DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (path_hash),
+    KEY idx_local_files_content (content_hash)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,25 @@
+-- =============================================================================
+-- TidolCore — Resumen de playlists e índices de paginación (MariaDB). Idempotente.
+-- =============================================================================
+
+-- playlists: resumen desnormalizado que lee el listado de la Library en vez
+-- de cuatro subconsultas correlacionadas por fila. Lo mantienen
+-- add/remove/reorder de canciones y el like de playlist (user_data.rs).
+ALTER TABLE playlists
+    ADD COLUMN IF NOT EXISTS song_count     INT    NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_duration BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS likes_count    INT    NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS cover_url      TEXT   DEFAULT NULL;
+
+-- Backfill (recalcula todas; repetirlo no cambia nada).
+UPDATE playlists p SET
+    p.song_count = (SELECT COUNT(*) FROM playlist_songs ps WHERE ps.playlist_id = p.id),
+    p.total_duration = (SELECT COALESCE(SUM(ps.duration), 0) FROM playlist_songs ps WHERE ps.playlist_id = p.id),
+    p.cover_url = (SELECT ps.cover_url FROM playlist_songs ps WHERE ps.playlist_id = p.id
+                   ORDER BY ps.position ASC, ps.track_id ASC LIMIT 1),
+    p.likes_count = (SELECT COUNT(*) FROM playlist_likes pl WHERE pl.playlist_id = p.id);
+
+-- Paginación keyset (?limit=&cursor=) de likes e historial: (usuario, fecha);
+-- InnoDB añade la PK (id) al final, que es el desempate del cursor.
+ALTER TABLE user_likes   ADD INDEX IF NOT EXISTS idx_user_likes_recent   (user_id, liked_at);
+ALTER TABLE play_history ADD INDEX IF NOT EXISTS idx_play_history_recent (user_id, played_at);
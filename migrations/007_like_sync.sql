@@ -0,0 +1,25 @@
+-- =============================================================================
+-- TidolCore — Versión y log de cambios de likes (MariaDB). Idempotente.
+-- =============================================================================
+
+-- user_like_versions: contador por usuario; sube una vez por cada escritura de
+-- likes que cambia algo (un lote de POST /music/likes/batch comparte versión).
+CREATE TABLE IF NOT EXISTS user_like_versions (
+    user_id BIGINT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id),
+    CONSTRAINT fk_user_like_versions_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- user_like_log: último cambio de cada pista tocada (una fila por pista, no por
+-- evento). GET /music/likes/sync?since=N lee las de version > N por índice.
+CREATE TABLE IF NOT EXISTS user_like_log (
+    user_id  BIGINT       NOT NULL,
+    track_id VARCHAR(255) NOT NULL,
+    source   VARCHAR(50)  NOT NULL DEFAULT 'local',
+    liked    TINYINT(1)   NOT NULL,
+    version  BIGINT       NOT NULL,
+    PRIMARY KEY (user_id, track_id),
+    KEY idx_user_like_log_version (user_id, version),
+    CONSTRAINT fk_user_like_log_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
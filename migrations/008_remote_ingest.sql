@@ -0,0 +1,21 @@
+-- =============================================================================
+-- TidolCore — Trabajos de ingesta remota de pistas CC (MariaDB). Idempotente.
+-- =============================================================================
+
+-- remote_ingest: una fila por fuente canónica (source_key = 'ia:{id}/{fichero}'
+-- o 'jamendo:{trackid}'), así POST /spectra/ingest-remote no descarga dos veces
+-- la misma pista. status: queued → working → ready | failed. La pista lista se
+-- publica en track_links como mbid 'ingest-{id}' con provisional_audio_path.
+CREATE TABLE IF NOT EXISTS remote_ingest (
+    id         BIGINT       NOT NULL AUTO_INCREMENT,
+    source_key VARCHAR(255) NOT NULL,
+    source_url TEXT         NOT NULL,
+    status     VARCHAR(16)  NOT NULL DEFAULT 'queued',
+    audio_path TEXT         DEFAULT NULL,
+    bytes      BIGINT       DEFAULT NULL,
+    error      VARCHAR(255) DEFAULT NULL,
+    created_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY uq_remote_ingest_source (source_key)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,9 @@
+-- =============================================================================
+-- TidolCore — Rechazos del espejo CC/PD (MariaDB). Idempotente.
+-- =============================================================================
+
+-- Ítems sin licencia legal o sin audio reproducible: el rastreador los marca
+-- para no volver a pedirlos en cada pasada (solo al caducar) y la búsqueda
+-- local no los devuelve.
+ALTER TABLE cc_catalog
+    ADD COLUMN IF NOT EXISTS rejected TINYINT(1) NOT NULL DEFAULT 0;
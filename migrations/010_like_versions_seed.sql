@@ -0,0 +1,12 @@
+-- =============================================================================
+-- TidolCore — Versión inicial de likes anteriores al log (MariaDB). Idempotente.
+-- =============================================================================
+
+-- Los usuarios con likes previos a 007 no tienen fila de versión: con versión
+-- 0, GET /music/likes/sync devolvía el conjunto completo en cada arranque del
+-- cliente. Se les da la versión 1 (sin log: lo anterior llega en la primera
+-- sincronización completa).
+INSERT IGNORE INTO user_like_versions (user_id, version)
+SELECT DISTINCT ul.user_id, 1 FROM user_likes ul
+LEFT JOIN user_like_versions v ON v.user_id = ul.user_id
+WHERE v.user_id IS NULL;
@@ -0,0 +1,11 @@
+-- =============================================================================
+-- TidolCore — Tope de la caché de ingesta remota (MariaDB). Idempotente.
+-- =============================================================================
+
+-- last_served_at: última vez que GET /api/v1/audio/ingest-N sirvió la pista
+-- (como mucho una escritura cada pocos minutos). Pasado AUDIO_CACHE_MAX_GB se
+-- expulsan las más antiguas (status = 'evicted', fichero borrado); una nueva
+-- petición de la misma fuente la vuelve a descargar con la misma id.
+ALTER TABLE remote_ingest
+    ADD COLUMN IF NOT EXISTS last_served_at TIMESTAMP NULL DEFAULT NULL,
+    ADD INDEX IF NOT EXISTS idx_remote_ingest_lru (status, last_served_at);
@@ -0,0 +1,12 @@
+-- =============================================================================
+-- TidolCore — Marca del almacenamiento de la ingesta remota (MariaDB). Idempotente.
+-- =============================================================================
+
+-- Una sola fila (id = 1): la marca (.tidol-storage-id) del AUDIO_CACHE_DIR de la
+-- primera réplica que arrancó. Las demás comparan la de su directorio con esta;
+-- si no coincide no comparten almacenamiento y no ingieren (503).
+CREATE TABLE IF NOT EXISTS ingest_storage (
+    id     TINYINT  NOT NULL,
+    marker CHAR(36) NOT NULL,
+    PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -1,9 +1,14 @@
+use std::time::Duration;
+
+use moka::future::Cache;
 use serde::Deserialize;
 use thiserror::Error;
 use unicode_normalization::UnicodeNormalization;
 
+use crate::db_router::DbRoute;
 use crate::models::{
-    AlbumDetailsResponse, ArtistProfileResponse, HomeDashboardDTO, SearchResponse, TrackResponse,
+    AlbumDetailsResponse, ArtistProfileResponse, HomeDashboardDTO, JsonFragment, SearchResponse,
+    SuggestedTrack, TrackResponse, WorkerEvent,
 };
 use crate::orchestrator::TrackProfile;
 use crate::providers::{EmbedInfo, ProviderError, Track};
@@ -97,6 +102,41 @@ fn parse_lrc(lrc: &str) -> Vec<serde_json::Value> {
     result
 }
 
+// -------------------------------------------------------------------------
+// CACHÉ DE CATÁLOGO PRE-SERIALIZADO
+// -------------------------------------------------------------------------
+/// Tope de bytes de JSON retenidos por cada mapa (álbumes, artistas).
+const CATALOG_JSON_MAX_BYTES: u64 = 32 * 1024 * 1024;
+/// La portada y la discografía se completan en segundo plano: un TTL corto
+/// basta para que lo cacheado no se quede atrás.
+const CATALOG_JSON_TTL: Duration = Duration::from_secs(10 * 60);
+
+/// Detalle de álbum y perfil de artista ya codificados, por mbid. Son las
+/// páginas de catálogo más servidas: un acierto ahorra las consultas y la
+/// serialización de toda la lista de pistas/álbumes.
+pub(crate) struct CatalogJsonCache {
+    albums: Cache<String, JsonFragment>,
+    artists: Cache<String, JsonFragment>,
+}
+
+impl CatalogJsonCache {
+    pub(crate) fn new() -> Self {
+        let build = || {
+            Cache::builder()
+                .max_capacity(CATALOG_JSON_MAX_BYTES)
+                .weigher(|k: &String, v: &JsonFragment| {
+                    (k.len() + v.len()).try_into().unwrap_or(u32::MAX)
+                })
+                .time_to_live(CATALOG_JSON_TTL)
+                .build()
+        };
+        Self {
+            albums: build(),
+            artists: build(),
+        }
+    }
+}
+
 // -------------------------------------------------------------------------
 // ERRORES DE DOMINIO
 // -------------------------------------------------------------------------
@@ -139,7 +179,7 @@ impl TidolCore {
         mbid: &str,
     ) -> Result<ArtistProfileResponse, Box<dyn std::error::Error + Send + Sync>> {
         self.orchestrator
-            .get_artist_discography(mbid, &self.db)
+            .get_artist_discography(mbid, &self.router.route())
             .await
     }
 
@@ -147,7 +187,49 @@ impl TidolCore {
         &self,
         mbid: &str,
     ) -> Result<AlbumDetailsResponse, Box<dyn std::error::Error + Send + Sync>> {
-        self.orchestrator.get_album_details(mbid, &self.db).await
+        self.orchestrator
+            .get_album_details(mbid, &self.router.route())
+            .await
+    }
+
+    /// `get_artist_discography` ya serializado, desde la caché de catálogo.
+    /// Un perfil sin álbumes no se cachea (el siguiente intento reintenta).
+    pub async fn get_artist_discography_json(
+        &self,
+        mbid: &str,
+    ) -> Result<JsonFragment, Box<dyn std::error::Error + Send + Sync>> {
+        if let Some(hit) = self.catalog_json.artists.get(mbid).await {
+            return Ok(hit);
+        }
+        let profile = self.get_artist_discography(mbid).await?;
+        let json = JsonFragment::encode(&profile)?;
+        if !profile.albums.is_empty() {
+            self.catalog_json
+                .artists
+                .insert(mbid.to_string(), json.clone())
+                .await;
+        }
+        Ok(json)
+    }
+
+    /// `get_album_details` ya serializado, desde la caché de catálogo. Un
+    /// álbum sin pistas (MusicBrainz no respondió) no se cachea.
+    pub async fn get_album_details_json(
+        &self,
+        mbid: &str,
+    ) -> Result<JsonFragment, Box<dyn std::error::Error + Send + Sync>> {
+        if let Some(hit) = self.catalog_json.albums.get(mbid).await {
+            return Ok(hit);
+        }
+        let details = self.get_album_details(mbid).await?;
+        let json = JsonFragment::encode(&details)?;
+        if !details.tracks.is_empty() {
+            self.catalog_json
+                .albums
+                .insert(mbid.to_string(), json.clone())
+                .await;
+        }
+        Ok(json)
     }
 
     pub async fn get_similar_tracks(
@@ -157,7 +239,7 @@ impl TidolCore {
         limit: u8,
     ) -> Result<Vec<TrackProfile>, String> {
         self.orchestrator
-            .get_similar_tracks(artist, title, limit, &self.db)
+            .get_similar_tracks(artist, title, limit, &self.router.route())
             .await
     }
 
@@ -165,7 +247,9 @@ impl TidolCore {
         &self,
         user_id: i64,
     ) -> Result<HomeDashboardDTO, String> {
-        self.orchestrator.get_home_dashboard(&self.db, user_id).await
+        // Tras un log_play reciente el usuario lee del primario (su historial).
+        let db = self.router.route_for(user_id);
+        self.orchestrator.get_home_dashboard(&db, user_id).await
     }
 
     pub async fn get_listen_again(
@@ -173,7 +257,8 @@ impl TidolCore {
         user_id: i64,
     ) -> Result<Vec<TrackResponse>, String> {
         // El endpoint siempre pide 20 (idéntico al comportamiento previo).
-        self.orchestrator.get_listen_again(&self.db, 20, user_id).await
+        let db = self.router.route_for(user_id);
+        self.orchestrator.get_listen_again(&db, 20, user_id).await
     }
 
     // -------------------------------------------------------------------------
@@ -195,6 +280,18 @@ impl TidolCore {
             .bind(mbid)
             .execute(&self.db)
             .await?;
+        // La portada cacheada ya no vale: el siguiente detalle sale del default.
+        // También en la discografía del artista, que lista cada álbum con su
+        // portada.
+        self.catalog_json.albums.invalidate(mbid).await;
+        let artist: Option<(Option<String>,)> =
+            sqlx::query_as("SELECT artist_mbid FROM albums WHERE mbid = ?")
+                .bind(mbid)
+                .fetch_optional(&self.db)
+                .await?;
+        if let Some((Some(artist_mbid),)) = artist {
+            self.catalog_json.artists.invalidate(&artist_mbid).await;
+        }
         Ok(())
     }
 
@@ -235,9 +332,33 @@ impl TidolCore {
         .execute(&self.db)
         .await;
 
+        let non_empty = |s: String| (!s.trim().is_empty()).then_some(s);
+        self.suggest.record(
+            &normalized_query,
+            SuggestedTrack {
+                track_id: payload.track_id,
+                track_name: payload.track_name,
+                artist_name: non_empty(payload.artist_name),
+                cover_art_url: non_empty(payload.cover_art_url),
+                source_link: non_empty(payload.source_link),
+                clicks: 0,
+            },
+        );
+
         true
     }
 
+    /// (título, artista) de una pista ya presente en `track_links`, solo BD.
+    pub async fn get_track_title_artist(
+        &self,
+        mbid: &str,
+    ) -> Result<Option<(String, String)>, sqlx::Error> {
+        sqlx::query_as("SELECT title, artist FROM track_links WHERE mbid = ? LIMIT 1")
+            .bind(mbid)
+            .fetch_optional(&self.db)
+            .await
+    }
+
     // -------------------------------------------------------------------------
     // LOG PLAY (registra reproducción y actualiza track_links)
     // -------------------------------------------------------------------------
@@ -257,7 +378,8 @@ impl TidolCore {
         };
 
         if title == "Unknown" || title.is_empty() {
-            if let Ok(profile) = self.orchestrator.resolve_full_track(mbid, &self.db).await {
+            let db = DbRoute::primary(&self.db);
+            if let Ok(profile) = self.orchestrator.resolve_full_track(mbid, &db).await {
                 title = profile.title;
                 artist = profile.artist;
             }
@@ -285,6 +407,7 @@ impl TidolCore {
             .bind(user_id)
             .execute(&self.db)
             .await?;
+        self.router.note_write(user_id).await;
 
         Ok(())
     }
@@ -293,13 +416,22 @@ impl TidolCore {
     // LETRAS (LRCLIB — Legal API)
     // -------------------------------------------------------------------------
     pub async fn get_lyrics(&self, track_id: &str) -> Result<serde_json::Value, LyricsError> {
-        let row = sqlx::query_as::<_, (Option<String>, Option<String>, String, String)>(
-            "SELECT lyrics_json, lyrics_status, artist, title FROM track_links WHERE mbid = ? LIMIT 1",
-        )
-        .bind(track_id)
-        .fetch_optional(&self.db)
-        .await
-        .map_err(LyricsError::Db)?;
+        const SQL: &str =
+            "SELECT lyrics_json, lyrics_status, artist, title FROM track_links WHERE mbid = ? LIMIT 1";
+        let mut row = sqlx::query_as::<_, (Option<String>, Option<String>, String, String)>(SQL)
+            .bind(track_id)
+            .fetch_optional(self.router.reader())
+            .await
+            .map_err(LyricsError::Db)?;
+        // La pista puede ser recién insertada (log_play) y no haber llegado aún
+        // a la réplica: antes de responder 404, confirmar en el primario.
+        if row.is_none() && self.router.has_replicas() {
+            row = sqlx::query_as(SQL)
+                .bind(track_id)
+                .fetch_optional(&self.db)
+                .await
+                .map_err(LyricsError::Db)?;
+        }
 
         let (lyrics_json, lyrics_status, artist, title) = match row {
             Some(r) => r,
@@ -376,6 +508,8 @@ impl TidolCore {
                                 .bind(track_id)
                                 .execute(&self.db)
                                 .await;
+                                self.events
+                                    .publish(WorkerEvent::lyrics_ready(track_id, "lrclib_synced"));
 
                                 return Ok(serde_json::json!({
                                     "type": "lrclib_synced",
@@ -401,6 +535,8 @@ impl TidolCore {
                                 .bind(track_id)
                                 .execute(&self.db)
                                 .await;
+                                self.events
+                                    .publish(WorkerEvent::lyrics_ready(track_id, "plain_only"));
 
                                 return Ok(serde_json::json!({
                                     "type": "plain",
@@ -5,8 +5,14 @@
 pub struct CoreConfig {
     /// Cadena de conexión MySQL/MariaDB (obligatoria).
     pub database_url: String,
-    /// Máximo de conexiones del pool (default del binario: 100).
+    /// Máximo de conexiones del pool (default del binario: 100). Se aplica
+    /// también a cada réplica.
     pub database_max_connections: u32,
+    /// Réplicas de solo lectura (vacío = todo al primario). Ver db_router.rs.
+    pub database_replica_urls: Vec<String>,
+    /// Retraso máximo tolerado, en segundos, antes de sacar una réplica del
+    /// reparto de lecturas (default del binario: 5).
+    pub replica_max_lag_secs: u64,
     /// Lista de proxies de salida en round-robin; por defecto `["direct"]`.
     pub proxy_pool: Vec<String>,
     /// Directorio donde se cargan los plugins dinámicos (.so).
@@ -22,4 +28,14 @@ pub struct CoreConfig {
     /// necesitan devuelven un error en tiempo de petición (el servidor arranca
     /// igualmente, preservando el comportamiento previo).
     pub jwt_secret: Option<String>,
+    /// Intervalo en horas del rastreador del espejo CC/PD (`cc_catalog`);
+    /// `0` = deshabilitado (default del binario: 24).
+    pub cc_mirror_sync_hours: u64,
+    /// URL de Redis para repartir los eventos de progreso entre réplicas
+    /// (`None` = solo eventos locales; requiere la feature `redis-events`).
+    pub redis_url: Option<String>,
+    /// Directorio de la caché de audio de `POST /spectra/ingest-remote`
+    /// (default del binario: `storage/audio`). Con varias réplicas tiene que ser
+    /// el mismo almacenamiento en todas; se comprueba al arrancar. Ver ingest.rs.
+    pub audio_cache_dir: String,
 }
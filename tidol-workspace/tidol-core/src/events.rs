@@ -0,0 +1,289 @@
+// =========================================================================
+// Canal de eventos de progreso (server-push)
+//
+// Sustituye el sondeo de `/api/v1/lyrics/:track_id` por avisos empujados:
+// el núcleo publica `WorkerEvent`s (letra lista, portada lista, prefetch
+// terminado) en un `broadcast` en proceso y el binario los sirve por SSE
+// filtrados por `Subscription`. Con la feature `redis-events` y `REDIS_URL`,
+// cada evento local se reenvía a un canal pub/sub de Redis y los de otras
+// réplicas se reinyectan aquí, de modo que un cliente conectado a la réplica A
+// se entera de lo que resolvió la réplica B.
+// =========================================================================
+use std::collections::HashSet;
+use std::sync::{Arc, OnceLock};
+
+use serde::{Deserialize, Serialize};
+use tokio::sync::{broadcast, mpsc};
+
+use crate::models::WorkerEvent;
+
+/// Capacidad del `broadcast` local. Un suscriptor que se queda atrás más de
+/// esto recibe `Lagged` y debe resincronizar (el SSE se lo indica al cliente).
+const LOCAL_CAPACITY: usize = 1024;
+
+/// Canal pub/sub de Redis compartido por todas las réplicas.
+#[cfg(feature = "redis-events")]
+const REDIS_CHANNEL: &str = "tidol:worker-events";
+
+/// Espera inicial y máxima entre reintentos de reconexión a Redis (se dobla
+/// en cada fallo).
+#[cfg(feature = "redis-events")]
+const REDIS_RETRY_MIN: std::time::Duration = std::time::Duration::from_millis(500);
+#[cfg(feature = "redis-events")]
+const REDIS_RETRY_MAX: std::time::Duration = std::time::Duration::from_secs(30);
+
+/// Sobre que viaja por Redis: `user_id` no se serializa en `WorkerEvent`
+/// (no sale al cliente), así que se transporta aparte; `origin` evita que una
+/// réplica reinyecte sus propios eventos.
+#[derive(Serialize, Deserialize)]
+struct RelayEnvelope {
+    origin: String,
+    user_id: Option<i64>,
+    event: WorkerEvent,
+}
+
+struct Inner {
+    local: broadcast::Sender<WorkerEvent>,
+    /// Cola hacia el publicador de Redis; vacía si no hay relay.
+    relay: OnceLock<mpsc::Sender<WorkerEvent>>,
+    origin: String,
+}
+
+/// Bus de eventos del núcleo. Barato de clonar.
+#[derive(Clone)]
+pub struct EventBus {
+    inner: Arc<Inner>,
+}
+
+impl EventBus {
+    #[allow(clippy::new_without_default)] // crea un canal nuevo; no es un valor "vacío"
+    pub fn new() -> Self {
+        let (local, _) = broadcast::channel(LOCAL_CAPACITY);
+        Self {
+            inner: Arc::new(Inner {
+                local,
+                relay: OnceLock::new(),
+                origin: uuid::Uuid::new_v4().to_string(),
+            }),
+        }
+    }
+
+    /// Publica un evento a los suscriptores locales y, si hay relay, al resto
+    /// de réplicas. Nunca bloquea: sin suscriptores o con la cola del relay
+    /// llena, el evento se descarta (el cliente siempre puede re-pedir el dato).
+    pub fn publish(&self, event: WorkerEvent) {
+        if let Some(relay) = self.inner.relay.get() {
+            let _ = relay.try_send(event.clone());
+        }
+        let _ = self.inner.local.send(event);
+    }
+
+    pub fn subscribe(&self) -> broadcast::Receiver<WorkerEvent> {
+        self.inner.local.subscribe()
+    }
+
+    /// Conecta el relay de Redis: un publicador que vacía la cola local hacia
+    /// `REDIS_CHANNEL` y un suscriptor que reinyecta los eventos ajenos. La
+    /// primera conexión debe salir bien; si después se cae, ambos reconectan
+    /// con espera exponencial (mientras tanto solo hay eventos locales).
+    #[cfg(feature = "redis-events")]
+    pub async fn connect_redis(&self, url: &str) -> Result<(), crate::error::TidolError> {
+        use crate::error::TidolError;
+        use futures::StreamExt;
+        use tracing::{info, warn};
+
+        let redis_err = |e: redis::RedisError| TidolError::Config(format!("Redis: {}", e));
+        let client = redis::Client::open(url).map_err(redis_err)?;
+        let mut publisher = client
+            .get_multiplexed_async_connection()
+            .await
+            .map_err(redis_err)?;
+        let pubsub = redis_subscribe(&client).await.map_err(redis_err)?;
+
+        let (tx, mut rx) = mpsc::channel::<WorkerEvent>(LOCAL_CAPACITY);
+        if self.inner.relay.set(tx).is_err() {
+            return Err(TidolError::Config("relay de eventos ya conectado".into()));
+        }
+
+        let origin = self.inner.origin.clone();
+        let publisher_client = client.clone();
+        tokio::spawn(async move {
+            while let Some(event) = rx.recv().await {
+                let envelope = RelayEnvelope {
+                    origin: origin.clone(),
+                    user_id: event.user_id,
+                    event,
+                };
+                let Ok(payload) = serde_json::to_string(&envelope) else {
+                    continue;
+                };
+                let res: redis::RedisResult<()> = redis::cmd("PUBLISH")
+                    .arg(REDIS_CHANNEL)
+                    .arg(payload)
+                    .query_async(&mut publisher)
+                    .await;
+                if let Err(e) = res {
+                    warn!("[events] PUBLISH a Redis falló: {}", e);
+                    // La conexión multiplexada no se recupera sola: se abre otra
+                    // para el siguiente evento (este se pierde).
+                    if e.is_connection_dropped() || e.is_io_error() {
+                        match publisher_client.get_multiplexed_async_connection().await {
+                            Ok(conn) => publisher = conn,
+                            Err(e) => warn!("[events] Reconexión del publicador falló: {}", e),
+                        }
+                    }
+                }
+            }
+        });
+
+        let bus = self.clone();
+        tokio::spawn(async move {
+            let mut pubsub = Some(pubsub);
+            let mut retry = REDIS_RETRY_MIN;
+            loop {
+                if let Some(mut conn) = pubsub.take() {
+                    let mut messages = conn.on_message();
+                    while let Some(msg) = messages.next().await {
+                        let Ok(payload) = msg.get_payload::<String>() else {
+                            continue;
+                        };
+                        if let Some(event) = bus.accept_remote(&payload) {
+                            let _ = bus.inner.local.send(event);
+                        }
+                    }
+                    warn!("[events] Suscripción a Redis cerrada; reconectando");
+                }
+                tokio::time::sleep(retry).await;
+                match redis_subscribe(&client).await {
+                    Ok(conn) => {
+                        info!("[events] Suscripción a Redis restablecida");
+                        pubsub = Some(conn);
+                        retry = REDIS_RETRY_MIN;
+                    }
+                    Err(e) => {
+                        retry = (retry * 2).min(REDIS_RETRY_MAX);
+                        warn!(
+                            "[events] Reconexión a Redis falló ({}); reintento en {:?}",
+                            e, retry
+                        );
+                    }
+                }
+            }
+        });
+
+        Ok(())
+    }
+
+    /// Decodifica un sobre del relay; `None` si es inválido o lo originó esta
+    /// misma réplica (ya se entregó localmente al publicarlo).
+    #[cfg_attr(not(feature = "redis-events"), allow(dead_code))]
+    fn accept_remote(&self, payload: &str) -> Option<WorkerEvent> {
+        let envelope: RelayEnvelope = serde_json::from_str(payload).ok()?;
+        if envelope.origin == self.inner.origin {
+            return None;
+        }
+        let mut event = envelope.event;
+        event.user_id = envelope.user_id;
+        Some(event)
+    }
+}
+
+/// Conexión pub/sub ya suscrita a `REDIS_CHANNEL`.
+#[cfg(feature = "redis-events")]
+async fn redis_subscribe(client: &redis::Client) -> redis::RedisResult<redis::aio::PubSub> {
+    let mut pubsub = client.get_async_pubsub().await?;
+    pubsub.subscribe(REDIS_CHANNEL).await?;
+    Ok(pubsub)
+}
+
+/// Qué eventos recibe una conexión SSE: los dirigidos a su usuario y los de
+/// pista (sin destinatario), opcionalmente restringidos a `tracks`.
+#[derive(Debug, Clone)]
+pub struct Subscription {
+    pub user_id: i64,
+    /// `None` = todas las pistas.
+    pub tracks: Option<HashSet<String>>,
+}
+
+impl Subscription {
+    /// Construye la suscripción desde el parámetro `tracks=a,b,c` (vacío o
+    /// ausente = todas las pistas).
+    pub fn new(user_id: i64, tracks: Option<&str>) -> Self {
+        let tracks = tracks
+            .map(|raw| {
+                raw.split(',')
+                    .map(str::trim)
+                    .filter(|t| !t.is_empty())
+                    .map(str::to_string)
+                    .collect::<HashSet<_>>()
+            })
+            .filter(|set| !set.is_empty());
+        Self { user_id, tracks }
+    }
+
+    pub fn matches(&self, event: &WorkerEvent) -> bool {
+        if let Some(target) = event.user_id {
+            if target != self.user_id {
+                return false;
+            }
+        }
+        match &self.tracks {
+            Some(set) => set.contains(&event.track_id),
+            None => true,
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn suscripcion_filtra_por_usuario_destinatario() {
+        let sub = Subscription::new(7, None);
+        assert!(sub.matches(&WorkerEvent::lyrics_ready("t1", "lrclib_synced")));
+        assert!(sub.matches(&WorkerEvent::prefetch_complete("t1", 7, None)));
+        assert!(!sub.matches(&WorkerEvent::prefetch_complete("t1", 8, None)));
+    }
+
+    #[test]
+    fn suscripcion_filtra_por_pistas() {
+        let sub = Subscription::new(1, Some(" a, b ,,"));
+        assert!(sub.matches(&WorkerEvent::cover_ready("a")));
+        assert!(sub.matches(&WorkerEvent::cover_ready("b")));
+        assert!(!sub.matches(&WorkerEvent::cover_ready("c")));
+        // Parámetro vacío = sin filtro.
+        assert!(Subscription::new(1, Some("")).tracks.is_none());
+    }
+
+    #[tokio::test]
+    async fn publish_llega_a_suscriptores_locales() {
+        let bus = EventBus::new();
+        let mut rx = bus.subscribe();
+        bus.publish(WorkerEvent::cover_ready("mbid-1"));
+        let got = rx.recv().await.expect("evento");
+        assert_eq!(got.track_id, "mbid-1");
+    }
+
+    #[test]
+    fn relay_ignora_eventos_propios_y_conserva_destinatario() {
+        let bus = EventBus::new();
+        let own = serde_json::to_string(&RelayEnvelope {
+            origin: bus.inner.origin.clone(),
+            user_id: None,
+            event: WorkerEvent::cover_ready("x"),
+        })
+        .expect("json");
+        assert!(bus.accept_remote(&own).is_none());
+
+        let foreign = serde_json::to_string(&RelayEnvelope {
+            origin: "otra-replica".into(),
+            user_id: Some(3),
+            event: WorkerEvent::prefetch_complete("x", 3, None),
+        })
+        .expect("json");
+        let ev = bus.accept_remote(&foreign).expect("evento ajeno");
+        assert_eq!(ev.user_id, Some(3));
+        assert!(bus.accept_remote("no-json").is_none());
+    }
+}
@@ -0,0 +1,1364 @@
+// =========================================================================
+// Ingesta remota de fuentes CC (POST /api/v1/spectra/ingest-remote)
+//
+// El frontend (`useLazyCaching`) pide cachear en el servidor cada pista
+// remota que reproduce. Solo se aceptan las mismas fuentes legales que ya
+// resuelven los plugins: descargas de Internet Archive
+// (`archive.org/download/{id}/{fichero}`) y de Jamendo (`?trackid=N`).
+//
+// - `remote_ingest` deduplica por `source_key` (la fuente canónica, no la URL
+//   literal): una segunda petición de la misma pista no descarga nada, ni en
+//   esta réplica ni en otra. Un trabajo fallido se reintenta pasado
+//   `RETRY_FAILED_MINUTES`; uno atascado en 'queued'/'working' (réplica caída
+//   a medias) se reclama pasado `STALE_CLAIM_MINUTES`.
+// - Antes de encolar se pregunta al proveedor: el ítem de IA (espejo
+//   `cc_catalog` o API de metadatos) o la pista de Jamendo tiene que existir y
+//   tener licencia CC/PD. Se descarga de la URL canónica de la fuente y
+//   título/artista/portada salen del proveedor: `track_links` es compartida y
+//   no puede llevar lo que mande un cliente.
+// - La cola es acotada (`QUEUE_CAPACITY`): llena → 503 y el frontend lo
+//   reintentará en la próxima reproducción. `WORKERS` tareas la consumen.
+// - La descarga va en streaming a `{audio_cache_dir}/tmp/{track_id}.part`
+//   (nunca entera en memoria) con tope de `MAX_DOWNLOAD_BYTES`; después se
+//   comprueba la firma del contenedor y, si hay ffmpeg (`FFMPEG_BIN`), se
+//   normaliza el volumen (loudnorm) a MP3 VBR. Sin ffmpeg se guarda el
+//   original ya verificado.
+// - Lista: `remote_ingest.status = 'ready'` y `track_links` con
+//   `provisional_audio_path`, de modo que la radio la recoge y
+//   `GET /api/v1/audio/ingest-N` la sirve desde disco (con `Range`).
+// - El directorio tiene tope (`AUDIO_CACHE_MAX_GB`): tras cada ingesta se
+//   expulsan las pistas servidas hace más tiempo ('evicted', misma id; una
+//   nueva petición la vuelve a descargar).
+// - `AUDIO_CACHE_DIR` tiene que ser el MISMO almacenamiento en todas las
+//   réplicas (volumen compartido / NFS): la deduplicación, el tope y servir
+//   `ingest-N` son de todo el clúster. Al arrancar se comprueba con una marca
+//   (`STORAGE_MARKER` en el directorio == `ingest_storage.marker` en la BD);
+//   una réplica con otro directorio no ingiere (503) ni toca filas. Con el
+//   almacenamiento verificado, una fila 'ready' cuyo fichero ya no existe se
+//   pasa a 'evicted' al pedirla, y se vuelve a descargar en la próxima ingesta.
+// =========================================================================
+use std::path::{Path, PathBuf};
+use std::process::Stdio;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::Arc;
+use std::time::Duration;
+
+use futures::StreamExt;
+use reqwest::Url;
+use serde::{Deserialize, Serialize};
+use sqlx::{MySqlPool, Row};
+use tokio::io::{AsyncReadExt, AsyncSeekExt, AsyncWriteExt};
+use tokio::sync::{mpsc, Mutex};
+use tokio_util::io::ReaderStream;
+use tracing::{error, info, warn};
+
+use crate::providers::archive::{first_str, is_legal_license};
+use crate::providers::cc_mirror::{CcMirror, SOURCE_ARCHIVE};
+use crate::TidolCore;
+
+/// Trabajos pendientes como máximo; con la cola llena se responde 503.
+const QUEUE_CAPACITY: usize = 256;
+/// Descargas/normalizaciones simultáneas por réplica.
+const WORKERS: usize = 2;
+/// Tope por fichero (un FLAC de un concierto largo ronda los 200 MB).
+const MAX_DOWNLOAD_BYTES: u64 = 300 * 1024 * 1024;
+const DOWNLOAD_TIMEOUT: Duration = Duration::from_secs(15 * 60);
+const FFMPEG_TIMEOUT: Duration = Duration::from_secs(10 * 60);
+/// Minutos tras los que un trabajo fallido se puede volver a intentar.
+const RETRY_FAILED_MINUTES: u32 = 60;
+/// Minutos tras los que un trabajo sin terminar se da por huérfano.
+const STALE_CLAIM_MINUTES: u32 = 30;
+/// Tiempo máximo de la consulta de licencia al proveedor.
+const VERIFY_TIMEOUT: Duration = Duration::from_secs(10);
+/// Client ID público de demo de Jamendo (el mismo que usa el plugin) si no
+/// se define `JAMENDO_CLIENT_ID`.
+const JAMENDO_FALLBACK_CLIENT_ID: &str = "b6747d04";
+/// Tope por defecto del directorio de audio; `AUDIO_CACHE_MAX_GB` lo cambia.
+const DEFAULT_CACHE_MAX_GB: u64 = 20;
+/// Como mucho una anotación de "servida" por pista en este tiempo (orden LRU).
+const TOUCH_MINUTES: u32 = 10;
+/// Candidatas a expulsar leídas por pasada.
+const EVICT_BATCH: u32 = 100;
+/// Fichero, dentro de `AUDIO_CACHE_DIR`, con la marca del almacenamiento.
+const STORAGE_MARKER: &str = ".tidol-storage-id";
+
+// -------------------------------------------------------------------------
+// PAYLOADS
+// -------------------------------------------------------------------------
+/// Cuerpo de `POST /api/v1/spectra/ingest-remote` tal como lo envía
+/// `useLazyCaching`. `cover_url` y `metadata` se aceptan pero no se usan: la
+/// pista se publica con los metadatos del proveedor.
+#[derive(Deserialize)]
+#[serde(rename_all = "camelCase")]
+pub struct IngestRemotePayload {
+    pub audio_url: String,
+    pub cover_url: Option<String>,
+    #[serde(default)]
+    pub metadata: IngestMetadata,
+}
+
+#[derive(Deserialize, Default)]
+pub struct IngestMetadata {
+    pub title: Option<String>,
+    pub artist: Option<String>,
+}
+
+/// Respuesta de la ingesta. `already_exists`: la pista ya está en disco y
+/// `local_url` la sirve; si no, queda en cola (o ya lo estaba).
+#[derive(Serialize, Debug)]
+#[serde(rename_all = "camelCase")]
+pub struct IngestAccepted {
+    pub success: bool,
+    pub already_exists: bool,
+    pub track_id: String,
+    /// 'queued' | 'working' | 'ready' | 'failed' (reintento aún no permitido).
+    pub status: String,
+    pub local_url: Option<String>,
+}
+
+/// `Forbidden` → 400 "Fuente no permitida" (ni Internet Archive ni Jamendo,
+/// o sin licencia CC/PD según el proveedor); `Full` → 503 "Cola de ingesta
+/// llena"; `Unverified` → 503 "No se pudo verificar la fuente" (el proveedor
+/// no respondió); `Storage` → 503 "Almacenamiento de audio no compartido"
+/// (`AUDIO_CACHE_DIR` de esta réplica no es el del clúster o no se pudo
+/// comprobar); `Db` → 500 "Error DB".
+#[derive(Debug)]
+pub enum IngestError {
+    Forbidden,
+    Full,
+    Unverified,
+    Storage,
+    Db,
+}
+
+/// `NotFound` → 404 (id desconocido o aún sin terminar);
+/// `Unsatisfiable(total)` → 416 con `Content-Range: bytes */total`.
+#[derive(Debug)]
+pub enum AudioError {
+    NotFound,
+    Unsatisfiable(u64),
+}
+
+/// Audio ingerido listo para servir: `body` ya está posicionado en el rango
+/// pedido y limitado a su longitud.
+pub struct IngestedAudio {
+    pub body: ReaderStream<tokio::io::Take<tokio::fs::File>>,
+    pub content_type: &'static str,
+    /// Tamaño total del fichero.
+    pub total: u64,
+    /// Rango servido (inclusivo); `None` = fichero completo.
+    pub range: Option<(u64, u64)>,
+}
+
+impl IngestedAudio {
+    /// Bytes que lleva `body`.
+    pub fn len(&self) -> u64 {
+        match self.range {
+            Some((start, end)) => end - start + 1,
+            None => self.total,
+        }
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+}
+
+// -------------------------------------------------------------------------
+// FUENTES PERMITIDAS
+// -------------------------------------------------------------------------
+#[derive(Debug, PartialEq)]
+enum Provider {
+    Archive { identifier: String },
+    Jamendo { track_id: String },
+}
+
+#[derive(Debug, PartialEq)]
+struct RemoteSource {
+    /// Identidad canónica: `ia:{identifier}/{fichero}` o `jamendo:{trackid}`.
+    key: String,
+    /// URL de descarga reconstruida desde la clave, no la del cliente.
+    url: Url,
+    provider: Provider,
+    /// Título/artista de reserva cuando el proveedor no trae uno.
+    fallback_title: String,
+    fallback_artist: &'static str,
+}
+
+fn host_matches(host: &str, domain: &str) -> bool {
+    host == domain
+        || host
+            .strip_suffix(domain)
+            .is_some_and(|sub| sub.ends_with('.'))
+}
+
+/// Hosts a los que se puede descargar (también tras una redirección: IA
+/// redirige de archive.org al nodo `iaNNNNNN.us.archive.org`).
+fn allowed_host(host: &str) -> bool {
+    let host = host.to_ascii_lowercase();
+    host_matches(&host, "archive.org") || host_matches(&host, "jamendo.com")
+}
+
+fn parse_source(raw: &str) -> Option<RemoteSource> {
+    let url = Url::parse(raw.trim()).ok()?;
+    if !matches!(url.scheme(), "https" | "http")
+        || !url.username().is_empty()
+        || url.password().is_some()
+        || url.port().is_some()
+    {
+        return None;
+    }
+    let host = url.host_str()?.to_ascii_lowercase();
+
+    let source = if host_matches(&host, "archive.org") {
+        let mut segments = url.path_segments()?;
+        if segments.next()? != "download" {
+            return None;
+        }
+        let identifier = segments.next().filter(|s| !s.is_empty())?;
+        let file: Vec<&str> = segments.collect();
+        if file.is_empty() || file.iter().any(|s| s.is_empty() || *s == "..") {
+            return None;
+        }
+        let name = urlencoding::decode(file[file.len() - 1]).ok()?;
+        let stem = name.rsplit_once('.').map_or(&*name, |(stem, _)| stem);
+        let path = format!("{}/{}", identifier, file.join("/"));
+        RemoteSource {
+            url: Url::parse(&format!("https://archive.org/download/{}", path)).ok()?,
+            key: format!("ia:{}", path),
+            fallback_title: stem.replace('_', " "),
+            fallback_artist: "Internet Archive",
+            provider: Provider::Archive {
+                identifier: urlencoding::decode(identifier).ok()?.into_owned(),
+            },
+        }
+    } else if host_matches(&host, "jamendo.com") {
+        let track_id = url
+            .query_pairs()
+            .find(|(k, _)| k == "trackid")
+            .map(|(_, v)| v.into_owned())
+            .filter(|v| !v.is_empty() && v.bytes().all(|b| b.is_ascii_digit()))?;
+        RemoteSource {
+            key: format!("jamendo:{}", track_id),
+            url: Url::parse(&format!(
+                "https://prod-1.storage.jamendo.com/?trackid={}&format=mp32&from=app-tidol",
+                track_id
+            ))
+            .ok()?,
+            fallback_title: format!("Jamendo {}", track_id),
+            fallback_artist: "Jamendo",
+            provider: Provider::Jamendo { track_id },
+        }
+    } else {
+        return None;
+    };
+
+    (source.key.len() <= 255).then_some(source)
+}
+
+// -------------------------------------------------------------------------
+// VERIFICACIÓN EN EL PROVEEDOR
+// -------------------------------------------------------------------------
+/// Título, artista y portada con los que se publica la pista.
+#[derive(Debug, PartialEq)]
+struct SourceMeta {
+    title: String,
+    artist: String,
+    cover_url: Option<String>,
+}
+
+/// Comprueba en el proveedor que la pista existe y es CC/PD y devuelve sus
+/// metadatos. Internet Archive: primero el espejo (solo guarda ítems con
+/// licencia legal); si no está, la API de metadatos.
+async fn verify_source(
+    db: &MySqlPool,
+    http: &reqwest::Client,
+    source: &RemoteSource,
+) -> Result<SourceMeta, IngestError> {
+    let (title, artist, cover_url) = match &source.provider {
+        Provider::Archive { identifier } => {
+            let mirrored = CcMirror::new(db.clone())
+                .legal_item(SOURCE_ARCHIVE, identifier)
+                .await
+                .map_err(|e| {
+                    error!("ingest_remote: {}", e);
+                    IngestError::Db
+                })?;
+            let (title, artist) = match mirrored {
+                Some(meta) => meta,
+                None => {
+                    let url = format!(
+                        "https://archive.org/metadata/{}",
+                        urlencoding::encode(identifier)
+                    );
+                    archive_meta(&fetch_json(http, &url).await?).ok_or(IngestError::Forbidden)?
+                }
+            };
+            let cover = format!(
+                "https://archive.org/services/img/{}",
+                urlencoding::encode(identifier)
+            );
+            (title, artist, Some(cover))
+        }
+        Provider::Jamendo { track_id } => {
+            let client_id = std::env::var("JAMENDO_CLIENT_ID")
+                .unwrap_or_else(|_| JAMENDO_FALLBACK_CLIENT_ID.to_string());
+            let mut url = Url::parse("https://api.jamendo.com/v3.0/tracks/")
+                .expect("URL de la API de Jamendo");
+            url.query_pairs_mut()
+                .append_pair("client_id", &client_id)
+                .append_pair("format", "json")
+                .append_pair("id", track_id);
+            jamendo_meta(&fetch_json(http, url.as_str()).await?)?
+        }
+    };
+    Ok(SourceMeta {
+        title: metadata_or(Some(title), source.fallback_title.clone()),
+        artist: metadata_or(Some(artist), source.fallback_artist.to_string()),
+        cover_url,
+    })
+}
+
+/// 404 → `Forbidden` (la fuente no existe); caída o error → `Unverified`.
+async fn fetch_json(http: &reqwest::Client, url: &str) -> Result<serde_json::Value, IngestError> {
+    let resp = http
+        .get(url)
+        .timeout(VERIFY_TIMEOUT)
+        .send()
+        .await
+        .map_err(|e| {
+            warn!("[ingest] verificación: {}", e);
+            IngestError::Unverified
+        })?;
+    if resp.status() == reqwest::StatusCode::NOT_FOUND {
+        return Err(IngestError::Forbidden);
+    }
+    if !resp.status().is_success() {
+        warn!("[ingest] verificación: HTTP {}", resp.status());
+        return Err(IngestError::Unverified);
+    }
+    resp.json().await.map_err(|_| IngestError::Unverified)
+}
+
+/// `(title, creator)` de la respuesta de `archive.org/metadata/{id}` si el
+/// ítem tiene licencia CC/PD (un ítem inexistente responde `{}`).
+fn archive_meta(json: &serde_json::Value) -> Option<(String, String)> {
+    let meta = &json["metadata"];
+    let license = meta["licenseurl"]
+        .as_str()
+        .or_else(|| meta["license"].as_str())
+        .unwrap_or("");
+    is_legal_license(license).then(|| {
+        (
+            first_str(&meta["title"]).unwrap_or_default().to_string(),
+            first_str(&meta["creator"]).unwrap_or_default().to_string(),
+        )
+    })
+}
+
+/// `(name, artist_name, image)` de la respuesta de `/v3.0/tracks/?id=N`.
+fn jamendo_meta(json: &serde_json::Value) -> Result<(String, String, Option<String>), IngestError> {
+    if json["headers"]["status"].as_str() != Some("success") {
+        return Err(IngestError::Unverified);
+    }
+    let track = json["results"]
+        .as_array()
+        .and_then(|r| r.first())
+        .ok_or(IngestError::Forbidden)?;
+    if !is_legal_license(track["license_ccurl"].as_str().unwrap_or("")) {
+        return Err(IngestError::Forbidden);
+    }
+    let text = |key: &str| track[key].as_str().unwrap_or_default().to_string();
+    let cover = track["image"]
+        .as_str()
+        .filter(|u| u.starts_with("https://"))
+        .map(str::to_string);
+    Ok((text("name"), text("artist_name"), cover))
+}
+
+// -------------------------------------------------------------------------
+// ESQUEMA
+// -------------------------------------------------------------------------
+/// Tablas de la ingesta (migrations/008_remote_ingest.sql,
+/// 011_remote_ingest_lru.sql y 012_ingest_storage.sql).
+pub(crate) async fn ensure_schema(db: &MySqlPool) -> Result<(), sqlx::Error> {
+    sqlx::query(
+        "CREATE TABLE IF NOT EXISTS remote_ingest (
+            id         BIGINT       NOT NULL AUTO_INCREMENT,
+            source_key VARCHAR(255) NOT NULL,
+            source_url TEXT         NOT NULL,
+            status     VARCHAR(16)  NOT NULL DEFAULT 'queued',
+            audio_path TEXT         DEFAULT NULL,
+            bytes      BIGINT       DEFAULT NULL,
+            error      VARCHAR(255) DEFAULT NULL,
+            created_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            last_served_at TIMESTAMP NULL DEFAULT NULL,
+            PRIMARY KEY (id),
+            UNIQUE KEY uq_remote_ingest_source (source_key),
+            KEY idx_remote_ingest_lru (status, last_served_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+    )
+    .execute(db)
+    .await?;
+    // Tablas creadas antes del tope de la caché (migrations/011).
+    sqlx::query(
+        "ALTER TABLE remote_ingest
+            ADD COLUMN IF NOT EXISTS last_served_at TIMESTAMP NULL DEFAULT NULL,
+            ADD INDEX IF NOT EXISTS idx_remote_ingest_lru (status, last_served_at)",
+    )
+    .execute(db)
+    .await?;
+    sqlx::query(
+        "CREATE TABLE IF NOT EXISTS ingest_storage (
+            id     TINYINT  NOT NULL,
+            marker CHAR(36) NOT NULL,
+            PRIMARY KEY (id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+    )
+    .execute(db)
+    .await?;
+    Ok(())
+}
+
+/// ¿Es `dir` el almacenamiento compartido del clúster? Lee (o crea) la marca
+/// del directorio y la compara con la registrada en la BD; la primera réplica
+/// que arranca registra la suya.
+async fn verify_shared_storage(db: &MySqlPool, dir: &Path) -> Result<bool, String> {
+    tokio::fs::create_dir_all(dir)
+        .await
+        .map_err(|e| format!("no se pudo crear {}: {}", dir.display(), e))?;
+    let path = dir.join(STORAGE_MARKER);
+    let fresh = uuid::Uuid::new_v4().to_string();
+    // `create_new`: dos réplicas sobre el mismo volumen no pisan la marca.
+    let created = tokio::fs::OpenOptions::new()
+        .write(true)
+        .create_new(true)
+        .open(&path)
+        .await;
+    let local = match created {
+        Ok(mut f) => {
+            f.write_all(fresh.as_bytes())
+                .await
+                .map_err(|e| format!("{}: {}", path.display(), e))?;
+            fresh
+        }
+        Err(e) if e.kind() == std::io::ErrorKind::AlreadyExists => tokio::fs::read_to_string(&path)
+            .await
+            .map_err(|e| format!("{}: {}", path.display(), e))?
+            .trim()
+            .to_string(),
+        Err(e) => return Err(format!("{}: {}", path.display(), e)),
+    };
+
+    sqlx::query("INSERT IGNORE INTO ingest_storage (id, marker) VALUES (1, ?)")
+        .bind(&local)
+        .execute(db)
+        .await
+        .map_err(|e| e.to_string())?;
+    let registered: String = sqlx::query_scalar("SELECT marker FROM ingest_storage WHERE id = 1")
+        .fetch_one(db)
+        .await
+        .map_err(|e| e.to_string())?;
+    Ok(registered == local)
+}
+
+fn track_id(id: i64) -> String {
+    format!("ingest-{}", id)
+}
+
+fn local_url(id: i64) -> String {
+    format!("/api/v1/audio/ingest-{}", id)
+}
+
+// -------------------------------------------------------------------------
+// COLA Y WORKERS
+// -------------------------------------------------------------------------
+struct IngestJob {
+    id: i64,
+    url: Url,
+    title: String,
+    artist: String,
+    cover_url: Option<String>,
+}
+
+/// Extremo de envío de la cola de ingesta. Los workers viven en tareas de
+/// tokio lanzadas por `start`.
+pub(crate) struct IngestQueue {
+    tx: mpsc::Sender<IngestJob>,
+    /// Mismo cliente que los workers, para verificar la fuente.
+    http: reqwest::Client,
+    /// `AUDIO_CACHE_DIR` verificado como el almacenamiento del clúster
+    /// (`verify_shared_storage`); si no, esta réplica no ingiere.
+    shared: bool,
+}
+
+struct WorkerCtx {
+    db: MySqlPool,
+    dir: PathBuf,
+    http: reqwest::Client,
+    /// Tope del directorio de audio.
+    max_bytes: u64,
+}
+
+impl IngestQueue {
+    /// Crea la cola, lanza `WORKERS` workers que descargan a `dir` y comprueba
+    /// que `dir` es el almacenamiento compartido del clúster.
+    pub(crate) async fn start(db: MySqlPool, dir: &str) -> Self {
+        let (tx, rx) = mpsc::channel(QUEUE_CAPACITY);
+        let rx = Arc::new(Mutex::new(rx));
+        let http = reqwest::Client::builder()
+            .user_agent("TidolCore/1.0")
+            .timeout(DOWNLOAD_TIMEOUT)
+            .redirect(reqwest::redirect::Policy::custom(|attempt| {
+                if attempt.previous().len() >= 5 {
+                    attempt.error("demasiadas redirecciones")
+                } else if attempt.url().host_str().is_some_and(allowed_host) {
+                    attempt.follow()
+                } else {
+                    attempt.stop()
+                }
+            }))
+            .build()
+            .unwrap_or_else(|_| reqwest::Client::new());
+        let max_gb = std::env::var("AUDIO_CACHE_MAX_GB")
+            .ok()
+            .and_then(|v| v.trim().parse::<u64>().ok())
+            .unwrap_or(DEFAULT_CACHE_MAX_GB);
+        let ctx = Arc::new(WorkerCtx {
+            db,
+            dir: PathBuf::from(dir),
+            http: http.clone(),
+            max_bytes: max_gb * 1024 * 1024 * 1024,
+        });
+        for n in 0..WORKERS {
+            tokio::spawn(worker(n, rx.clone(), ctx.clone()));
+        }
+        info!(
+            "[OK] Remote ingest: {} worker(s), cache dir {} (max {} GB)",
+            WORKERS, dir, max_gb
+        );
+
+        let shared = match verify_shared_storage(&ctx.db, &ctx.dir).await {
+            Ok(true) => true,
+            Ok(false) => {
+                error!(
+                    "[ingest] AUDIO_CACHE_DIR ({}) no es el almacenamiento compartido del \
+                     resto del clúster: la ingesta queda desactivada en esta réplica",
+                    dir
+                );
+                false
+            }
+            Err(e) => {
+                error!(
+                    "[ingest] no se pudo verificar AUDIO_CACHE_DIR; ingesta desactivada: {}",
+                    e
+                );
+                false
+            }
+        };
+        Self { tx, http, shared }
+    }
+
+    /// Cola sin workers (núcleo de pruebas): todo encolado se queda sin
+    /// consumir y, al no haber receptor, se responde como cola llena.
+    #[cfg(any(test, feature = "test-util"))]
+    pub(crate) fn detached() -> Self {
+        let (tx, _rx) = mpsc::channel(1);
+        Self {
+            tx,
+            http: reqwest::Client::new(),
+            shared: false,
+        }
+    }
+}
+
+async fn worker(n: usize, rx: Arc<Mutex<mpsc::Receiver<IngestJob>>>, ctx: Arc<WorkerCtx>) {
+    loop {
+        // El lock solo dura la espera del siguiente trabajo.
+        let job = rx.lock().await.recv().await;
+        let Some(job) = job else { return };
+        let _ = sqlx::query("UPDATE remote_ingest SET status = 'working' WHERE id = ?")
+            .bind(job.id)
+            .execute(&ctx.db)
+            .await;
+        let result = process(&ctx, &job).await;
+        let stored = result.is_ok();
+        finish(&ctx.db, &job, result, n).await;
+        if stored {
+            evict_lru(&ctx, n).await;
+        }
+    }
+}
+
+/// Descarga, verifica y normaliza; devuelve la ruta final y su tamaño.
+async fn process(ctx: &WorkerCtx, job: &IngestJob) -> Result<(PathBuf, u64), String> {
+    let tmp_dir = ctx.dir.join("tmp");
+    tokio::fs::create_dir_all(&tmp_dir)
+        .await
+        .map_err(|e| format!("no se pudo crear {}: {}", tmp_dir.display(), e))?;
+    let id = track_id(job.id);
+    let part = tmp_dir.join(format!("{}.part", id));
+
+    let result = async {
+        download(&ctx.http, &job.url, &part).await?;
+        let kind = sniff_file(&part)
+            .await?
+            .ok_or_else(|| "el contenido no es audio reconocible".to_string())?;
+        normalize(&part, &ctx.dir, &id, kind).await
+    }
+    .await;
+    // Si se conservó el original, ya se movió y esto no encuentra nada.
+    let _ = tokio::fs::remove_file(&part).await;
+    result
+}
+
+async fn download(http: &reqwest::Client, url: &Url, dest: &Path) -> Result<u64, String> {
+    let resp = http
+        .get(url.clone())
+        .send()
+        .await
+        .map_err(|e| format!("descarga: {}", e))?;
+    if !resp.status().is_success() {
+        // Incluye una redirección fuera de los hosts permitidos (no se sigue).
+        return Err(format!("descarga: HTTP {}", resp.status()));
+    }
+    if resp
+        .content_length()
+        .is_some_and(|len| len > MAX_DOWNLOAD_BYTES)
+    {
+        return Err("descarga: supera el tamaño máximo".to_string());
+    }
+
+    let mut file = tokio::fs::File::create(dest)
+        .await
+        .map_err(|e| format!("disco: {}", e))?;
+    let mut stream = resp.bytes_stream();
+    let mut written: u64 = 0;
+    while let Some(chunk) = stream.next().await {
+        let chunk = chunk.map_err(|e| format!("descarga: {}", e))?;
+        written += chunk.len() as u64;
+        if written > MAX_DOWNLOAD_BYTES {
+            return Err("descarga: supera el tamaño máximo".to_string());
+        }
+        file.write_all(&chunk)
+            .await
+            .map_err(|e| format!("disco: {}", e))?;
+    }
+    file.flush().await.map_err(|e| format!("disco: {}", e))?;
+    Ok(written)
+}
+
+// -------------------------------------------------------------------------
+// VERIFICACIÓN Y NORMALIZACIÓN
+// -------------------------------------------------------------------------
+#[derive(Clone, Copy, Debug, PartialEq)]
+enum AudioKind {
+    Mp3,
+    Flac,
+    Ogg,
+    Wav,
+    M4a,
+}
+
+impl AudioKind {
+    fn ext(self) -> &'static str {
+        match self {
+            AudioKind::Mp3 => "mp3",
+            AudioKind::Flac => "flac",
+            AudioKind::Ogg => "ogg",
+            AudioKind::Wav => "wav",
+            AudioKind::M4a => "m4a",
+        }
+    }
+}
+
+/// Reconoce el contenedor por su firma, no por la extensión ni el
+/// Content-Type (una página de error HTML con 200 no pasa).
+fn sniff_audio(head: &[u8]) -> Option<AudioKind> {
+    if head.starts_with(b"ID3") {
+        return Some(AudioKind::Mp3);
+    }
+    // Sincronía de trama MPEG con capa I-III (la capa 00 es AAC/ADTS).
+    if head.len() >= 2 && head[0] == 0xFF && head[1] & 0xE0 == 0xE0 && head[1] & 0x06 != 0 {
+        return Some(AudioKind::Mp3);
+    }
+    if head.starts_with(b"fLaC") {
+        return Some(AudioKind::Flac);
+    }
+    if head.starts_with(b"OggS") {
+        return Some(AudioKind::Ogg);
+    }
+    if head.len() >= 12 && &head[..4] == b"RIFF" && &head[8..12] == b"WAVE" {
+        return Some(AudioKind::Wav);
+    }
+    if head.len() >= 8 && &head[4..8] == b"ftyp" {
+        return Some(AudioKind::M4a);
+    }
+    None
+}
+
+async fn sniff_file(path: &Path) -> Result<Option<AudioKind>, String> {
+    let mut file = tokio::fs::File::open(path)
+        .await
+        .map_err(|e| format!("disco: {}", e))?;
+    let mut head = [0u8; 12];
+    let mut filled = 0;
+    while filled < head.len() {
+        let n = file
+            .read(&mut head[filled..])
+            .await
+            .map_err(|e| format!("disco: {}", e))?;
+        if n == 0 {
+            break;
+        }
+        filled += n;
+    }
+    Ok(sniff_audio(&head[..filled]))
+}
+
+/// Avisa una sola vez de que falta ffmpeg.
+static FFMPEG_MISSING_WARNED: AtomicBool = AtomicBool::new(false);
+
+/// Con ffmpeg: decodifica entero (si falla, el audio está roto y el trabajo
+/// también), normaliza a -14 LUFS y codifica MP3 VBR → `{dir}/{id}.mp3`.
+/// Sin ffmpeg: mueve el original verificado a `{dir}/{id}.{ext}`.
+async fn normalize(
+    part: &Path,
+    dir: &Path,
+    id: &str,
+    kind: AudioKind,
+) -> Result<(PathBuf, u64), String> {
+    let ffmpeg = std::env::var("FFMPEG_BIN").unwrap_or_else(|_| "ffmpeg".to_string());
+    let tmp_out = dir.join("tmp").join(format!("{}.mp3", id));
+    let child = tokio::process::Command::new(&ffmpeg)
+        .args(["-nostdin", "-v", "error", "-y", "-i"])
+        .arg(part)
+        .args([
+            "-vn",
+            "-map_metadata",
+            "-1",
+            "-af",
+            "loudnorm=I=-14:TP=-1.5:LRA=11",
+        ])
+        .args(["-ar", "44100", "-c:a", "libmp3lame", "-q:a", "2"])
+        .arg(&tmp_out)
+        .stdin(Stdio::null())
+        .stdout(Stdio::null())
+        .stderr(Stdio::null())
+        .kill_on_drop(true)
+        .status();
+
+    let final_path = match tokio::time::timeout(FFMPEG_TIMEOUT, child).await {
+        Ok(Ok(status)) if status.success() => {
+            let out = dir.join(format!("{}.mp3", id));
+            tokio::fs::rename(&tmp_out, &out)
+                .await
+                .map_err(|e| format!("disco: {}", e))?;
+            out
+        }
+        Ok(Ok(status)) => {
+            let _ = tokio::fs::remove_file(&tmp_out).await;
+            return Err(format!("ffmpeg rechazó el audio ({})", status));
+        }
+        Ok(Err(e)) if e.kind() == std::io::ErrorKind::NotFound => {
+            if !FFMPEG_MISSING_WARNED.swap(true, Ordering::Relaxed) {
+                warn!(
+                    "[ingest] '{}' no encontrado: se guarda el original sin normalizar",
+                    ffmpeg
+                );
+            }
+            let out = dir.join(format!("{}.{}", id, kind.ext()));
+            tokio::fs::rename(part, &out)
+                .await
+                .map_err(|e| format!("disco: {}", e))?;
+            out
+        }
+        Ok(Err(e)) => return Err(format!("ffmpeg: {}", e)),
+        Err(_) => {
+            let _ = tokio::fs::remove_file(&tmp_out).await;
+            return Err("ffmpeg: tiempo agotado".to_string());
+        }
+    };
+
+    let bytes = tokio::fs::metadata(&final_path)
+        .await
+        .map_err(|e| format!("disco: {}", e))?
+        .len();
+    Ok((final_path, bytes))
+}
+
+async fn finish(db: &MySqlPool, job: &IngestJob, result: Result<(PathBuf, u64), String>, n: usize) {
+    let id = track_id(job.id);
+    match result {
+        Ok((path, bytes)) => {
+            let path = path.to_string_lossy().into_owned();
+            let stored = async {
+                sqlx::query(
+                    "INSERT INTO track_links (mbid, title, artist, cover_url, provisional_audio_path)
+                     VALUES (?, ?, ?, ?, ?)
+                     ON DUPLICATE KEY UPDATE provisional_audio_path = VALUES(provisional_audio_path)",
+                )
+                .bind(&id)
+                .bind(&job.title)
+                .bind(&job.artist)
+                .bind(&job.cover_url)
+                .bind(&path)
+                .execute(db)
+                .await?;
+                sqlx::query(
+                    "UPDATE remote_ingest
+                     SET status = 'ready', audio_path = ?, bytes = ?, error = NULL,
+                         last_served_at = CURRENT_TIMESTAMP
+                     WHERE id = ?",
+                )
+                .bind(&path)
+                .bind(bytes as i64)
+                .bind(job.id)
+                .execute(db)
+                .await
+            }
+            .await;
+            match stored {
+                Ok(_) => info!("[ingest#{}] {} listo ({} bytes)", n, id, bytes),
+                Err(e) => error!("[ingest#{}] {}: no se pudo registrar: {}", n, id, e),
+            }
+        }
+        Err(msg) => {
+            warn!("[ingest#{}] {} falló: {}", n, id, msg);
+            let _ = sqlx::query(
+                "UPDATE remote_ingest SET status = 'failed', error = LEFT(?, 255) WHERE id = ?",
+            )
+            .bind(&msg)
+            .bind(job.id)
+            .execute(db)
+            .await;
+        }
+    }
+}
+
+/// Pasa una pista 'ready' a 'evicted' (misma id: likes y playlists que
+/// apunten a `ingest-N` vuelven a sonar si alguien la reingiere). `false` si
+/// otro worker/réplica se adelantó.
+async fn claim_eviction(db: &MySqlPool, id: i64) -> bool {
+    sqlx::query(
+        "UPDATE remote_ingest SET status = 'evicted', audio_path = NULL
+         WHERE id = ? AND status = 'ready'",
+    )
+    .bind(id)
+    .execute(db)
+    .await
+    .is_ok_and(|r| r.rows_affected() > 0)
+}
+
+/// La radio deja de ofrecer una pista expulsada.
+async fn unpublish(db: &MySqlPool, id: i64) {
+    let _ = sqlx::query("UPDATE track_links SET provisional_audio_path = NULL WHERE mbid = ?")
+        .bind(track_id(id))
+        .execute(db)
+        .await;
+}
+
+/// Deja el directorio bajo `max_bytes` expulsando las pistas servidas hace
+/// más tiempo. Solo descuenta lo que de verdad sale del disco: si el fichero
+/// no se puede borrar, la fila vuelve a 'ready'.
+async fn evict_lru(ctx: &WorkerCtx, n: usize) {
+    let total = sqlx::query_scalar::<_, i64>(
+        "SELECT CAST(COALESCE(SUM(bytes), 0) AS SIGNED) FROM remote_ingest WHERE status = 'ready'",
+    )
+    .fetch_one(&ctx.db)
+    .await;
+    let mut excess = match total {
+        Ok(total) => total - ctx.max_bytes as i64,
+        Err(e) => {
+            warn!("[ingest#{}] tamaño de la caché: {}", n, e);
+            return;
+        }
+    };
+    if excess <= 0 {
+        return;
+    }
+    let victims = sqlx::query_as::<_, (i64, Option<String>, Option<i64>)>(
+        "SELECT id, audio_path, bytes FROM remote_ingest
+         WHERE status = 'ready'
+         ORDER BY last_served_at ASC, id ASC LIMIT ?",
+    )
+    .bind(EVICT_BATCH)
+    .fetch_all(&ctx.db)
+    .await
+    .unwrap_or_default();
+
+    for (id, path, bytes) in victims {
+        if excess <= 0 {
+            break;
+        }
+        // Otro worker/réplica puede estar expulsando a la vez.
+        if !claim_eviction(&ctx.db, id).await {
+            continue;
+        }
+        if let Some(path) = &path {
+            match tokio::fs::remove_file(path).await {
+                // Ausente: ya no ocupa (borrado a mano); la fila sí era basura.
+                Ok(()) => {}
+                Err(e) if e.kind() == std::io::ErrorKind::NotFound => {}
+                Err(e) => {
+                    warn!("[ingest#{}] no se pudo borrar {}: {}", n, path, e);
+                    let _ = sqlx::query(
+                        "UPDATE remote_ingest SET status = 'ready', audio_path = ?
+                         WHERE id = ? AND status = 'evicted'",
+                    )
+                    .bind(path)
+                    .bind(id)
+                    .execute(&ctx.db)
+                    .await;
+                    continue;
+                }
+            }
+        }
+        unpublish(&ctx.db, id).await;
+        let bytes = bytes.unwrap_or(0);
+        excess -= bytes;
+        info!(
+            "[ingest#{}] {} expulsada de la caché ({} bytes)",
+            n,
+            track_id(id),
+            bytes
+        );
+    }
+}
+
+// -------------------------------------------------------------------------
+// SERVIR DESDE DISCO
+// -------------------------------------------------------------------------
+/// `Range: bytes=a-b | a- | -n` sobre un fichero de `total` bytes → rango
+/// inclusivo. `Ok(None)`: sin cabecera, malformada o multi-rango (se sirve
+/// entero, como permite el RFC 9110); `Err(())`: insatisfacible → 416.
+fn parse_range(header: Option<&str>, total: u64) -> Result<Option<(u64, u64)>, ()> {
+    let Some(spec) = header.and_then(|h| h.trim().strip_prefix("bytes=")) else {
+        return Ok(None);
+    };
+    if spec.contains(',') {
+        return Ok(None);
+    }
+    let Some((start, end)) = spec.split_once('-') else {
+        return Ok(None);
+    };
+    let (start, end) = (start.trim(), end.trim());
+
+    if start.is_empty() {
+        let Ok(suffix) = end.parse::<u64>() else {
+            return Ok(None);
+        };
+        if suffix == 0 || total == 0 {
+            return Err(());
+        }
+        return Ok(Some((total.saturating_sub(suffix), total - 1)));
+    }
+
+    let Ok(start) = start.parse::<u64>() else {
+        return Ok(None);
+    };
+    if start >= total {
+        return Err(());
+    }
+    let end = if end.is_empty() {
+        total - 1
+    } else {
+        match end.parse::<u64>() {
+            Ok(end) if end >= start => end.min(total - 1),
+            _ => return Ok(None),
+        }
+    };
+    Ok(Some((start, end)))
+}
+
+fn content_type(path: &str) -> &'static str {
+    match path.rsplit_once('.').map(|(_, ext)| ext) {
+        Some("flac") => "audio/flac",
+        Some("ogg") => "audio/ogg",
+        Some("wav") => "audio/wav",
+        Some("m4a") => "audio/mp4",
+        _ => "audio/mpeg",
+    }
+}
+
+impl TidolCore {
+    /// POST /api/v1/spectra/ingest-remote — encola la descarga de una pista CC
+    /// (o informa de que ya está en disco / en curso).
+    pub async fn ingest_remote(
+        &self,
+        payload: IngestRemotePayload,
+    ) -> Result<IngestAccepted, IngestError> {
+        let source = parse_source(&payload.audio_url).ok_or(IngestError::Forbidden)?;
+        if !self.ingest.shared {
+            return Err(IngestError::Storage);
+        }
+
+        // Primario: la deduplicación no puede leer un estado atrasado.
+        let row = sqlx::query(
+            "SELECT id, status, CAST(
+                        status = 'evicted'
+                        OR (status = 'failed' AND updated_at < NOW() - INTERVAL ? MINUTE)
+                        OR (status IN ('queued', 'working') AND updated_at < NOW() - INTERVAL ? MINUTE)
+                    AS SIGNED) AS reclaimable
+             FROM remote_ingest WHERE source_key = ?",
+        )
+        .bind(RETRY_FAILED_MINUTES)
+        .bind(STALE_CLAIM_MINUTES)
+        .bind(&source.key)
+        .fetch_optional(&self.db)
+        .await
+        .map_err(|e| {
+            error!("ingest_remote: {}", e);
+            IngestError::Db
+        })?;
+
+        let existing = match row {
+            Some(r) => {
+                let id: i64 = r.try_get("id").map_err(|_| IngestError::Db)?;
+                let status: String = r.try_get("status").map_err(|_| IngestError::Db)?;
+                let reclaimable = r.try_get::<i64, _>("reclaimable").is_ok_and(|v| v != 0);
+                if status == "ready" {
+                    return Ok(IngestAccepted {
+                        success: true,
+                        already_exists: true,
+                        track_id: track_id(id),
+                        status,
+                        local_url: Some(local_url(id)),
+                    });
+                }
+                if !reclaimable {
+                    return Ok(pending(id, status));
+                }
+                Some(id)
+            }
+            None => None,
+        };
+
+        // Hueco en la cola antes de reclamar: con la cola llena no queda
+        // ninguna fila marcada 'queued' que nadie vaya a procesar.
+        let permit = self
+            .ingest
+            .tx
+            .try_reserve()
+            .map_err(|_| IngestError::Full)?;
+
+        // Licencia y metadatos del proveedor antes de reclamar la fila.
+        let meta = verify_source(&self.db, &self.ingest.http, &source).await?;
+
+        let id = match existing {
+            Some(id) => {
+                let claimed = sqlx::query(
+                    "UPDATE remote_ingest
+                     SET status = 'queued', source_url = ?, error = NULL
+                     WHERE id = ?
+                       AND (status = 'evicted'
+                         OR (status = 'failed' AND updated_at < NOW() - INTERVAL ? MINUTE)
+                         OR (status IN ('queued', 'working') AND updated_at < NOW() - INTERVAL ? MINUTE))",
+                )
+                .bind(source.url.as_str())
+                .bind(id)
+                .bind(RETRY_FAILED_MINUTES)
+                .bind(STALE_CLAIM_MINUTES)
+                .execute(&self.db)
+                .await
+                .map_err(|_| IngestError::Db)?;
+                if claimed.rows_affected() == 0 {
+                    // Otra petición/réplica lo reclamó entre medias.
+                    return Ok(pending(id, "queued".to_string()));
+                }
+                id
+            }
+            None => {
+                let inserted = sqlx::query(
+                    "INSERT IGNORE INTO remote_ingest (source_key, source_url, status)
+                     VALUES (?, ?, 'queued')",
+                )
+                .bind(&source.key)
+                .bind(source.url.as_str())
+                .execute(&self.db)
+                .await
+                .map_err(|_| IngestError::Db)?;
+                if inserted.rows_affected() == 0 {
+                    let id: i64 =
+                        sqlx::query_scalar("SELECT id FROM remote_ingest WHERE source_key = ?")
+                            .bind(&source.key)
+                            .fetch_one(&self.db)
+                            .await
+                            .map_err(|_| IngestError::Db)?;
+                    return Ok(pending(id, "queued".to_string()));
+                }
+                inserted.last_insert_id() as i64
+            }
+        };
+
+        permit.send(IngestJob {
+            id,
+            url: source.url,
+            title: meta.title,
+            artist: meta.artist,
+            cover_url: meta.cover_url,
+        });
+        Ok(pending(id, "queued".to_string()))
+    }
+
+    /// GET /api/v1/audio/:track_id — abre una pista ingerida para servirla,
+    /// respetando `Range` (los `<audio>` piden rangos para buscar).
+    pub async fn open_ingested_audio(
+        &self,
+        track_id: &str,
+        range: Option<&str>,
+    ) -> Result<IngestedAudio, AudioError> {
+        let id: i64 = track_id
+            .strip_prefix("ingest-")
+            .and_then(|n| n.parse().ok())
+            .ok_or(AudioError::NotFound)?;
+        // Primario: recién terminada, una réplica atrasada daría 404.
+        let path = sqlx::query_scalar::<_, Option<String>>(
+            "SELECT audio_path FROM remote_ingest WHERE id = ? AND status = 'ready'",
+        )
+        .bind(id)
+        .fetch_optional(&self.db)
+        .await
+        .ok()
+        .flatten()
+        .flatten();
+        let path = path.ok_or(AudioError::NotFound)?;
+        // Orden LRU de la caché; los `Range` de una misma escucha no escriben.
+        let _ = sqlx::query(
+            "UPDATE remote_ingest SET last_served_at = CURRENT_TIMESTAMP
+             WHERE id = ? AND (last_served_at IS NULL OR last_served_at < NOW() - INTERVAL ? MINUTE)",
+        )
+        .bind(id)
+        .bind(TOUCH_MINUTES)
+        .execute(&self.db)
+        .await;
+
+        let mut file = match tokio::fs::File::open(&path).await {
+            Ok(f) => f,
+            Err(e) => {
+                // Fila 'ready' sin fichero en el almacenamiento compartido: se
+                // da por expulsada para que la próxima ingesta la descargue de
+                // nuevo. Sin almacenamiento verificado el fichero puede existir
+                // en el de otra réplica: no se toca la fila.
+                if e.kind() == std::io::ErrorKind::NotFound
+                    && self.ingest.shared
+                    && claim_eviction(&self.db, id).await
+                {
+                    warn!(
+                        "[ingest] {} sin fichero ({}): marcada 'evicted'",
+                        track_id, path
+                    );
+                    unpublish(&self.db, id).await;
+                }
+                return Err(AudioError::NotFound);
+            }
+        };
+        let total = file
+            .metadata()
+            .await
+            .map_err(|_| AudioError::NotFound)?
+            .len();
+        let range = parse_range(range, total).map_err(|_| AudioError::Unsatisfiable(total))?;
+        let (start, len) = match range {
+            Some((start, end)) => (start, end - start + 1),
+            None => (0, total),
+        };
+        if start > 0 {
+            file.seek(std::io::SeekFrom::Start(start))
+                .await
+                .map_err(|_| AudioError::NotFound)?;
+        }
+        Ok(IngestedAudio {
+            body: ReaderStream::new(file.take(len)),
+            content_type: content_type(&path),
+            total,
+            range,
+        })
+    }
+}
+
+fn pending(id: i64, status: String) -> IngestAccepted {
+    IngestAccepted {
+        success: true,
+        already_exists: false,
+        track_id: track_id(id),
+        status,
+        local_url: None,
+    }
+}
+
+/// Título/artista del proveedor salvo vacío o "Unknown" (que además
+/// dispararía `hydrate_unknown_tracks` con un id que no es un MBID).
+fn metadata_or(value: Option<String>, fallback: String) -> String {
+    let value = value
+        .map(|v| v.trim().to_string())
+        .filter(|v| !v.is_empty() && v != "Unknown")
+        .unwrap_or(fallback);
+    value.chars().take(255).collect()
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn fuentes_de_internet_archive() {
+        let s = parse_source("https://archive.org/download/gd1977-05-08/track01.mp3").unwrap();
+        assert_eq!(s.key, "ia:gd1977-05-08/track01.mp3");
+        assert_eq!(s.fallback_title, "track01");
+
+        let s = parse_source("https://ia800305.us.archive.org/download/id/disc%201/01_Intro.flac")
+            .unwrap();
+        assert_eq!(s.key, "ia:id/disc%201/01_Intro.flac");
+        assert_eq!(s.fallback_title, "01 Intro");
+
+        // Misma pista por otro nodo/esquema → misma clave y misma URL de
+        // descarga (deduplica).
+        let a = parse_source("http://archive.org/download/x/a.mp3").unwrap();
+        let b = parse_source("https://ia601.us.archive.org/download/x/a.mp3?x=1").unwrap();
+        assert_eq!(a.key, b.key);
+        assert_eq!(a.url, b.url);
+        assert_eq!(a.url.as_str(), "https://archive.org/download/x/a.mp3");
+        assert_eq!(
+            a.provider,
+            Provider::Archive {
+                identifier: "x".into()
+            }
+        );
+    }
+
+    #[test]
+    fn fuentes_de_jamendo() {
+        let s = parse_source(
+            "https://prod-1.storage.jamendo.com/?trackid=1532771&format=mp31&from=app-tidol",
+        )
+        .unwrap();
+        assert_eq!(s.key, "jamendo:1532771");
+        // Se descarga de la URL canónica, no de la que manda el cliente.
+        let s = parse_source("https://www.jamendo.com/?trackid=42&format=../x").unwrap();
+        assert_eq!(
+            s.url.as_str(),
+            "https://prod-1.storage.jamendo.com/?trackid=42&format=mp32&from=app-tidol"
+        );
+        assert!(parse_source("https://prod-1.storage.jamendo.com/?trackid=abc").is_none());
+        assert!(parse_source("https://prod-1.storage.jamendo.com/?format=mp31").is_none());
+    }
+
+    #[test]
+    fn rechaza_fuentes_no_permitidas() {
+        for url in [
+            "https://evil.com/download/x/a.mp3",
+            "https://archive.org.evil.com/download/x/a.mp3",
+            "https://notarchive.org/download/x/a.mp3",
+            "https://archive.org/details/x",
+            "https://archive.org/download/x",
+            "https://archive.org/download/x/",
+            "https://archive.org:8080/download/x/a.mp3",
+            "https://u:p@archive.org/download/x/a.mp3",
+            "ftp://archive.org/download/x/a.mp3",
+            "file:///etc/passwd",
+            "no es una url",
+        ] {
+            assert!(parse_source(url).is_none(), "aceptó {url}");
+        }
+        assert!(allowed_host("ia800305.us.archive.org"));
+        assert!(!allowed_host("archive.org.evil.com"));
+    }
+
+    #[test]
+    fn firmas_de_audio() {
+        assert_eq!(
+            sniff_audio(b"ID3\x04\0\0\0\0\0\0\0\0"),
+            Some(AudioKind::Mp3)
+        );
+        assert_eq!(sniff_audio(&[0xFF, 0xFB, 0x90, 0x64]), Some(AudioKind::Mp3));
+        assert_eq!(sniff_audio(b"fLaC\0\0\0\x22"), Some(AudioKind::Flac));
+        assert_eq!(sniff_audio(b"OggS\0\x02"), Some(AudioKind::Ogg));
+        assert_eq!(sniff_audio(b"RIFF\x24\0\0\0WAVEfmt "), Some(AudioKind::Wav));
+        assert_eq!(sniff_audio(b"\0\0\0\x20ftypM4A "), Some(AudioKind::M4a));
+        // ADTS (capa 00), HTML y vacío no pasan.
+        assert_eq!(sniff_audio(&[0xFF, 0xF1, 0x50, 0x80]), None);
+        assert_eq!(sniff_audio(b"<!DOCTYPE html>"), None);
+        assert_eq!(sniff_audio(b""), None);
+    }
+
+    #[test]
+    fn rangos() {
+        assert_eq!(parse_range(None, 1000), Ok(None));
+        assert_eq!(parse_range(Some("bytes=0-499"), 1000), Ok(Some((0, 499))));
+        assert_eq!(parse_range(Some("bytes=500-"), 1000), Ok(Some((500, 999))));
+        assert_eq!(parse_range(Some("bytes=-200"), 1000), Ok(Some((800, 999))));
+        assert_eq!(parse_range(Some("bytes=-5000"), 1000), Ok(Some((0, 999))));
+        assert_eq!(
+            parse_range(Some("bytes=900-5000"), 1000),
+            Ok(Some((900, 999)))
+        );
+        // Ignorables: se sirve entero.
+        assert_eq!(parse_range(Some("bytes=0-1,5-9"), 1000), Ok(None));
+        assert_eq!(parse_range(Some("items=0-1"), 1000), Ok(None));
+        assert_eq!(parse_range(Some("bytes=9-3"), 1000), Ok(None));
+        // Insatisfacibles.
+        assert_eq!(parse_range(Some("bytes=1000-"), 1000), Err(()));
+        assert_eq!(parse_range(Some("bytes=-0"), 1000), Err(()));
+        assert_eq!(parse_range(Some("bytes=0-"), 0), Err(()));
+    }
+
+    #[test]
+    fn licencia_y_metadatos_del_proveedor() {
+        let ia = serde_json::json!({ "metadata": {
+            "title": "Live 1977",
+            "creator": ["Grateful Dead", "Otro"],
+            "licenseurl": "http://creativecommons.org/licenses/by-nc-sa/3.0/",
+        }});
+        assert_eq!(
+            archive_meta(&ia),
+            Some(("Live 1977".to_string(), "Grateful Dead".to_string()))
+        );
+        // Sin licencia legal, o ítem inexistente (`{}`).
+        let sin = serde_json::json!({ "metadata": { "title": "x", "licenseurl": "" } });
+        assert_eq!(archive_meta(&sin), None);
+        assert_eq!(archive_meta(&serde_json::json!({})), None);
+
+        let jam = |results: serde_json::Value| serde_json::json!({ "headers": { "status": "success" }, "results": results });
+        let ok = jam(serde_json::json!([{
+            "name": "Tema",
+            "artist_name": "Autora",
+            "image": "https://usercontent.jamendo.com/x.jpg",
+            "license_ccurl": "http://creativecommons.org/licenses/by/3.0/",
+        }]));
+        assert_eq!(
+            jamendo_meta(&ok).unwrap(),
+            (
+                "Tema".to_string(),
+                "Autora".to_string(),
+                Some("https://usercontent.jamendo.com/x.jpg".to_string())
+            )
+        );
+        assert!(matches!(
+            jamendo_meta(&jam(serde_json::json!([]))),
+            Err(IngestError::Forbidden)
+        ));
+        assert!(matches!(
+            jamendo_meta(&serde_json::json!({ "headers": { "status": "failed" } })),
+            Err(IngestError::Unverified)
+        ));
+    }
+
+    #[test]
+    fn metadatos_por_defecto() {
+        assert_eq!(metadata_or(Some("Unknown".into()), "x".into()), "x");
+        assert_eq!(metadata_or(Some("  ".into()), "x".into()), "x");
+        assert_eq!(metadata_or(None, "x".into()), "x");
+        assert_eq!(metadata_or(Some(" Tema ".into()), "x".into()), "Tema");
+        assert_eq!(metadata_or(Some("a".repeat(300)), "x".into()).len(), 255);
+    }
+
+    #[test]
+    fn respuesta_en_camel_case() {
+        let v = serde_json::to_value(pending(7, "queued".into())).unwrap();
+        assert_eq!(v["trackId"], "ingest-7");
+        assert_eq!(v["alreadyExists"], false);
+        assert_eq!(v["success"], true);
+    }
+}
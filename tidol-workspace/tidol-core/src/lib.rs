@@ -7,7 +7,9 @@
 // dominio). El transporte HTTP vive en el binario `tidol-server`.
 // =========================================================================
 pub mod config;
+pub mod db_router;
 pub mod error;
+pub mod events;
 pub mod lyrics;
 pub mod models;
 pub mod orchestrator;
@@ -18,8 +20,13 @@ pub mod proxy;
 // mismo crate). Cada módulo aporta sus métodos + tipos de dominio/errores.
 mod auth;
 mod catalog;
+mod ingest;
 mod library;
+mod like_sync;
+#[cfg(feature = "local-library")]
+mod local_library;
 mod media;
+mod suggest;
 mod user_data;
 
 use std::sync::Arc;
@@ -29,7 +36,9 @@ use sqlx::MySqlPool;
 use tracing::{info, warn};
 
 use config::CoreConfig;
+use db_router::DbRouter;
 use error::TidolError;
+use events::EventBus;
 use lyrics::DynamicLyricsProvider;
 use orchestrator::MetadataOrchestrator;
 use providers::ProviderOrchestrator;
@@ -41,14 +50,29 @@ pub use auth::{
     MeError, RegisterError, RegisterPayload,
 };
 pub use catalog::{normalize_query, LogPlayPayload, LyricsError, TrackClickPayload};
+pub use ingest::{
+    AudioError, IngestAccepted, IngestError, IngestMetadata, IngestRemotePayload, IngestedAudio,
+};
 pub use library::SearchQuery;
+pub use like_sync::{LikeBatchError, LikeBatchPayload, LikeOp, LikeSyncQuery};
+#[cfg(feature = "local-library")]
+pub use local_library::{ImportProgress, ImportReport};
 pub use media::{Colors, ColorsResponse, CoverOutcome, ExtractColorsPayload, OptimizeError};
+pub use suggest::SuggestQuery;
 pub use user_data::{
     json_id_to_string, AddHistoryPayload, AddSongError, AddSongToPlaylistPayload,
-    CreatePlaylistPayload, LikesDetailedQuery, RenameError, RenamePlaylistPayload, ReorderError,
-    ReorderPlaylistPayload, ToggleIaLikeError, ToggleLikePayload, TogglePlaylistLikeError,
+    CreatePlaylistPayload, LikesDetailedQuery, PageError, PageQuery, RenameError,
+    RenamePlaylistPayload, ReorderError, ReorderPlaylistPayload, ToggleIaLikeError,
+    ToggleLikePayload, TogglePlaylistLikeError,
 };
 
+/// Lock con nombre de MariaDB que elige al único rastreador del espejo CC/PD.
+const CC_MIRROR_LOCK: &str = "tidol_cc_mirror_sync";
+
+/// Cada cuánto el líder comprueba que sigue teniendo el lock y los demás
+/// intentan tomarlo.
+const CC_MIRROR_LEADER_CHECK: std::time::Duration = std::time::Duration::from_secs(300);
+
 // -------------------------------------------------------------------------
 // ESTADO / NÚCLEO DE DOMINIO
 // -------------------------------------------------------------------------
@@ -56,13 +80,26 @@ pub use user_data::{
 /// plugin de letras, el orquestador de metadatos y el orquestador de embeds.
 /// El binario lo envuelve en `Arc` dentro de su `AppState`.
 pub struct TidolCore {
+    /// Primario: escrituras y lecturas que deben ver lo recién escrito.
     pub(crate) db: MySqlPool,
+    /// Reparto de lecturas tolerantes al retraso entre réplicas (db_router.rs).
+    pub(crate) router: DbRouter,
     #[allow(dead_code)]
     pub(crate) rotator: Arc<ProxyRotator>,
     #[allow(dead_code)]
     pub(crate) lyrics_provider: Arc<Option<DynamicLyricsProvider>>,
     pub(crate) orchestrator: Arc<MetadataOrchestrator>,
     pub(crate) embed_orchestrator: Arc<ProviderOrchestrator>,
+    /// Eventos de progreso (letra/portada/prefetch) para el canal SSE.
+    pub(crate) events: EventBus,
+    /// Conjuntos de likes de los usuarios activos (ver like_sync.rs).
+    pub(crate) like_sets: like_sync::LikeSets,
+    /// Detalle de álbum / perfil de artista pre-serializados (catalog.rs).
+    pub(crate) catalog_json: catalog::CatalogJsonCache,
+    /// Cola de ingesta remota de pistas CC (ingest.rs).
+    pub(crate) ingest: ingest::IngestQueue,
+    /// Índice de sugerencias de búsqueda en memoria (suggest.rs).
+    pub(crate) suggest: Arc<suggest::SuggestIndex>,
     #[allow(dead_code)]
     pub(crate) config: CoreConfig,
 }
@@ -117,6 +154,39 @@ impl TidolCore {
         .execute(&pool)
         .await?;
 
+        // Resumen desnormalizado de playlists e índices de los listados
+        // paginados (tras el backfill de position: la portada depende de él).
+        user_data::ensure_library_schema(&pool).await?;
+
+        // Versión + log de cambios de likes (sincronización incremental).
+        like_sync::ensure_schema(&pool).await?;
+
+        // Espejo local del catálogo CC/PD (búsqueda/resolve sin salir a upstream).
+        providers::cc_mirror::CcMirror::ensure_schema(&pool).await?;
+
+        // Trabajos de ingesta remota (caché local de pistas CC).
+        ingest::ensure_schema(&pool).await?;
+
+        // Réplicas de lectura: una medición antes de servir para no arrancar
+        // con todo al primario durante el primer ciclo del vigilante.
+        let router = DbRouter::new(
+            pool.clone(),
+            &config.database_replica_urls,
+            config.database_max_connections,
+            config.replica_max_lag_secs,
+        )?;
+        if config.database_replica_urls.is_empty() {
+            info!("[CONFIG] DATABASE_REPLICA_URLS not set, all reads go to the primary");
+        } else {
+            router.poll_lag().await;
+            router.spawn_lag_monitor();
+            info!(
+                "[OK] {} read replica(s) configured (max lag {}s)",
+                config.database_replica_urls.len(),
+                config.replica_max_lag_secs
+            );
+        }
+
         // Proxy rotator (still useful for outbound API calls)
         let rotator = Arc::new(
             ProxyRotator::new(config.proxy_pool.clone())
@@ -172,17 +242,44 @@ impl TidolCore {
         }
 
         // Internet Archive (always available, legal CC/PD content)
-        embed_providers.push(Box::new(providers::archive::ArchiveProvider::new()));
-        info!("[OK] Internet Archive provider initialized (CC/PD content only)");
+        embed_providers.push(Box::new(providers::archive::ArchiveProvider::with_mirror(
+            providers::cc_mirror::CcMirror::new(pool.clone()),
+        )));
+        info!("[OK] Internet Archive provider initialized (CC/PD content only, local mirror)");
 
         let embed_orchestrator = Arc::new(ProviderOrchestrator::new(embed_providers));
 
+        // ─── EVENTOS DE PROGRESO (SSE; Redis pub/sub entre réplicas) ───
+        let events = EventBus::new();
+        match config.redis_url.as_deref() {
+            #[cfg(feature = "redis-events")]
+            Some(url) => match events.connect_redis(url).await {
+                Ok(()) => info!("[OK] Worker events relayed through Redis pub/sub"),
+                Err(e) => warn!("[WARN] {}; worker events stay local to this replica", e),
+            },
+            #[cfg(not(feature = "redis-events"))]
+            Some(_) => warn!("[WARN] REDIS_URL set but built without 'redis-events'; events stay local"),
+            None => info!("[CONFIG] REDIS_URL not set, worker events stay local"),
+        }
+
+        let ingest = ingest::IngestQueue::start(pool.clone(), &config.audio_cache_dir).await;
+
+        // Sugerencias de búsqueda: se cargan de searchClicks en segundo plano.
+        let suggest = Arc::new(suggest::SuggestIndex::new());
+        suggest.spawn_rebuild(router.clone());
+
         Ok(Self {
             db: pool,
+            router,
             rotator,
             lyrics_provider: Arc::new(lyrics_provider),
-            orchestrator: Arc::new(MetadataOrchestrator::new()),
+            orchestrator: Arc::new(MetadataOrchestrator::new(events.clone())),
             embed_orchestrator,
+            events,
+            like_sets: like_sync::LikeSets::new(),
+            catalog_json: catalog::CatalogJsonCache::new(),
+            ingest,
+            suggest,
             config,
         })
     }
@@ -206,16 +303,29 @@ impl TidolCore {
                 .expect("proxy_pool de prueba no vacío"),
         );
 
+        let events = EventBus::new();
         Self {
+            router: DbRouter::primary_only(pool.clone()),
             db: pool,
             rotator,
             lyrics_provider: Arc::new(None),
-            orchestrator: Arc::new(MetadataOrchestrator::new()),
+            orchestrator: Arc::new(MetadataOrchestrator::new(events.clone())),
             embed_orchestrator: Arc::new(ProviderOrchestrator::new(Vec::new())),
+            events,
+            like_sets: like_sync::LikeSets::new(),
+            catalog_json: catalog::CatalogJsonCache::new(),
+            ingest: ingest::IngestQueue::detached(),
+            suggest: Arc::new(suggest::SuggestIndex::new()),
             config,
         }
     }
 
+    /// Suscripción al canal de eventos de progreso; el binario la filtra por
+    /// usuario/pistas con `events::Subscription` y la sirve por SSE.
+    pub fn subscribe_events(&self) -> tokio::sync::broadcast::Receiver<models::WorkerEvent> {
+        self.events.subscribe()
+    }
+
     /// Tarea de fondo: rellena pistas "Unknown" en track_links resolviéndolas
     /// contra el orquestador de metadatos (con throttling).
     pub async fn hydrate_unknown_tracks(&self) {
@@ -241,11 +351,84 @@ impl TidolCore {
         for row in unknown_tracks {
             let _ = self
                 .orchestrator
-                .resolve_full_track(&row.mbid, &self.db)
+                .resolve_full_track(&row.mbid, &db_router::DbRoute::primary(&self.db))
                 .await;
             tokio::time::sleep(std::time::Duration::from_millis(1500)).await;
         }
 
         info!("[Ghost Cleaner] Track hydration complete.");
     }
+
+    /// Tarea de fondo: rastreador del espejo CC/PD (`cc_catalog`). Cada
+    /// `cc_mirror_sync_hours` lista lo más descargado de las colecciones legales
+    /// de Internet Archive y precalcula el mejor stream de los ítems pendientes
+    /// o caducados. `cc_mirror_sync_hours == 0` lo deshabilita.
+    ///
+    /// Con varias instancias solo rastrea una: la que tiene el lock con nombre
+    /// `CC_MIRROR_LOCK` de MariaDB. El lock vive lo que su conexión (apartada
+    /// del pool), así que si el líder cae otra instancia toma el relevo.
+    pub async fn sync_cc_mirror(&self) {
+        let hours = self.config.cc_mirror_sync_hours;
+        if hours == 0 {
+            info!("[cc_mirror] Sync disabled (CC_MIRROR_SYNC_HOURS=0).");
+            return;
+        }
+        let provider = providers::archive::ArchiveProvider::with_mirror(
+            providers::cc_mirror::CcMirror::new(self.db.clone()),
+        );
+        loop {
+            let Some(mut lock) = self.cc_mirror_lock().await else {
+                tokio::time::sleep(CC_MIRROR_LEADER_CHECK).await;
+                continue;
+            };
+            info!("[cc_mirror] This instance runs the sync (holds the leader lock).");
+            'leader: loop {
+                match provider.sync_mirror(500, 2000, hours * 7).await {
+                    Ok(r) => info!(
+                        "[cc_mirror] Sync pass: {} listed, {} resolved, {} rejected",
+                        r.listed, r.resolved, r.rejected
+                    ),
+                    Err(e) => warn!("[cc_mirror] Sync pass failed: {}", e),
+                }
+                // La espera se trocea para comprobar el lock (y mantener viva su
+                // conexión frente a `wait_timeout`).
+                let checks = (hours * 3600).div_ceil(CC_MIRROR_LEADER_CHECK.as_secs());
+                for _ in 0..checks {
+                    tokio::time::sleep(CC_MIRROR_LEADER_CHECK).await;
+                    if !holds_lock(&mut lock).await {
+                        warn!("[cc_mirror] Leader lock lost; re-electing.");
+                        break 'leader;
+                    }
+                }
+            }
+        }
+    }
+
+    /// Conexión con el lock del rastreador, o `None` si lo tiene otra instancia.
+    async fn cc_mirror_lock(&self) -> Option<sqlx::MySqlConnection> {
+        let mut conn = match self.db.acquire().await {
+            Ok(conn) => conn.detach(),
+            Err(e) => {
+                warn!("[cc_mirror] Leader election: no connection ({})", e);
+                return None;
+            }
+        };
+        let got: Option<i64> = sqlx::query_scalar("SELECT GET_LOCK(?, 0)")
+            .bind(CC_MIRROR_LOCK)
+            .fetch_one(&mut conn)
+            .await
+            .ok()
+            .flatten();
+        (got == Some(1)).then_some(conn)
+    }
+}
+
+/// `true` si la conexión sigue siendo la dueña de `CC_MIRROR_LOCK`.
+async fn holds_lock(conn: &mut sqlx::MySqlConnection) -> bool {
+    let owner: Result<Option<i64>, _> =
+        sqlx::query_scalar("SELECT IS_USED_LOCK(?) = CONNECTION_ID()")
+            .bind(CC_MIRROR_LOCK)
+            .fetch_one(conn)
+            .await;
+    matches!(owner, Ok(Some(1)))
 }
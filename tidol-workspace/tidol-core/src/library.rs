@@ -20,7 +20,7 @@ impl TidolCore {
             LIMIT 50
             "#
         )
-        .fetch_all(&self.db)
+        .fetch_all(self.router.reader())
         .await?;
 
         let albums = rows
@@ -55,7 +55,7 @@ impl TidolCore {
             "#,
             id
         )
-        .fetch_optional(&self.db)
+        .fetch_optional(self.router.reader())
         .await?;
 
         Ok(r.map(|r| {
@@ -84,7 +84,7 @@ impl TidolCore {
             "#,
             id
         )
-        .fetch_all(&self.db)
+        .fetch_all(self.router.reader())
         .await
         .unwrap_or_default();
 
@@ -118,7 +118,7 @@ impl TidolCore {
             "#,
             format!("%{}%", name_query)
         )
-        .fetch_optional(&self.db)
+        .fetch_optional(self.router.reader())
         .await?;
 
         Ok(r.map(|r| ArtistResponse {
@@ -140,7 +140,7 @@ impl TidolCore {
             "#,
             id
         )
-        .fetch_optional(&self.db)
+        .fetch_optional(self.router.reader())
         .await?;
 
         Ok(r.map(|r| ArtistResponse {
@@ -159,7 +159,7 @@ impl TidolCore {
             "#,
             id
         )
-        .fetch_all(&self.db)
+        .fetch_all(self.router.reader())
         .await
         .unwrap_or_default();
 
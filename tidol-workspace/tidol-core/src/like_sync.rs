@@ -0,0 +1,455 @@
+// =========================================================================
+// Sincronización incremental de likes
+//
+// El frontend colorea cada corazón con el conjunto de ids que le gustan al
+// usuario; antes lo montaba descargando las listas completas (local + IA) en
+// cada arranque, y cada like/unlike era una petición suelta. Ahora:
+//
+// - `user_like_versions` lleva un contador por usuario que sube una vez por
+//   cada escritura que cambia algo (un lote entero comparte versión).
+// - `user_like_log` guarda el ÚLTIMO cambio de cada pista (una fila por pista
+//   tocada, con su versión), así que "qué cambió desde N" es una lectura por
+//   índice que crece con los cambios, no con el tamaño de la colección.
+// - `LikeSets` mantiene en memoria el conjunto vigente de los usuarios
+//   activos y lo pone al día aplicando solo el log posterior a su versión; con
+//   varias réplicas escribiendo sigue siendo correcto porque la versión
+//   autoritativa siempre se lee de la BD.
+// =========================================================================
+use std::collections::HashSet;
+use std::sync::Arc;
+use std::time::Duration;
+
+use moka::future::Cache;
+use serde::Deserialize;
+use sqlx::{MySql, MySqlPool, Transaction};
+
+use crate::error::TidolResult;
+use crate::TidolCore;
+
+/// Máximo de operaciones por lote (`POST /api/v1/music/likes/batch`).
+const MAX_BATCH_OPS: usize = 500;
+
+/// Presupuesto de la caché en ids (no en usuarios): un usuario con 5 000
+/// likes pesa como 5 000 con uno. Los inactivos salen por `IDLE_TTL`.
+const CACHE_MAX_IDS: u64 = 2_000_000;
+const IDLE_TTL: Duration = Duration::from_secs(30 * 60);
+
+// -------------------------------------------------------------------------
+// PAYLOADS
+// -------------------------------------------------------------------------
+/// `GET /api/v1/music/likes/sync?since=N`. Sin `since` (o 0) → conjunto completo.
+#[derive(Deserialize)]
+pub struct LikeSyncQuery {
+    pub since: Option<i64>,
+}
+
+/// Una operación del lote. `source`: 'local' (por defecto) o 'archive'; solo
+/// importa al dar like (quitarlo borra el like sea cual sea su fuente).
+#[derive(Deserialize, Clone)]
+pub struct LikeOp {
+    pub id: String,
+    pub source: Option<String>,
+    pub liked: bool,
+}
+
+#[derive(Deserialize)]
+pub struct LikeBatchPayload {
+    pub ops: Vec<LikeOp>,
+}
+
+/// `Invalid` → 400 "Lote inválido" (vacío, > MAX_BATCH_OPS o id vacío);
+/// `Db` → 500 "Error DB" (nada se aplica: el lote es una transacción).
+#[derive(Debug)]
+pub enum LikeBatchError {
+    Invalid,
+    Db,
+}
+
+impl LikeOp {
+    fn source(&self) -> &'static str {
+        match self.source.as_deref() {
+            None | Some("local") => "local",
+            Some(_) => "archive",
+        }
+    }
+}
+
+// -------------------------------------------------------------------------
+// CONJUNTO EN MEMORIA
+// -------------------------------------------------------------------------
+/// Likes vigentes de un usuario en una versión dada.
+#[derive(Clone, Default, Debug, PartialEq)]
+pub(crate) struct LikeSet {
+    pub(crate) version: i64,
+    pub(crate) local: HashSet<Box<str>>,
+    pub(crate) archive: HashSet<Box<str>>,
+}
+
+impl LikeSet {
+    /// Aplica un cambio del log. Idempotente: fija el estado de la pista, no
+    /// lo alterna, así que re-aplicar un cambio ya visto no lo estropea.
+    fn apply(&mut self, track_id: &str, source: &str, liked: bool) {
+        self.local.remove(track_id);
+        self.archive.remove(track_id);
+        if liked {
+            let set = if source == "local" {
+                &mut self.local
+            } else {
+                &mut self.archive
+            };
+            set.insert(track_id.into());
+        }
+    }
+
+    fn len(&self) -> usize {
+        self.local.len() + self.archive.len()
+    }
+}
+
+/// Caché de `LikeSet` por usuario. Barata de clonar.
+#[derive(Clone)]
+pub(crate) struct LikeSets {
+    cache: Cache<i64, Arc<LikeSet>>,
+}
+
+impl LikeSets {
+    pub(crate) fn new() -> Self {
+        Self {
+            cache: Cache::builder()
+                .max_capacity(CACHE_MAX_IDS)
+                .weigher(|_, set: &Arc<LikeSet>| (set.len() as u32).saturating_add(1))
+                .time_to_idle(IDLE_TTL)
+                .build(),
+        }
+    }
+}
+
+// -------------------------------------------------------------------------
+// ESQUEMA
+// -------------------------------------------------------------------------
+/// Ver migrations/007_like_sync.sql y 010_like_versions_seed.sql. Los likes
+/// anteriores no tienen log; a sus dueños se les siembra la versión 1 para
+/// que, tras la primera sincronización completa, el cliente pase a pedir solo
+/// cambios (con versión 0 recibiría el conjunto entero en cada arranque).
+pub(crate) async fn ensure_schema(db: &MySqlPool) -> Result<(), sqlx::Error> {
+    sqlx::query(
+        "CREATE TABLE IF NOT EXISTS user_like_versions (
+            user_id BIGINT NOT NULL,
+            version BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id),
+            CONSTRAINT fk_user_like_versions_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+    )
+    .execute(db)
+    .await?;
+    sqlx::query(
+        "CREATE TABLE IF NOT EXISTS user_like_log (
+            user_id  BIGINT       NOT NULL,
+            track_id VARCHAR(255) NOT NULL,
+            source   VARCHAR(50)  NOT NULL DEFAULT 'local',
+            liked    TINYINT(1)   NOT NULL,
+            version  BIGINT       NOT NULL,
+            PRIMARY KEY (user_id, track_id),
+            KEY idx_user_like_log_version (user_id, version),
+            CONSTRAINT fk_user_like_log_user FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+    )
+    .execute(db)
+    .await?;
+    // Solo encuentra filas la primera vez: después todo usuario con likes ya
+    // tiene versión (la crea `apply_ops`).
+    sqlx::query(
+        "INSERT IGNORE INTO user_like_versions (user_id, version)
+         SELECT DISTINCT ul.user_id, 1 FROM user_likes ul
+         LEFT JOIN user_like_versions v ON v.user_id = ul.user_id
+         WHERE v.user_id IS NULL",
+    )
+    .execute(db)
+    .await?;
+    Ok(())
+}
+
+// -------------------------------------------------------------------------
+// ESCRITURA (dentro de la transacción del llamador)
+// -------------------------------------------------------------------------
+/// Aplica `ops` a `user_likes` y, si alguna cambió algo, sube la versión una
+/// vez y anota cada cambio en el log. Devuelve (versión, nº de cambios).
+///
+/// El `UPDATE` de la versión va al final y bloquea la fila del usuario hasta el
+/// commit: dos escrituras concurrentes del mismo usuario obtienen versiones
+/// distintas y se hacen visibles en ese mismo orden.
+pub(crate) async fn apply_ops(
+    tx: &mut Transaction<'_, MySql>,
+    user_id: i64,
+    ops: &[LikeOp],
+) -> Result<(i64, usize), sqlx::Error> {
+    let mut changed: Vec<&LikeOp> = Vec::new();
+    for op in ops {
+        let res = if op.liked {
+            sqlx::query(
+                "INSERT IGNORE INTO user_likes (user_id, track_id, source) VALUES (?, ?, ?)",
+            )
+            .bind(user_id)
+            .bind(&op.id)
+            .bind(op.source())
+            .execute(&mut **tx)
+            .await?
+        } else {
+            sqlx::query("DELETE FROM user_likes WHERE user_id = ? AND track_id = ?")
+                .bind(user_id)
+                .bind(&op.id)
+                .execute(&mut **tx)
+                .await?
+        };
+        if res.rows_affected() > 0 {
+            changed.push(op);
+        }
+    }
+
+    if changed.is_empty() {
+        let version =
+            sqlx::query_as::<_, (i64,)>("SELECT version FROM user_like_versions WHERE user_id = ?")
+                .bind(user_id)
+                .fetch_optional(&mut **tx)
+                .await?
+                .map_or(0, |(v,)| v);
+        return Ok((version, 0));
+    }
+
+    sqlx::query(
+        "INSERT INTO user_like_versions (user_id, version) VALUES (?, 1)
+         ON DUPLICATE KEY UPDATE version = version + 1",
+    )
+    .bind(user_id)
+    .execute(&mut **tx)
+    .await?;
+    let (version,): (i64,) =
+        sqlx::query_as("SELECT version FROM user_like_versions WHERE user_id = ?")
+            .bind(user_id)
+            .fetch_one(&mut **tx)
+            .await?;
+
+    for op in &changed {
+        sqlx::query(
+            "INSERT INTO user_like_log (user_id, track_id, source, liked, version)
+             VALUES (?, ?, ?, ?, ?)
+             ON DUPLICATE KEY UPDATE
+                source = VALUES(source), liked = VALUES(liked), version = VALUES(version)",
+        )
+        .bind(user_id)
+        .bind(&op.id)
+        .bind(op.source())
+        .bind(op.liked)
+        .bind(version)
+        .execute(&mut **tx)
+        .await?;
+    }
+
+    Ok((version, changed.len()))
+}
+
+impl TidolCore {
+    /// Aplica `ops` en una transacción propia. Para los endpoints de like
+    /// sueltos, que conservan su contrato y ahora también quedan en el log.
+    pub(crate) async fn write_likes(
+        &self,
+        user_id: i64,
+        ops: &[LikeOp],
+    ) -> Result<(i64, usize), sqlx::Error> {
+        let mut tx = self.db.begin().await?;
+        let out = apply_ops(&mut tx, user_id, ops).await?;
+        tx.commit().await?;
+        Ok(out)
+    }
+
+    /// POST /api/v1/music/likes/batch — muchos like/unlike en una transacción.
+    /// Responde `{ version, applied }`; `applied` cuenta solo lo que cambió.
+    pub async fn apply_like_batch(
+        &self,
+        user_id: i64,
+        payload: LikeBatchPayload,
+    ) -> Result<serde_json::Value, LikeBatchError> {
+        let ops = payload.ops;
+        if ops.is_empty()
+            || ops.len() > MAX_BATCH_OPS
+            || ops.iter().any(|op| op.id.trim().is_empty())
+        {
+            return Err(LikeBatchError::Invalid);
+        }
+
+        match self.write_likes(user_id, &ops).await {
+            Ok((version, applied)) => {
+                Ok(serde_json::json!({ "version": version, "applied": applied }))
+            }
+            Err(e) => {
+                tracing::error!("like_batch: lote revertido: {}", e);
+                Err(LikeBatchError::Db)
+            }
+        }
+    }
+
+    /// GET /api/v1/music/likes/sync?since=N.
+    ///
+    /// - `since` ausente, 0 o desconocido (mayor que la versión actual, p.ej.
+    ///   tras restaurar la BD) → `{ version, full: true, local, archive }`.
+    /// - En otro caso → `{ version, full: false, added: [{id, source}], removed }`
+    ///   con solo lo cambiado después de `since`.
+    pub async fn sync_likes(
+        &self,
+        user_id: i64,
+        since: Option<i64>,
+    ) -> TidolResult<serde_json::Value> {
+        let set = self.like_set(user_id).await?;
+        let since = since.unwrap_or(0);
+
+        if since <= 0 || since > set.version {
+            return Ok(serde_json::json!({
+                "version": set.version,
+                "full": true,
+                "local": set.local.iter().collect::<Vec<_>>(),
+                "archive": set.archive.iter().collect::<Vec<_>>(),
+            }));
+        }
+
+        let rows = if since == set.version {
+            Vec::new()
+        } else {
+            self.like_changes_since(user_id, since).await?
+        };
+        // El log puede traer algo más nuevo que `set` si hubo una escritura
+        // entre ambas lecturas; se anuncia esa versión para no repetirlo.
+        let version = rows.iter().map(|r| r.3).fold(set.version, i64::max);
+        let mut added = Vec::new();
+        let mut removed = Vec::new();
+        for (track_id, source, liked, _) in rows {
+            if liked {
+                added.push(serde_json::json!({ "id": track_id, "source": source }));
+            } else {
+                removed.push(track_id);
+            }
+        }
+        Ok(serde_json::json!({
+            "version": version,
+            "full": false,
+            "added": added,
+            "removed": removed,
+        }))
+    }
+
+    /// Conjunto vigente del usuario: de memoria si su versión coincide con la
+    /// de la BD; si no, se pone al día con el log (o se recarga entero si no
+    /// estaba). La versión se lee ANTES que el contenido: lo cargado nunca es
+    /// más viejo que la versión con la que se guarda.
+    pub(crate) async fn like_set(&self, user_id: i64) -> Result<Arc<LikeSet>, sqlx::Error> {
+        let version =
+            sqlx::query_as::<_, (i64,)>("SELECT version FROM user_like_versions WHERE user_id = ?")
+                .bind(user_id)
+                .fetch_optional(&self.db)
+                .await?
+                .map_or(0, |(v,)| v);
+
+        let cached = self.like_sets.cache.get(&user_id).await;
+        let next = match cached {
+            Some(set) if set.version == version => return Ok(set),
+            Some(set) if set.version > 0 && set.version < version => {
+                let mut next = LikeSet::clone(&set);
+                for (track_id, source, liked, _) in
+                    self.like_changes_since(user_id, set.version).await?
+                {
+                    next.apply(&track_id, &source, liked);
+                }
+                next.version = version;
+                next
+            }
+            _ => {
+                let rows: Vec<(String, String)> =
+                    sqlx::query_as("SELECT track_id, source FROM user_likes WHERE user_id = ?")
+                        .bind(user_id)
+                        .fetch_all(&self.db)
+                        .await?;
+                let mut next = LikeSet {
+                    version,
+                    ..LikeSet::default()
+                };
+                for (track_id, source) in rows {
+                    next.apply(&track_id, &source, true);
+                }
+                next
+            }
+        };
+
+        let next = Arc::new(next);
+        self.like_sets.cache.insert(user_id, next.clone()).await;
+        Ok(next)
+    }
+
+    /// (track_id, source, liked, version) cambiados después de `since`.
+    async fn like_changes_since(
+        &self,
+        user_id: i64,
+        since: i64,
+    ) -> Result<Vec<(String, String, bool, i64)>, sqlx::Error> {
+        sqlx::query_as(
+            "SELECT track_id, source, liked, version FROM user_like_log
+             WHERE user_id = ? AND version > ?",
+        )
+        .bind(user_id)
+        .bind(since)
+        .fetch_all(&self.db)
+        .await
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn op(id: &str, source: Option<&str>, liked: bool) -> LikeOp {
+        LikeOp {
+            id: id.into(),
+            source: source.map(str::to_string),
+            liked,
+        }
+    }
+
+    #[test]
+    fn fuente_por_defecto_es_local_y_el_resto_archive() {
+        assert_eq!(op("a", None, true).source(), "local");
+        assert_eq!(op("a", Some("local"), true).source(), "local");
+        assert_eq!(op("a", Some("archive"), true).source(), "archive");
+        assert_eq!(op("a", Some("internet_archive"), true).source(), "archive");
+    }
+
+    #[test]
+    fn aplicar_cambios_es_idempotente_y_mueve_de_fuente() {
+        let mut set = LikeSet::default();
+        set.apply("t1", "local", true);
+        set.apply("t1", "local", true);
+        set.apply("t2", "archive", true);
+        assert_eq!(set.len(), 2);
+
+        // Re-like con otra fuente: la pista no queda duplicada.
+        set.apply("t1", "archive", true);
+        assert!(!set.local.contains("t1"));
+        assert!(set.archive.contains("t1"));
+
+        set.apply("t1", "local", false);
+        set.apply("t1", "local", false);
+        assert_eq!(set.len(), 1);
+        assert!(set.archive.contains("t2"));
+    }
+
+    #[test]
+    fn lote_deserializa_ops_con_y_sin_fuente() {
+        let p: LikeBatchPayload = serde_json::from_value(serde_json::json!({
+            "ops": [
+                { "id": "a", "liked": true },
+                { "id": "b", "source": "archive", "liked": false }
+            ]
+        }))
+        .expect("payload");
+        assert_eq!(p.ops.len(), 2);
+        assert_eq!(p.ops[0].source(), "local");
+        assert!(!p.ops[1].liked);
+    }
+}
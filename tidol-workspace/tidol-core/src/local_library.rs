@@ -0,0 +1,534 @@
+// =========================================================================
+// Biblioteca local: ingesta de ficheros de audio YA presentes en disco
+// (feature `local-library`).
+//
+// Tubería de `TidolCore::import_path`:
+//   1. Recorrido paralelo del árbol (jwalk) filtrando extensiones de audio.
+//   2. Re-escaneo incremental: un fichero con el mismo (tamaño, mtime) que en
+//      `local_files` no se vuelve a leer.
+//   3. Hash de contenido (BLAKE3) + lectura de etiquetas (lofty) en paralelo
+//      sobre todos los núcleos (rayon), fuera del runtime async.
+//   4. Dedupe por hash de contenido: copias idénticas comparten pista.
+//   5. Upserts multi-fila por lotes en artists/albums/track_links/trackMetadata
+//      y el índice `local_files`.
+// Los ids son deterministas (`local-` + 30 hex de BLAKE3), así re-importar es
+// idempotente y caben en las columnas VARCHAR(36) de mbid.
+// =========================================================================
+use std::collections::{HashMap, HashSet};
+use std::io::Read;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+use std::time::UNIX_EPOCH;
+
+use lofty::prelude::*;
+use rayon::prelude::*;
+use sqlx::{MySql, QueryBuilder};
+use tracing::{info, warn};
+
+use crate::error::TidolError;
+use crate::TidolCore;
+
+/// Extensiones que se consideran audio importable.
+const AUDIO_EXTENSIONS: &[&str] = &["mp3", "flac", "ogg", "opus", "m4a", "wav", "aiff", "aif"];
+
+/// Filas por sentencia en los upserts multi-fila.
+const BATCH_ROWS: usize = 500;
+
+/// Cada cuántos ficheros se emite progreso durante el análisis.
+const PROGRESS_EVERY: u64 = 250;
+
+/// Avance de una ingesta, emitido en orden: `Discovered` → `Analyzed`* →
+/// `Written`* (con `done == total` al final de cada fase).
+#[derive(Debug, Clone, Copy)]
+pub enum ImportProgress {
+    /// Fin del recorrido: ficheros de audio encontrados y cuántos cambiaron.
+    Discovered { found: u64, changed: u64 },
+    /// Ficheros cambiados ya hasheados y etiquetados.
+    Analyzed { done: u64, total: u64 },
+    /// Filas de `local_files` ya escritas.
+    Written { done: u64, total: u64 },
+}
+
+/// Resultado de `TidolCore::import_path`.
+#[derive(Debug, Clone, Copy, Default)]
+pub struct ImportReport {
+    /// Ficheros de audio encontrados bajo la ruta.
+    pub scanned: u64,
+    /// Ficheros nuevos o modificados escritos en la biblioteca.
+    pub imported: u64,
+    /// Sin cambios desde el último escaneo (mismo tamaño y mtime).
+    pub unchanged: u64,
+    /// Contenido idéntico a otro fichero ya importado (comparten pista).
+    pub duplicates: u64,
+    /// Ilegibles (E/S, o lofty no reconoce el formato): no se importan y se
+    /// reintentan en el próximo escaneo.
+    pub failed: u64,
+}
+
+/// Fichero candidato tras el recorrido.
+struct FoundFile {
+    path: PathBuf,
+    size: u64,
+    mtime: i64,
+}
+
+/// Fichero analizado (hash + etiquetas).
+struct ParsedFile {
+    path: String,
+    size: u64,
+    mtime: i64,
+    content_hash: String,
+    title: String,
+    artist: String,
+    album_artist: String,
+    album: Option<String>,
+    year: Option<i32>,
+    duration: Option<i32>,
+}
+
+/// Id determinista de 36 caracteres a partir de una semilla.
+fn local_id(seed: &str) -> String {
+    let hex = blake3::hash(seed.as_bytes()).to_hex();
+    format!("local-{}", &hex.as_str()[..30])
+}
+
+/// Clave de agrupación de artistas/álbumes: insensible a mayúsculas y espacios.
+fn group_key(s: &str) -> String {
+    s.split_whitespace()
+        .collect::<Vec<_>>()
+        .join(" ")
+        .to_lowercase()
+}
+
+/// Las columnas de nombre (artists.name, albums.title, track_links.title/artist,
+/// trackMetadata.trackName…) son VARCHAR(255): en modo estricto una etiqueta
+/// más larga tumbaría el lote entero.
+fn clip(s: &str) -> String {
+    s.chars().take(255).collect()
+}
+
+fn is_audio(path: &Path) -> bool {
+    path.extension()
+        .and_then(|e| e.to_str())
+        .map(|e| AUDIO_EXTENSIONS.contains(&e.to_ascii_lowercase().as_str()))
+        .unwrap_or(false)
+}
+
+/// Hash BLAKE3 del contenido, en streaming (sin cargar el fichero entero).
+fn hash_file(path: &Path) -> std::io::Result<String> {
+    let mut file = std::fs::File::open(path)?;
+    let mut hasher = blake3::Hasher::new();
+    let mut buf = vec![0u8; 256 * 1024];
+    loop {
+        let n = file.read(&mut buf)?;
+        if n == 0 {
+            break;
+        }
+        hasher.update(&buf[..n]);
+    }
+    Ok(hasher.finalize().to_hex().to_string())
+}
+
+/// Hash + etiquetas de un fichero. Un fichero que lofty no sabe abrir (extensión
+/// de audio pero contenido corrupto o de otro tipo) se descarta: importarlo
+/// dejaría en la biblioteca una pista que no se puede reproducir. Un audio
+/// válido sin etiquetas utilizables se cae al nombre del fichero (nunca
+/// "Unknown": eso lo reclamaría `hydrate_unknown_tracks`).
+fn analyze(f: &FoundFile) -> Option<ParsedFile> {
+    let content_hash = match hash_file(&f.path) {
+        Ok(h) => h,
+        Err(e) => {
+            warn!("[import] {}: {}", f.path.display(), e);
+            return None;
+        }
+    };
+
+    let tagged = match lofty::read_from_path(&f.path) {
+        Ok(t) => t,
+        Err(e) => {
+            warn!("[import] {} no es audio legible: {}", f.path.display(), e);
+            return None;
+        }
+    };
+    let tag = tagged.primary_tag().or_else(|| tagged.first_tag());
+    let text =
+        |v: Option<std::borrow::Cow<'_, str>>| v.map(|s| clip(s.trim())).filter(|s| !s.is_empty());
+
+    let stem = f
+        .path
+        .file_stem()
+        .map(|s| clip(&s.to_string_lossy()))
+        .unwrap_or_default();
+    let title = text(tag.and_then(|t| t.title())).unwrap_or(stem);
+    let artist = text(tag.and_then(|t| t.artist())).unwrap_or_else(|| "Artista desconocido".into());
+    let album_artist = tag
+        .and_then(|t| t.get_string(&ItemKey::AlbumArtist))
+        .map(|s| clip(s.trim()))
+        .filter(|s| !s.is_empty())
+        .unwrap_or_else(|| artist.clone());
+
+    Some(ParsedFile {
+        path: f.path.to_string_lossy().into_owned(),
+        size: f.size,
+        mtime: f.mtime,
+        content_hash,
+        title,
+        artist,
+        album_artist,
+        album: text(tag.and_then(|t| t.album())),
+        year: tag.and_then(|t| t.year()).map(|y| y as i32),
+        duration: Some(tagged.properties().duration().as_secs() as i32).filter(|d| *d > 0),
+    })
+}
+
+/// Recorre `root` en paralelo y devuelve los ficheros de audio con su tamaño y
+/// mtime (segundos Unix).
+fn walk(root: &Path) -> Vec<FoundFile> {
+    jwalk::WalkDir::new(root)
+        .skip_hidden(true)
+        .into_iter()
+        .filter_map(|entry| entry.ok())
+        .filter(|entry| entry.file_type().is_file() && is_audio(&entry.path()))
+        .filter_map(|entry| {
+            let path = entry.path();
+            let meta = entry.metadata().ok()?;
+            let mtime = meta
+                .modified()
+                .ok()
+                .and_then(|t| t.duration_since(UNIX_EPOCH).ok())
+                .map(|d| d.as_secs() as i64)
+                .unwrap_or(0);
+            Some(FoundFile {
+                path,
+                size: meta.len(),
+                mtime,
+            })
+        })
+        .collect()
+}
+
+impl TidolCore {
+    /// DDL idempotente del índice de la biblioteca local (ver
+    /// migrations/005_local_library.sql).
+    async fn ensure_local_library_schema(&self) -> Result<(), sqlx::Error> {
+        sqlx::query(
+            "CREATE TABLE IF NOT EXISTS local_files (
+                path_hash    CHAR(64)    NOT NULL,
+                path         TEXT        NOT NULL,
+                size         BIGINT      NOT NULL,
+                mtime        BIGINT      NOT NULL,
+                content_hash CHAR(64)    NOT NULL,
+                track_mbid   VARCHAR(36) NOT NULL,
+                scanned_at   TIMESTAMP   DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (path_hash),
+                KEY idx_local_files_content (content_hash)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+        )
+        .execute(&self.db)
+        .await?;
+        Ok(())
+    }
+
+    /// Importa (o re-escanea) los ficheros de audio bajo `root`. `progress` se
+    /// invoca desde hilos de trabajo: debe ser barato y no bloquear.
+    pub async fn import_path<F>(&self, root: &Path, progress: F) -> Result<ImportReport, TidolError>
+    where
+        F: Fn(ImportProgress) + Send + Sync + 'static,
+    {
+        if !root.is_dir() {
+            return Err(TidolError::NotFound {
+                resource: format!("directorio {}", root.display()),
+            });
+        }
+        self.ensure_local_library_schema().await?;
+        let progress = Arc::new(progress);
+
+        // ── Índice previo: (tamaño, mtime) por ruta y hashes ya conocidos ──
+        let known: Vec<(String, i64, i64, String)> =
+            sqlx::query_as("SELECT path, size, mtime, content_hash FROM local_files")
+                .fetch_all(&self.db)
+                .await?;
+        // hash → rutas que ya lo tenían (para distinguir "duplicado" de "mismo
+        // fichero tocado sin cambiar de contenido").
+        let mut known_hashes: HashMap<String, HashSet<String>> = HashMap::new();
+        let known_stat: HashMap<String, (u64, i64)> = known
+            .into_iter()
+            .map(|(path, size, mtime, hash)| {
+                known_hashes.entry(hash).or_default().insert(path.clone());
+                (path, (size as u64, mtime))
+            })
+            .collect();
+
+        // ── 1-3. Recorrido + análisis en paralelo, fuera del runtime ──
+        let root = root.to_path_buf();
+        let prog = progress.clone();
+        let (scanned, changed, parsed) = tokio::task::spawn_blocking(move || {
+            let found = walk(&root);
+            let scanned = found.len() as u64;
+            let changed: Vec<FoundFile> = found
+                .into_iter()
+                .filter(|f| known_stat.get(&*f.path.to_string_lossy()) != Some(&(f.size, f.mtime)))
+                .collect();
+            let total = changed.len() as u64;
+            (*prog)(ImportProgress::Discovered {
+                found: scanned,
+                changed: total,
+            });
+
+            let done = AtomicU64::new(0);
+            let parsed: Vec<ParsedFile> = changed
+                .par_iter()
+                .filter_map(|f| {
+                    let out = analyze(f);
+                    let n = done.fetch_add(1, Ordering::Relaxed) + 1;
+                    if n % PROGRESS_EVERY == 0 || n == total {
+                        (*prog)(ImportProgress::Analyzed { done: n, total });
+                    }
+                    out
+                })
+                .collect();
+            (scanned, total, parsed)
+        })
+        .await
+        .map_err(|e| TidolError::Config(format!("import: tarea de escaneo abortada: {}", e)))?;
+
+        let mut report = ImportReport {
+            scanned,
+            unchanged: scanned - changed,
+            failed: changed - parsed.len() as u64,
+            ..Default::default()
+        };
+
+        // ── 4. Dedupe por contenido y agrupación de artistas/álbumes ──
+        let mut artists: HashMap<String, (String, String)> = HashMap::new(); // key → (id, nombre)
+        let mut albums: HashMap<String, (String, String, String, Option<i32>)> = HashMap::new(); // key → (id, título, artist_id, año)
+        let mut tracks: HashMap<String, &ParsedFile> = HashMap::new(); // content_hash → primer fichero
+        let mut files: Vec<(&ParsedFile, String)> = Vec::with_capacity(parsed.len()); // (fichero, track_id)
+
+        for p in &parsed {
+            let track_id = local_id(&p.content_hash);
+            let known_elsewhere = known_hashes
+                .get(&p.content_hash)
+                .is_some_and(|paths| paths.iter().any(|kp| kp != &p.path));
+            if tracks.contains_key(&p.content_hash) || known_elsewhere {
+                report.duplicates += 1;
+            }
+            tracks.entry(p.content_hash.clone()).or_insert(p);
+            files.push((p, track_id));
+
+            for name in [&p.artist, &p.album_artist] {
+                let key = group_key(name);
+                artists
+                    .entry(key.clone())
+                    .or_insert_with(|| (local_id(&format!("artist:{}", key)), name.clone()));
+            }
+            if let Some(album) = &p.album {
+                let key = format!("{}\u{1f}{}", group_key(&p.album_artist), group_key(album));
+                let artist_id = local_id(&format!("artist:{}", group_key(&p.album_artist)));
+                albums.entry(key.clone()).or_insert_with(|| {
+                    (
+                        local_id(&format!("album:{}", key)),
+                        album.clone(),
+                        artist_id,
+                        p.year,
+                    )
+                });
+            }
+        }
+        report.imported = files.len() as u64 - report.duplicates;
+
+        // ── 5. Upserts por lotes (artistas antes que álbumes por la FK) ──
+        let artist_rows: Vec<&(String, String)> = artists.values().collect();
+        for chunk in artist_rows.chunks(BATCH_ROWS) {
+            let mut qb: QueryBuilder<MySql> =
+                QueryBuilder::new("INSERT INTO artists (mbid, name, status) ");
+            qb.push_values(chunk, |mut b, (id, name)| {
+                b.push_bind(id).push_bind(name).push_bind("provisional");
+            });
+            qb.push(" ON DUPLICATE KEY UPDATE name = VALUES(name)");
+            qb.build().execute(&self.db).await?;
+        }
+
+        let album_rows: Vec<&(String, String, String, Option<i32>)> = albums.values().collect();
+        for chunk in album_rows.chunks(BATCH_ROWS) {
+            let mut qb: QueryBuilder<MySql> = QueryBuilder::new(
+                "INSERT INTO albums (mbid, title, artist_mbid, release_year, type) ",
+            );
+            qb.push_values(chunk, |mut b, (id, title, artist_id, year)| {
+                b.push_bind(id)
+                    .push_bind(title)
+                    .push_bind(artist_id)
+                    .push_bind(year)
+                    .push_bind("local");
+            });
+            qb.push(
+                " ON DUPLICATE KEY UPDATE title = VALUES(title),
+                    release_year = COALESCE(VALUES(release_year), release_year)",
+            );
+            qb.build().execute(&self.db).await?;
+        }
+
+        let track_rows: Vec<&ParsedFile> = tracks.values().copied().collect();
+        for chunk in track_rows.chunks(BATCH_ROWS) {
+            let mut qb: QueryBuilder<MySql> =
+                QueryBuilder::new("INSERT INTO track_links (mbid, title, artist, lyrics_status) ");
+            // Sin `provisional_audio_path`: eso es audio servible por el servidor
+            // (la radio lo recoge); la ruta local va en trackMetadata.localAudioPath.
+            qb.push_values(chunk, |mut b, p| {
+                b.push_bind(local_id(&p.content_hash))
+                    .push_bind(&p.title)
+                    .push_bind(&p.artist)
+                    .push_bind("pending");
+            });
+            qb.push(" ON DUPLICATE KEY UPDATE title = VALUES(title), artist = VALUES(artist)");
+            qb.build().execute(&self.db).await?;
+
+            // Ficha de biblioteca: lo que leen get_album_songs/get_artist_songs.
+            let mut qb: QueryBuilder<MySql> = QueryBuilder::new(
+                "INSERT INTO trackMetadata (trackId, trackName, artistName, albumName,
+                    durationSeconds, localAudioPath, isCached, artist_id, album_id) ",
+            );
+            qb.push_values(chunk, |mut b, p| {
+                let album_id = p.album.as_ref().map(|a| {
+                    local_id(&format!(
+                        "album:{}\u{1f}{}",
+                        group_key(&p.album_artist),
+                        group_key(a)
+                    ))
+                });
+                b.push_bind(local_id(&p.content_hash))
+                    .push_bind(&p.title)
+                    .push_bind(&p.artist)
+                    .push_bind(&p.album)
+                    .push_bind(p.duration)
+                    .push_bind(&p.path)
+                    .push_bind(1i8)
+                    .push_bind(local_id(&format!("artist:{}", group_key(&p.artist))))
+                    .push_bind(album_id);
+            });
+            qb.push(
+                " ON DUPLICATE KEY UPDATE trackName = VALUES(trackName),
+                    artistName = VALUES(artistName), albumName = VALUES(albumName),
+                    durationSeconds = VALUES(durationSeconds),
+                    localAudioPath = VALUES(localAudioPath), isCached = 1,
+                    artist_id = VALUES(artist_id), album_id = VALUES(album_id)",
+            );
+            qb.build().execute(&self.db).await?;
+        }
+
+        let total = files.len() as u64;
+        let mut written = 0u64;
+        for chunk in files.chunks(BATCH_ROWS) {
+            let mut qb: QueryBuilder<MySql> = QueryBuilder::new(
+                "INSERT INTO local_files (path_hash, path, size, mtime, content_hash, track_mbid) ",
+            );
+            qb.push_values(chunk, |mut b, (p, track_id)| {
+                b.push_bind(blake3::hash(p.path.as_bytes()).to_hex().to_string())
+                    .push_bind(&p.path)
+                    .push_bind(p.size as i64)
+                    .push_bind(p.mtime)
+                    .push_bind(&p.content_hash)
+                    .push_bind(track_id);
+            });
+            qb.push(
+                " ON DUPLICATE KEY UPDATE size = VALUES(size), mtime = VALUES(mtime),
+                    content_hash = VALUES(content_hash), track_mbid = VALUES(track_mbid)",
+            );
+            qb.build().execute(&self.db).await?;
+            written += chunk.len() as u64;
+            (*progress)(ImportProgress::Written {
+                done: written,
+                total,
+            });
+        }
+
+        info!(
+            "[import] {} escaneados, {} importados, {} sin cambios, {} duplicados, {} fallidos",
+            report.scanned, report.imported, report.unchanged, report.duplicates, report.failed
+        );
+        Ok(report)
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn local_id_es_determinista_y_cabe_en_mbid() {
+        let a = local_id("abc");
+        assert_eq!(a, local_id("abc"));
+        assert_ne!(a, local_id("abd"));
+        assert_eq!(a.len(), 36);
+        assert!(a.starts_with("local-"));
+    }
+
+    #[test]
+    fn group_key_ignora_mayusculas_y_espacios() {
+        assert_eq!(group_key("  The   Beatles "), group_key("the beatles"));
+    }
+
+    #[test]
+    fn clip_recorta_por_caracteres() {
+        let largo = "ñ".repeat(300);
+        assert_eq!(clip(&largo).chars().count(), 255);
+        assert_eq!(clip("corto"), "corto");
+    }
+
+    #[test]
+    fn is_audio_por_extension() {
+        assert!(is_audio(Path::new("/m/a/01 Song.FLAC")));
+        assert!(is_audio(Path::new("x.mp3")));
+        assert!(!is_audio(Path::new("cover.jpg")));
+        assert!(!is_audio(Path::new("sin_extension")));
+    }
+
+    /// WAV PCM mínimo (mono, 8 bits, 8 kHz) de `secs` segundos de silencio.
+    fn wav_silencio(secs: u32) -> Vec<u8> {
+        let data_len = 8000 * secs;
+        let mut v = Vec::with_capacity(44 + data_len as usize);
+        v.extend_from_slice(b"RIFF");
+        v.extend_from_slice(&(36 + data_len).to_le_bytes());
+        v.extend_from_slice(b"WAVEfmt ");
+        v.extend_from_slice(&16u32.to_le_bytes());
+        v.extend_from_slice(&1u16.to_le_bytes()); // PCM
+        v.extend_from_slice(&1u16.to_le_bytes()); // canales
+        v.extend_from_slice(&8000u32.to_le_bytes()); // sample rate
+        v.extend_from_slice(&8000u32.to_le_bytes()); // byte rate
+        v.extend_from_slice(&1u16.to_le_bytes()); // block align
+        v.extend_from_slice(&8u16.to_le_bytes()); // bits por muestra
+        v.extend_from_slice(b"data");
+        v.extend_from_slice(&data_len.to_le_bytes());
+        v.resize(44 + data_len as usize, 0x80);
+        v
+    }
+
+    #[test]
+    fn walk_y_analyze_sobre_un_arbol_temporal() {
+        let dir = std::env::temp_dir().join(format!("tidol-import-{}", uuid::Uuid::new_v4()));
+        std::fs::create_dir_all(dir.join("sub")).unwrap();
+        std::fs::write(dir.join("sub/a.wav"), wav_silencio(2)).unwrap();
+        std::fs::write(dir.join("b.wav"), wav_silencio(2)).unwrap();
+        std::fs::write(dir.join("c.mp3"), b"no es audio real").unwrap();
+        std::fs::write(dir.join("notas.txt"), b"x").unwrap();
+
+        let mut found = walk(&dir);
+        found.sort_by(|a, b| a.path.cmp(&b.path));
+        assert_eq!(found.len(), 3);
+
+        // Audio válido sin etiquetas: cae al nombre de fichero; mismo contenido → mismo hash.
+        let b = analyze(&found[0]).unwrap();
+        let a = analyze(&found[2]).unwrap();
+        assert_eq!(a.content_hash, b.content_hash);
+        assert_eq!(b.title, "b");
+        assert_eq!(b.artist, "Artista desconocido");
+        assert_eq!(b.duration, Some(2));
+
+        // Extensión de audio pero contenido ilegible: no se importa (cuenta como fallido).
+        assert!(found[1].path.ends_with("c.mp3"));
+        assert!(analyze(&found[1]).is_none());
+
+        std::fs::remove_dir_all(&dir).unwrap();
+    }
+}
@@ -1,12 +1,80 @@
-use serde::{Deserialize, Serialize};
+use std::borrow::Cow;
+use std::sync::Arc;
+
+use serde::ser::SerializeStruct;
+use serde::{Deserialize, Serialize, Serializer};
+use serde_json::value::RawValue;
 use serde_json::Value;
 
-#[derive(Clone, Debug, Serialize)]
+/// Tipo de evento de progreso que el servidor empuja al cliente (nombre del
+/// evento SSE).
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Serialize, Deserialize)]
+#[serde(rename_all = "snake_case")]
+pub enum WorkerEventKind {
+    LyricsReady,
+    CoverReady,
+    PrefetchComplete,
+}
+
+impl WorkerEventKind {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            WorkerEventKind::LyricsReady => "lyrics_ready",
+            WorkerEventKind::CoverReady => "cover_ready",
+            WorkerEventKind::PrefetchComplete => "prefetch_complete",
+        }
+    }
+}
+
+#[derive(Clone, Debug, Serialize, Deserialize)]
 pub struct WorkerEvent {
+    pub kind: WorkerEventKind,
     pub track_id: String,
     pub status: String,
     pub progress: i32,
     pub error: Option<String>,
+    /// Destinatario: `None` = evento de pista (para cualquiera suscrito a
+    /// ella); `Some` = solo ese usuario. No sale al cliente.
+    #[serde(skip)]
+    pub user_id: Option<i64>,
+}
+
+impl WorkerEvent {
+    /// Letra cacheada en track_links; `status` es el `lyrics_status` final.
+    pub fn lyrics_ready(track_id: &str, status: &str) -> Self {
+        Self {
+            kind: WorkerEventKind::LyricsReady,
+            track_id: track_id.to_string(),
+            status: status.to_string(),
+            progress: 100,
+            error: None,
+            user_id: None,
+        }
+    }
+
+    /// Portada cacheada en disco: `/api/v1/covers/:mbid` ya la sirve local.
+    pub fn cover_ready(mbid: &str) -> Self {
+        Self {
+            kind: WorkerEventKind::CoverReady,
+            track_id: mbid.to_string(),
+            status: "cached".to_string(),
+            progress: 100,
+            error: None,
+            user_id: None,
+        }
+    }
+
+    /// Prefetch del Bad Engine terminado para la pista que pidió `user_id`.
+    pub fn prefetch_complete(track_id: &str, user_id: i64, error: Option<String>) -> Self {
+        Self {
+            kind: WorkerEventKind::PrefetchComplete,
+            track_id: track_id.to_string(),
+            status: if error.is_none() { "completed" } else { "failed" }.to_string(),
+            progress: 100,
+            error,
+            user_id: Some(user_id),
+        }
+    }
 }
 
 #[derive(Debug, Serialize, Deserialize)]
@@ -38,7 +106,9 @@ pub struct TrackResponse {
     pub artist: String,
     #[serde(rename = "coverUrl")]
     pub cover_url: Option<String>,
-    pub source: String,
+    /// Casi siempre un literal ("musicbrainz", "radio", …): `Cow` evita una
+    /// asignación por fila en los listados.
+    pub source: Cow<'static, str>,
     pub duration: Option<i32>,
     #[serde(rename = "hasLyrics")]
     pub has_lyrics: bool,
@@ -191,3 +261,247 @@ pub struct HomeDashboardDTO {
     pub top_artists: Vec<HomeArtistResponse>,
     pub recommendations: Vec<TrackResponse>,
 }
+
+// -------------------------------------------------------------------------
+// FRAGMENTOS JSON PRE-SERIALIZADOS
+// -------------------------------------------------------------------------
+/// JSON ya codificado de una entidad de catálogo (detalle de álbum, perfil de
+/// artista). Clonarlo es un incremento de referencia y al serializarlo se
+/// copia tal cual, sin volver a codificar: el handler lo puede devolver solo
+/// o incrustarlo en una respuesta mayor.
+#[derive(Clone, Debug)]
+pub struct JsonFragment(Arc<RawValue>);
+
+impl JsonFragment {
+    pub fn encode<T: Serialize + ?Sized>(value: &T) -> serde_json::Result<Self> {
+        serde_json::value::to_raw_value(value).map(|raw| Self(Arc::from(raw)))
+    }
+
+    pub fn get(&self) -> &str {
+        self.0.get()
+    }
+
+    /// Bytes retenidos (peso en la caché).
+    pub fn len(&self) -> usize {
+        self.0.get().len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.0.get().is_empty()
+    }
+}
+
+impl Serialize for JsonFragment {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        RawValue::serialize(&self.0, serializer)
+    }
+}
+
+// -------------------------------------------------------------------------
+// BIBLIOTECA DEL USUARIO (playlists, historial, likes)
+// -------------------------------------------------------------------------
+/// Página de un listado con cursor (`?limit=&cursor=`); `nextCursor` es
+/// `null` en la última.
+#[derive(Debug, PartialEq, Serialize)]
+pub struct Page<T> {
+    pub items: Vec<T>,
+    #[serde(rename = "nextCursor")]
+    pub next_cursor: Option<String>,
+}
+
+/// Fila de `GET /playlists`.
+#[derive(Debug, PartialEq, Serialize)]
+pub struct PlaylistSummary {
+    pub id: String,
+    #[serde(rename = "nombre")]
+    pub name: String,
+    /// Unix seconds.
+    #[serde(rename = "creada_en")]
+    pub created_at: Option<i64>,
+    pub owner: String,
+    #[serde(rename = "songCount")]
+    pub song_count: i32,
+    #[serde(rename = "totalDuration")]
+    pub total_duration: i64,
+    pub likes: i32,
+    #[serde(rename = "coverUrl")]
+    pub cover_url: Option<String>,
+}
+
+/// Canción de una playlist. Sale con los nombres canónicos de
+/// normalizeTrack() del frontend (trackName/artistName/coverArtUrl) y los
+/// legacy (titulo/artista/portada…): el `Serialize` escribe cada alias desde
+/// el mismo campo, en vez de clonar título/artista/portada por clave.
+#[derive(Debug, PartialEq)]
+pub struct PlaylistSong {
+    pub track_id: String,
+    /// `song_source`; "local" si no consta.
+    pub source_type: String,
+    pub title: Option<String>,
+    pub artist: Option<String>,
+    pub cover_url: Option<String>,
+    pub duration: Option<i32>,
+    /// URL de reproducción directa (Internet Archive); las pistas de catálogo
+    /// (MusicBrainz) no la tienen y se resuelven vía embed.
+    pub url: Option<String>,
+}
+
+impl Serialize for PlaylistSong {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let mut s = serializer.serialize_struct("PlaylistSong", 16)?;
+        s.serialize_field("id", &self.track_id)?;
+        s.serialize_field("trackId", &self.track_id)?;
+        s.serialize_field("sourceType", &self.source_type)?;
+        s.serialize_field("trackName", &self.title)?;
+        s.serialize_field("title", &self.title)?;
+        s.serialize_field("titulo", &self.title)?;
+        s.serialize_field("artistName", &self.artist)?;
+        s.serialize_field("artist", &self.artist)?;
+        s.serialize_field("artista", &self.artist)?;
+        s.serialize_field("coverArtUrl", &self.cover_url)?;
+        s.serialize_field("artworkUrl", &self.cover_url)?;
+        s.serialize_field("portada", &self.cover_url)?;
+        s.serialize_field("duration", &self.duration)?;
+        s.serialize_field("duracion", &self.duration)?;
+        s.serialize_field("url", &self.url)?;
+        s.serialize_field("playbackUrl", &self.url)?;
+        s.end()
+    }
+}
+
+/// `GET /playlists/:id`: cabecera + canciones.
+#[derive(Debug, PartialEq, Serialize)]
+pub struct PlaylistDetail {
+    pub id: String,
+    #[serde(rename = "nombre")]
+    pub name: String,
+    #[serde(rename = "creada_en")]
+    pub created_at: Option<i64>,
+    pub owner: String,
+    /// Siempre `true`: la consulta ya filtra por dueño. Se mantiene en el
+    /// payload por compatibilidad con los clientes que lo leen.
+    #[serde(rename = "isOwner")]
+    pub is_owner: bool,
+    pub likes: i64,
+    #[serde(rename = "likedByMe")]
+    pub liked_by_me: bool,
+    #[serde(rename = "songCount")]
+    pub song_count: usize,
+    #[serde(rename = "totalDuration")]
+    pub total_duration: i64,
+    pub songs: Vec<PlaylistSong>,
+}
+
+/// Entrada de `GET /history`.
+#[derive(Debug, PartialEq, Serialize)]
+pub struct HistoryEntry {
+    /// mbid de la pista.
+    pub id: Option<String>,
+    pub title: Option<String>,
+    pub artist: Option<String>,
+    #[serde(rename = "artworkUrl")]
+    pub artwork_url: Option<String>,
+    #[serde(rename = "playedAt")]
+    pub played_at: Option<i64>,
+}
+
+/// Entrada de `GET /music/likes/detailed`. `id` y `trackId` salen del mismo
+/// campo.
+#[derive(Debug, PartialEq)]
+pub struct LikedTrack {
+    pub track_id: String,
+    pub title: String,
+    pub artist: String,
+    pub cover_url: String,
+    pub source: String,
+    pub liked_at: Option<i64>,
+}
+
+impl Serialize for LikedTrack {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let mut s = serializer.serialize_struct("LikedTrack", 7)?;
+        s.serialize_field("id", &self.track_id)?;
+        s.serialize_field("trackId", &self.track_id)?;
+        s.serialize_field("title", &self.title)?;
+        s.serialize_field("artist", &self.artist)?;
+        s.serialize_field("coverUrl", &self.cover_url)?;
+        s.serialize_field("source", &self.source)?;
+        s.serialize_field("likedAt", &self.liked_at)?;
+        s.end()
+    }
+}
+
+// -------------------------------------------------------------------------
+// SUGERENCIAS DE BÚSQUEDA (índice en memoria de searchClicks)
+// -------------------------------------------------------------------------
+/// Respuesta de `GET /search/suggest`; `query` es el prefijo ya normalizado.
+#[derive(Debug, Serialize)]
+pub struct SuggestResponse {
+    pub query: String,
+    pub suggestions: Vec<Suggestion>,
+}
+
+/// Consulta popular con sus pistas más elegidas (más clicadas primero).
+#[derive(Debug, Clone, PartialEq, Serialize)]
+pub struct Suggestion {
+    pub query: String,
+    pub clicks: u64,
+    pub tracks: Vec<SuggestedTrack>,
+}
+
+/// Pista elegida para una consulta, con los nombres de `trackMetadata`.
+#[derive(Debug, Clone, PartialEq, Serialize)]
+pub struct SuggestedTrack {
+    #[serde(rename = "trackId")]
+    pub track_id: String,
+    #[serde(rename = "trackName")]
+    pub track_name: String,
+    #[serde(rename = "artistName")]
+    pub artist_name: Option<String>,
+    #[serde(rename = "coverArtUrl")]
+    pub cover_art_url: Option<String>,
+    #[serde(rename = "sourceLink")]
+    pub source_link: Option<String>,
+    pub clicks: u64,
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn cancion_de_playlist_emite_todos_los_alias() {
+        let song = PlaylistSong {
+            track_id: "t1".into(),
+            source_type: "archive".into(),
+            title: Some("A".into()),
+            artist: None,
+            cover_url: Some("/c.jpg".into()),
+            duration: Some(120),
+            url: None,
+        };
+        let v = serde_json::to_value(&song).unwrap();
+        for key in ["trackName", "title", "titulo"] {
+            assert_eq!(v[key], "A", "clave {key}");
+        }
+        for key in ["artistName", "artist", "artista", "url", "playbackUrl"] {
+            assert!(v[key].is_null(), "clave {key}");
+        }
+        assert_eq!(v["id"], v["trackId"]);
+        assert_eq!(v["portada"], "/c.jpg");
+        assert_eq!(v["duracion"], 120);
+        assert_eq!(v.as_object().unwrap().len(), 16);
+    }
+
+    #[test]
+    fn fragmento_se_incrusta_sin_recodificar() {
+        let frag = JsonFragment::encode(&serde_json::json!({ "b": [1, 2], "a": "x" })).unwrap();
+        #[derive(Serialize)]
+        struct Wrapper<'a> {
+            album: &'a JsonFragment,
+        }
+        let s = serde_json::to_string(&Wrapper { album: &frag }).unwrap();
+        assert_eq!(s, format!(r#"{{"album":{}}}"#, frag.get()));
+        assert_eq!(frag.len(), frag.get().len());
+    }
+}
@@ -1,5 +1,10 @@
+use std::borrow::Cow;
+
+use crate::db_router::DbRoute;
+use crate::events::EventBus;
 use crate::models::{
     AlbumResponse, ArtistProfileResponse, PaginationMeta, SearchResponse, TrackResponse,
+    WorkerEvent,
 };
 use musicbrainz_rs::entity::artist::Artist;
 use musicbrainz_rs::entity::recording::Recording;
@@ -55,12 +60,13 @@ pub fn is_valid_match(query_artist: &str, result_artist: &str) -> bool {
 
 pub struct MetadataOrchestrator {
     http_client: Client,
+    events: EventBus,
 }
 
 impl MetadataOrchestrator {
-    #[allow(clippy::new_without_default)] // constructor con configuración, no un Default semántico
-    pub fn new() -> Self {
+    pub fn new(events: EventBus) -> Self {
         Self {
+            events,
             // Timeout obligatorio: sin él, una API externa colgada (iTunes está
             // bloqueado desde el VPS) dejaba el handler esperando indefinidamente.
             http_client: Client::builder()
@@ -155,7 +161,7 @@ impl MetadataOrchestrator {
                     track_id,
                     title,
                     artist: artist_name,
-                    source: "musicbrainz".to_string(),
+                    source: Cow::Borrowed("musicbrainz"),
                     duration: Some((duration_ms / 1000) as i32),
                     has_lyrics: false,
                 })
@@ -292,13 +298,13 @@ impl MetadataOrchestrator {
     pub async fn get_artist_discography(
         &self,
         artist_mbid: &str,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
     ) -> Result<ArtistProfileResponse, Box<dyn std::error::Error + Send + Sync>> {
         // Consultar caché local
         let artist_row: Option<(String, String, Option<String>, String)> =
             sqlx::query_as("SELECT mbid, name, cover_url, status FROM artists WHERE mbid = ?")
                 .bind(artist_mbid)
-                .fetch_optional(db)
+                .fetch_optional(db.read())
                 .await?;
 
         if let Some((db_mbid, db_name, db_cover, status)) = &artist_row {
@@ -311,7 +317,7 @@ impl MetadataOrchestrator {
                     "SELECT mbid, title, release_year, cover_url, cover_status FROM albums WHERE artist_mbid = ?"
                 )
                 .bind(artist_mbid)
-                .fetch_all(db)
+                .fetch_all(db.read())
                 .await?;
 
                 if !album_rows.is_empty() {
@@ -390,7 +396,7 @@ impl MetadataOrchestrator {
         .bind(artist_mbid)
         .bind(&artist_name)
         .bind(&cover_url)
-        .execute(db)
+        .execute(db.write())
         .await?;
 
         let mut albums_res = Vec::new();
@@ -429,7 +435,7 @@ impl MetadataOrchestrator {
                 .bind(release_year)
                 .bind(&rg_cover)
                 .bind(&rg_type)
-                .execute(db)
+                .execute(db.write())
                 .await?;
 
                 albums_res.push(AlbumResponse {
@@ -457,8 +463,21 @@ impl MetadataOrchestrator {
     pub async fn get_album_details(
         &self,
         album_mbid: &str,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
     ) -> Result<crate::models::AlbumDetailsResponse, Box<dyn std::error::Error + Send + Sync>> {
+        const ALBUM_SQL: &str = r#"
+            SELECT a.title, ar.name, a.release_year, a.cover_url, a.cover_status
+            FROM albums a
+            LEFT JOIN artists ar ON a.artist_mbid = ar.mbid
+            WHERE a.mbid = ?
+            "#;
+        const TRACKS_SQL: &str = r#"
+            SELECT track_mbid, title, duration, track_number
+            FROM album_tracks
+            WHERE album_mbid = ?
+            ORDER BY track_number ASC
+            "#;
+
         #[allow(clippy::type_complexity)] // tupla de query_as preexistente
         let album_row: Option<(
             String,
@@ -466,17 +485,22 @@ impl MetadataOrchestrator {
             Option<i32>,
             Option<String>,
             Option<String>,
-        )> = sqlx::query_as(
-            r#"
-            SELECT a.title, ar.name, a.release_year, a.cover_url, a.cover_status
-            FROM albums a
-            LEFT JOIN artists ar ON a.artist_mbid = ar.mbid
-            WHERE a.mbid = ?
-            "#,
-        )
-        .bind(album_mbid)
-        .fetch_optional(db)
-        .await?;
+        )> = sqlx::query_as(ALBUM_SQL)
+            .bind(album_mbid)
+            .fetch_optional(db.read())
+            .await?;
+        // Recién insertado por el perfil de artista y aún sin llegar a la
+        // réplica: confirmar en el primario antes de dar 404.
+        let (album_row, db) = match album_row {
+            None if db.reads_replica() => (
+                sqlx::query_as(ALBUM_SQL)
+                    .bind(album_mbid)
+                    .fetch_optional(db.write())
+                    .await?,
+                DbRoute::primary(db.write()),
+            ),
+            row => (row, db.clone()),
+        };
 
         let (title, artist_name, release_year, cover_url, cover_status) = match album_row {
             Some(row) => row,
@@ -485,17 +509,19 @@ impl MetadataOrchestrator {
 
         let artist_name = artist_name.unwrap_or_else(|| "Desconocido".to_string());
 
-        let mut tracks: Vec<(String, String, Option<i32>, Option<i32>)> = sqlx::query_as(
-            r#"
-            SELECT track_mbid, title, duration, track_number
-            FROM album_tracks
-            WHERE album_mbid = ?
-            ORDER BY track_number ASC
-            "#,
-        )
-        .bind(album_mbid)
-        .fetch_all(db)
-        .await?;
+        let mut tracks: Vec<(String, String, Option<i32>, Option<i32>)> =
+            sqlx::query_as(TRACKS_SQL)
+                .bind(album_mbid)
+                .fetch_all(db.read())
+                .await?;
+        // Igual con las pistas: sin esto se volvería a pedir a MusicBrainz lo
+        // que el primario ya tiene.
+        if tracks.is_empty() && db.reads_replica() {
+            tracks = sqlx::query_as(TRACKS_SQL)
+                .bind(album_mbid)
+                .fetch_all(db.write())
+                .await?;
+        }
 
         if tracks.is_empty() {
             let client = &self.http_client;
@@ -547,7 +573,7 @@ impl MetadataOrchestrator {
                                 .bind(&tr_title)
                                 .bind(duration_sec)
                                 .bind(track_number)
-                                .execute(db)
+                                .execute(db.write())
                                 .await?;
 
                                 tracks.push((tr_id, tr_title, duration_sec, track_number));
@@ -671,13 +697,13 @@ impl MetadataOrchestrator {
     pub async fn resolve_full_track(
         &self,
         mbid: &str,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
     ) -> Result<TrackProfile, String> {
         let local_record = sqlx::query(
             "SELECT mbid, title, artist, yt_video_id, genius_id, cover_url FROM track_links WHERE mbid = ? LIMIT 1"
         )
         .bind(mbid)
-        .fetch_optional(db)
+        .fetch_optional(db.read())
         .await
         .map_err(|e| format!("Error en base de datos: {}", e))?;
 
@@ -705,7 +731,7 @@ impl MetadataOrchestrator {
                         let _ = sqlx::query("UPDATE track_links SET cover_url = ? WHERE mbid = ?")
                             .bind(&new_cover)
                             .bind(&mbid_str)
-                            .execute(db)
+                            .execute(db.write())
                             .await;
                     }
                 }
@@ -771,7 +797,7 @@ impl MetadataOrchestrator {
         .bind(&yt_video_id)
         .bind(&genius_id)
         .bind(&cover_url)
-        .execute(db)
+        .execute(db.write())
         .await
         .map_err(|e| format!("Fallo al persistir enlace: {}", e))?;
 
@@ -792,7 +818,7 @@ impl MetadataOrchestrator {
         artist: &str,
         title: &str,
         limit: u8,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
     ) -> Result<Vec<TrackProfile>, String> {
         // Clave por env; el literal queda solo como fallback de desarrollo.
         let lastfm_api_key = std::env::var("LASTFM_API_KEY")
@@ -874,7 +900,7 @@ impl MetadataOrchestrator {
 
     pub async fn get_listen_again(
         &self,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
         limit: u8,
         user_id: i64,
     ) -> Result<Vec<crate::models::TrackResponse>, String> {
@@ -892,18 +918,18 @@ impl MetadataOrchestrator {
             user_id,
             lim
         )
-        .fetch_all(db)
+        .fetch_all(db.read())
         .await
         .map_err(|e| e.to_string())?;
 
         let mut mapped = Vec::new();
         for r in records {
             mapped.push(crate::models::TrackResponse {
-                track_id: r.mbid.clone(),
+                track_id: r.mbid,
                 title: r.title,
                 artist: r.artist,
                 cover_url: r.cover_url,
-                source: "musicbrainz".to_string(),
+                source: Cow::Borrowed("musicbrainz"),
                 duration: None,
                 has_lyrics: false,
             });
@@ -914,7 +940,9 @@ impl MetadataOrchestrator {
                 track.track_id.clone(),
                 track.artist.clone(),
                 track.title.clone(),
-                db.clone(),
+                db.write().clone(),
+                user_id,
+                self.events.clone(),
             );
         }
 
@@ -923,7 +951,7 @@ impl MetadataOrchestrator {
 
     pub async fn get_home_dashboard(
         &self,
-        db: &sqlx::MySqlPool,
+        db: &DbRoute,
         user_id: i64,
     ) -> Result<crate::models::HomeDashboardDTO, String> {
         let recent_fut = async {
@@ -939,18 +967,18 @@ impl MetadataOrchestrator {
                 "#,
                 user_id
             )
-            .fetch_all(db)
+            .fetch_all(db.read())
             .await
             .map_err(|e| e.to_string())?;
 
             let mut mapped = Vec::new();
             for r in records {
                 mapped.push(crate::models::TrackResponse {
-                    track_id: r.mbid.clone(),
+                    track_id: r.mbid,
                     title: r.title,
                     artist: r.artist,
                     cover_url: r.cover_url,
-                    source: "musicbrainz".to_string(),
+                    source: Cow::Borrowed("musicbrainz"),
                     duration: None,
                     has_lyrics: false,
                 });
@@ -972,7 +1000,7 @@ impl MetadataOrchestrator {
                 "#,
                 user_id
             )
-            .fetch_all(db)
+            .fetch_all(db.read())
             .await
             .map_err(|e| e.to_string())?;
 
@@ -1000,7 +1028,7 @@ impl MetadataOrchestrator {
                 "#,
                 user_id
             )
-            .fetch_optional(db)
+            .fetch_optional(db.read())
             .await
             .map_err(|e| e.to_string())?;
 
@@ -1013,14 +1041,14 @@ impl MetadataOrchestrator {
                     let mut mapped = Vec::new();
                     for t in lastfm_recs {
                         mapped.push(crate::models::TrackResponse {
-                            track_id: t.mbid.clone(),
-                            title: t.title,
-                            artist: t.artist,
                             // Ruta relativa: la URL absoluta a localhost:3000 rompía
                             // las portadas en producción (y era la caché mala que se
                             // veía como "covers erróneos").
                             cover_url: Some(format!("/api/v1/covers/{}", t.mbid)),
-                            source: "musicbrainz".to_string(),
+                            track_id: t.mbid,
+                            title: t.title,
+                            artist: t.artist,
+                            source: Cow::Borrowed("musicbrainz"),
                             duration: None,
                             has_lyrics: false,
                         });
@@ -1037,18 +1065,18 @@ impl MetadataOrchestrator {
                 LIMIT 10
                 "#
             )
-            .fetch_all(db)
+            .fetch_all(db.read())
             .await
             .map_err(|e| e.to_string())?;
 
             let mut mapped = Vec::new();
             for r in random_tracks {
                 mapped.push(crate::models::TrackResponse {
-                    track_id: r.mbid.clone(),
+                    track_id: r.mbid,
                     title: r.title,
                     artist: r.artist,
                     cover_url: r.cover_url,
-                    source: "musicbrainz".to_string(),
+                    source: Cow::Borrowed("musicbrainz"),
                     duration: None,
                     has_lyrics: false,
                 });
@@ -1092,6 +1120,8 @@ pub fn trigger_bad_engine_prefetch(
     artist: String,
     title: String,
     db: sqlx::MySqlPool,
+    user_id: i64,
+    events: EventBus,
 ) {
     {
         let set = PREFETCH_INFLIGHT.get_or_init(Default::default);
@@ -1159,7 +1189,7 @@ pub fn trigger_bad_engine_prefetch(
                 return;
             }
 
-            let _ = tokio::process::Command::new(&engine_bin)
+            let run = tokio::process::Command::new(&engine_bin)
                 .current_dir(&workspace_dir)
                 .env("TARGET_MBID", &mbid)
                 .env("TARGET_ARTIST", &artist)
@@ -1169,17 +1199,39 @@ pub fn trigger_bad_engine_prefetch(
                 .stderr(std::process::Stdio::null())
                 .output()
                 .await;
+
+            // Aviso push: el cliente deja de sondear /lyrics para esta pista.
+            let error = match run {
+                Ok(out) if out.status.success() => None,
+                Ok(out) => Some(format!("bad_engine terminó con {}", out.status)),
+                Err(e) => Some(e.to_string()),
+            };
+            if let Ok(Some((Some(status),))) = sqlx::query_as::<_, (Option<String>,)>(
+                "SELECT lyrics_status FROM track_links WHERE mbid = ? LIMIT 1",
+            )
+            .bind(&mbid)
+            .fetch_optional(&db)
+            .await
+            {
+                if !matches!(status.as_str(), "pending" | "not_found") {
+                    events.publish(WorkerEvent::lyrics_ready(&mbid, &status));
+                }
+            }
+            events.publish(WorkerEvent::prefetch_complete(&mbid, user_id, error));
         }
     });
 }
 
+/// Pistas con audio servible por el servidor. Las de la biblioteca local
+/// (`local-…`, ver local_library.rs) son ficheros de quien las importó: fuera.
 pub async fn get_radio_tracks(db: &sqlx::MySqlPool) -> Result<Vec<TrackResponse>, String> {
     let records = sqlx::query!(
         r#"
         SELECT mbid, title, artist, cover_url
         FROM track_links 
-        WHERE provisional_audio_path IS NOT NULL 
-           OR premium_audio_path IS NOT NULL
+        WHERE (provisional_audio_path IS NOT NULL 
+           OR premium_audio_path IS NOT NULL)
+          AND mbid NOT LIKE 'local-%'
         ORDER BY RAND() 
         LIMIT 50
         "#
@@ -1195,7 +1247,7 @@ pub async fn get_radio_tracks(db: &sqlx::MySqlPool) -> Result<Vec<TrackResponse>
             title: r.title,
             artist: r.artist,
             cover_url: r.cover_url,
-            source: "radio".to_string(),
+            source: Cow::Borrowed("radio"),
             duration: None,
             has_lyrics: false,
         })
@@ -1230,7 +1282,7 @@ pub async fn search_tracks_m3u(
             title: r.title,
             artist: r.artist,
             cover_url: r.cover_url,
-            source: "search".to_string(),
+            source: Cow::Borrowed("search"),
             duration: None,
             has_lyrics: false,
         })
@@ -1264,7 +1316,7 @@ pub async fn get_album_tracks_m3u(
             title: r.title,
             artist: r.artist,
             cover_url: r.cover_url,
-            source: "album".to_string(),
+            source: Cow::Borrowed("album"),
             duration: None,
             has_lyrics: false,
         })
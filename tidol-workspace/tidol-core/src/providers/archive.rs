@@ -1,7 +1,9 @@
+use super::cc_mirror::{CcMirror, MirrorEntry, SOURCE_ARCHIVE};
 use super::provider_trait::{EmbedInfo, MusicProvider, Platform, ProviderError, Track};
 use async_trait::async_trait;
 use moka::future::Cache;
 use std::time::Duration;
+use tracing::warn;
 
 /// Legal collections on Internet Archive with CC or public domain licenses.
 const LEGAL_COLLECTIONS: &[&str] = &[
@@ -19,6 +21,21 @@ pub struct ArchiveProvider {
     search_cache: Cache<String, Vec<Track>>,
     /// Item metadata cache (TTL: 6 hours)
     resolve_cache: Cache<String, EmbedInfo>,
+    /// Persistent local mirror (shared across replicas and restarts). When set,
+    /// search/resolve read it before going upstream and write upstream results
+    /// back into it.
+    mirror: Option<CcMirror>,
+}
+
+/// Outcome of one crawler pass over the legal collections.
+#[derive(Debug, Default, Clone, Copy)]
+pub struct MirrorSyncReport {
+    /// Items listed from advancedsearch and upserted.
+    pub listed: u64,
+    /// Items whose best stream was (re)computed from the metadata API.
+    pub resolved: u64,
+    /// Items skipped (no legal license or no playable audio file).
+    pub rejected: u64,
 }
 
 impl ArchiveProvider {
@@ -37,6 +54,15 @@ impl ArchiveProvider {
                 .time_to_live(Duration::from_secs(6 * 3600))
                 .max_capacity(5000)
                 .build(),
+            mirror: None,
+        }
+    }
+
+    /// Provider backed by the local `cc_catalog` mirror.
+    pub fn with_mirror(mirror: CcMirror) -> Self {
+        Self {
+            mirror: Some(mirror),
+            ..Self::new()
         }
     }
 
@@ -74,24 +100,59 @@ impl ArchiveProvider {
             urlencoding::encode(identifier)
         )
     }
-}
 
-#[async_trait]
-impl MusicProvider for ArchiveProvider {
-    fn name(&self) -> &'static str {
-        "Internet Archive"
-    }
+    /// Fetch item metadata, check the license and pick the best audio file.
+    /// Shared by `resolve` (on a mirror miss) and the mirror crawler.
+    async fn fetch_item(&self, id: &str) -> Result<MirrorEntry, ProviderError> {
+        let metadata_url = format!("https://archive.org/metadata/{}", urlencoding::encode(id));
+        let resp = self.http.get(&metadata_url).send().await?;
 
-    fn platform(&self) -> Platform {
-        Platform::InternetArchive
-    }
+        if resp.status().as_u16() == 404 {
+            return Err(ProviderError::NotFound(format!("IA item {} not found", id)));
+        }
 
-    async fn search(&self, query: &str, limit: u32) -> Result<Vec<Track>, ProviderError> {
-        let cache_key = format!("{}:{}", query, limit);
-        if let Some(cached) = self.search_cache.get(&cache_key).await {
-            return Ok(cached);
+        if !resp.status().is_success() {
+            return Err(ProviderError::Api(format!(
+                "IA metadata API returned {}",
+                resp.status()
+            )));
+        }
+
+        let json: serde_json::Value = resp.json().await?;
+
+        // Verify the item has a legal license
+        let license = json["metadata"]["licenseurl"]
+            .as_str()
+            .or_else(|| json["metadata"]["license"].as_str())
+            .unwrap_or("");
+
+        if !is_legal_license(license) {
+            return Err(ProviderError::Unlicensed(format!(
+                "IA item {} does not have a CC or public domain license",
+                id
+            )));
         }
 
+        let files = json["files"]
+            .as_array()
+            .ok_or_else(|| ProviderError::Parse("No files in IA metadata".into()))?;
+
+        let meta = &json["metadata"];
+        Ok(MirrorEntry {
+            item_id: id.to_string(),
+            title: meta["title"].as_str().unwrap_or("Unknown").to_string(),
+            artist: first_str(&meta["creator"])
+                .unwrap_or("Unknown Artist")
+                .to_string(),
+            best_stream_url: pick_best_audio_file(files)
+                .map(|filename| Self::direct_stream_url(id, filename)),
+            license_url: Some(license.to_string()),
+            popularity: meta["downloads"].as_i64().unwrap_or(0),
+        })
+    }
+
+    /// Upstream `advancedsearch.php` restricted to the legal collections.
+    async fn search_upstream(&self, query: &str, limit: u32) -> Result<Vec<Track>, ProviderError> {
         let search_query = Self::build_search_query(query);
 
         let resp = self
@@ -121,14 +182,12 @@ impl MusicProvider for ArchiveProvider {
             .as_array()
             .ok_or_else(|| ProviderError::Parse("No docs in IA response".into()))?;
 
-        let tracks: Vec<Track> = docs
+        let tracks = docs
             .iter()
             .filter_map(|doc| {
                 let identifier = doc["identifier"].as_str()?;
                 let title = doc["title"].as_str().unwrap_or("Unknown").to_string();
-                let artist = doc["creator"]
-                    .as_str()
-                    .or_else(|| doc["creator"].as_array()?.first()?.as_str())
+                let artist = first_str(&doc["creator"])
                     .unwrap_or("Unknown Artist")
                     .to_string();
 
@@ -153,73 +212,292 @@ impl MusicProvider for ArchiveProvider {
             })
             .collect();
 
-        self.search_cache.insert(cache_key, tracks.clone()).await;
         Ok(tracks)
     }
 
-    async fn resolve(&self, id: &str) -> Result<EmbedInfo, ProviderError> {
-        if let Some(cached) = self.resolve_cache.get(&id.to_string()).await {
-            return Ok(cached);
+    /// One crawler pass: list the most downloaded items of every legal
+    /// collection into the mirror, then precompute the best stream for up to
+    /// `resolve_budget` items that are unresolved or older than
+    /// `max_age_hours`. Requires a provider built with `with_mirror`.
+    pub async fn sync_mirror(
+        &self,
+        rows_per_collection: u32,
+        resolve_budget: u32,
+        max_age_hours: u64,
+    ) -> Result<MirrorSyncReport, ProviderError> {
+        let mirror = self
+            .mirror
+            .as_ref()
+            .ok_or_else(|| ProviderError::MissingConfig("cc_mirror not configured".into()))?;
+        let mut report = MirrorSyncReport::default();
+
+        for collection in LEGAL_COLLECTIONS {
+            let q = format!(
+                "collection:{} AND mediatype:audio AND (licenseurl:*creativecommons* OR licenseurl:*publicdomain*)",
+                collection
+            );
+            // A failed listing skips this collection only; the rest of the
+            // pass (and the stale-item refresh) still runs.
+            let resp = match self
+                .http
+                .get("https://archive.org/advancedsearch.php")
+                .query(&[
+                    ("q", q.as_str()),
+                    ("fl[]", "identifier,title,creator,downloads,licenseurl"),
+                    ("sort[]", "downloads desc"),
+                    ("rows", &rows_per_collection.to_string()),
+                    ("page", "1"),
+                    ("output", "json"),
+                ])
+                .send()
+                .await
+            {
+                Ok(resp) => resp,
+                Err(e) => {
+                    warn!("[cc_mirror] listing {} failed: {}", collection, e);
+                    continue;
+                }
+            };
+            if !resp.status().is_success() {
+                warn!(
+                    "[cc_mirror] listing {} returned {}",
+                    collection,
+                    resp.status()
+                );
+                continue;
+            }
+            let json: serde_json::Value = match resp.json().await {
+                Ok(json) => json,
+                Err(e) => {
+                    warn!("[cc_mirror] listing {} unreadable: {}", collection, e);
+                    continue;
+                }
+            };
+            let entries: Vec<MirrorEntry> = json["response"]["docs"]
+                .as_array()
+                .map(|docs| {
+                    docs.iter()
+                        .filter_map(|doc| {
+                            Some(MirrorEntry {
+                                item_id: doc["identifier"].as_str()?.to_string(),
+                                title: doc["title"].as_str().unwrap_or("Unknown").to_string(),
+                                artist: first_str(&doc["creator"])
+                                    .unwrap_or("Unknown Artist")
+                                    .to_string(),
+                                best_stream_url: None,
+                                license_url: doc["licenseurl"].as_str().map(str::to_string),
+                                popularity: doc["downloads"].as_i64().unwrap_or(0),
+                            })
+                        })
+                        .collect()
+                })
+                .unwrap_or_default();
+            report.listed += entries.len() as u64;
+            mirror
+                .upsert(SOURCE_ARCHIVE, &entries)
+                .await
+                .map_err(|e| ProviderError::Api(format!("cc_mirror upsert: {}", e)))?;
         }
 
-        // Fetch item metadata to find the first audio file
-        let metadata_url = format!("https://archive.org/metadata/{}", urlencoding::encode(id));
-        let resp = self.http.get(&metadata_url).send().await?;
+        let pending = mirror
+            .stale_items(SOURCE_ARCHIVE, max_age_hours, resolve_budget)
+            .await
+            .map_err(|e| ProviderError::Api(format!("cc_mirror stale_items: {}", e)))?;
+        let mut resolved = Vec::with_capacity(pending.len());
+        let mut rejected = Vec::new();
+        for id in pending {
+            // Only a definite answer (gone, not CC/PD, no playable file)
+            // rejects; rate limits, outages and transport errors leave the
+            // existing row as it was until the next pass.
+            match self.fetch_item(&id).await {
+                Ok(item) if item.best_stream_url.is_some() => resolved.push(item),
+                Ok(_)
+                | Err(ProviderError::NotFound(_))
+                | Err(ProviderError::Unlicensed(_))
+                | Err(ProviderError::Parse(_)) => rejected.push(id),
+                Err(e) => warn!("[cc_mirror] resolving {} failed: {}", id, e),
+            }
+            // Be polite with the metadata API: the crawler is not latency-bound.
+            tokio::time::sleep(Duration::from_millis(250)).await;
+        }
+        report.resolved = resolved.len() as u64;
+        report.rejected = rejected.len() as u64;
+        mirror
+            .upsert(SOURCE_ARCHIVE, &resolved)
+            .await
+            .map_err(|e| ProviderError::Api(format!("cc_mirror upsert: {}", e)))?;
+        mirror
+            .mark_rejected(SOURCE_ARCHIVE, &rejected)
+            .await
+            .map_err(|e| ProviderError::Api(format!("cc_mirror mark_rejected: {}", e)))?;
+
+        Ok(report)
+    }
+}
 
-        if resp.status().as_u16() == 404 {
-            return Err(ProviderError::NotFound(format!("IA item {} not found", id)));
+/// CC or public domain license URL.
+pub(crate) fn is_legal_license(license: &str) -> bool {
+    license.contains("creativecommons") || license.contains("publicdomain")
+}
+
+/// IA fields like `creator` come either as a string or as an array of strings.
+pub(crate) fn first_str(v: &serde_json::Value) -> Option<&str> {
+    v.as_str().or_else(|| v.as_array()?.first()?.as_str())
+}
+
+/// Track for a mirror hit (its stream is already resolved).
+fn mirror_track((identifier, title, artist, stream): (String, String, String, String)) -> Track {
+    Track {
+        thumbnail: Some(format!("https://archive.org/services/img/{}", identifier)),
+        embed_url: ArchiveProvider::embed_url(&identifier),
+        external_url: ArchiveProvider::details_url(&identifier),
+        id: identifier,
+        platform: Platform::InternetArchive,
+        title,
+        artist,
+        duration: None,
+        preview_url: Some(stream),
+    }
+}
+
+/// Mirror hits first (they carry a resolved stream), then upstream hits not
+/// already listed, up to `limit`.
+fn merge_results(mut local: Vec<Track>, upstream: Vec<Track>, limit: usize) -> Vec<Track> {
+    for track in upstream {
+        if local.len() >= limit {
+            break;
+        }
+        if !local.iter().any(|t| t.id == track.id) {
+            local.push(track);
         }
+    }
+    local
+}
 
-        if !resp.status().is_success() {
-            return Err(ProviderError::Api(format!(
-                "IA metadata API returned {}",
-                resp.status()
-            )));
+/// Pick the best playable audio file of an item: "original" source first,
+/// then the largest (highest quality). Metadata-derived files are ignored.
+fn pick_best_audio_file(files: &[serde_json::Value]) -> Option<&str> {
+    let audio_extensions = ["mp3", "ogg", "flac", "wav", "m4a"];
+    files
+        .iter()
+        .filter(|f| {
+            let name = f["name"].as_str().unwrap_or("");
+            let format = f["format"].as_str().unwrap_or("").to_lowercase();
+            let ext = name.rsplit('.').next().unwrap_or("").to_lowercase();
+            (audio_extensions.contains(&ext.as_str())
+                || format.contains("mp3")
+                || format.contains("ogg")
+                || format.contains("flac"))
+                && f["source"].as_str() != Some("metadata")
+        })
+        .max_by_key(|f| {
+            let is_original = f["source"].as_str() == Some("original");
+            let size = f["size"]
+                .as_str()
+                .and_then(|s| s.parse::<u64>().ok())
+                .unwrap_or(0);
+            (is_original as u64 * 1_000_000_000) + size
+        })
+        .and_then(|f| f["name"].as_str())
+}
+
+#[async_trait]
+impl MusicProvider for ArchiveProvider {
+    fn name(&self) -> &'static str {
+        "Internet Archive"
+    }
+
+    fn platform(&self) -> Platform {
+        Platform::InternetArchive
+    }
+
+    async fn search(&self, query: &str, limit: u32) -> Result<Vec<Track>, ProviderError> {
+        let cache_key = format!("{}:{}", query, limit);
+        if let Some(cached) = self.search_cache.get(&cache_key).await {
+            return Ok(cached);
         }
 
-        let json: serde_json::Value = resp.json().await?;
+        let mut local = Vec::new();
+        if let Some(mirror) = &self.mirror {
+            match mirror.search(SOURCE_ARCHIVE, query, limit).await {
+                Ok(rows) => local = rows.into_iter().map(mirror_track).collect(),
+                Err(e) => warn!("[cc_mirror] search failed, going upstream: {}", e),
+            }
+        }
+        // A full page from the mirror is enough; a partial one is topped up
+        // with upstream results instead of hiding them.
+        if local.len() >= limit as usize {
+            self.search_cache.insert(cache_key, local.clone()).await;
+            return Ok(local);
+        }
 
-        // Verify the item has a legal license
-        let license = json["metadata"]["licenseurl"]
-            .as_str()
-            .or_else(|| json["metadata"]["license"].as_str())
-            .unwrap_or("");
+        let upstream = match self.search_upstream(query, limit).await {
+            Ok(tracks) => tracks,
+            Err(e) if !local.is_empty() => {
+                warn!(
+                    "[cc_mirror] upstream search failed, serving mirror hits: {}",
+                    e
+                );
+                return Ok(local);
+            }
+            Err(e) => return Err(e),
+        };
 
-        if !license.contains("creativecommons") && !license.contains("publicdomain") {
-            return Err(ProviderError::Api(format!(
-                "IA item {} does not have a CC or public domain license",
-                id
-            )));
+        // Write-through: upstream hits enter the mirror's work queue; they become
+        // searchable locally once `resolve` or the crawler fill the stream.
+        if let Some(mirror) = &self.mirror {
+            let entries: Vec<MirrorEntry> = upstream
+                .iter()
+                .map(|t| MirrorEntry {
+                    item_id: t.id.clone(),
+                    title: t.title.clone(),
+                    artist: t.artist.clone(),
+                    best_stream_url: None,
+                    license_url: None,
+                    popularity: 0,
+                })
+                .collect();
+            if let Err(e) = mirror.upsert(SOURCE_ARCHIVE, &entries).await {
+                warn!("[cc_mirror] write-through failed: {}", e);
+            }
         }
 
-        // Find the first playable audio file
-        let files = json["files"]
-            .as_array()
-            .ok_or_else(|| ProviderError::Parse("No files in IA metadata".into()))?;
+        let tracks = merge_results(local, upstream, limit as usize);
+        self.search_cache.insert(cache_key, tracks.clone()).await;
+        Ok(tracks)
+    }
 
-        let audio_extensions = ["mp3", "ogg", "flac", "wav", "m4a"];
-        let audio_file = files
-            .iter()
-            .filter(|f| {
-                let name = f["name"].as_str().unwrap_or("");
-                let format = f["format"].as_str().unwrap_or("").to_lowercase();
-                let ext = name.rsplit('.').next().unwrap_or("").to_lowercase();
-                (audio_extensions.contains(&ext.as_str())
-                    || format.contains("mp3")
-                    || format.contains("ogg")
-                    || format.contains("flac"))
-                    && f["source"].as_str() != Some("metadata")
-            })
-            // Prefer "original" source, then by size (largest = highest quality)
-            .max_by_key(|f| {
-                let is_original = f["source"].as_str() == Some("original");
-                let size = f["size"].as_str().and_then(|s| s.parse::<u64>().ok()).unwrap_or(0);
-                (is_original as u64 * 1_000_000_000) + size
-            });
+    async fn resolve(&self, id: &str) -> Result<EmbedInfo, ProviderError> {
+        if let Some(cached) = self.resolve_cache.get(&id.to_string()).await {
+            return Ok(cached);
+        }
+
+        if let Some(mirror) = &self.mirror {
+            match mirror.best_stream(SOURCE_ARCHIVE, id).await {
+                Ok(Some(stream)) => {
+                    let info = EmbedInfo {
+                        embed_url: Self::embed_url(id),
+                        external_url: Self::details_url(id),
+                        preview_url: Some(stream),
+                    };
+                    self.resolve_cache.insert(id.to_string(), info.clone()).await;
+                    return Ok(info);
+                }
+                Ok(None) => {}
+                Err(e) => warn!("[cc_mirror] resolve lookup failed for {}: {}", id, e),
+            }
+        }
 
-        let preview_url = audio_file
-            .and_then(|f| f["name"].as_str())
-            .map(|filename| Self::direct_stream_url(id, filename));
+        let item = self.fetch_item(id).await?;
+        let preview_url = item.best_stream_url.clone();
+
+        if let Some(mirror) = &self.mirror {
+            if preview_url.is_some() {
+                if let Err(e) = mirror.upsert(SOURCE_ARCHIVE, &[item]).await {
+                    warn!("[cc_mirror] write-through failed for {}: {}", id, e);
+                }
+            }
+        }
 
         let info = EmbedInfo {
             embed_url: Self::embed_url(id),
@@ -264,6 +542,60 @@ mod tests {
         );
     }
 
+    #[test]
+    fn test_pick_best_audio_file_prefers_original_then_size() {
+        let files = vec![
+            serde_json::json!({"name": "t1_vbr.mp3", "format": "VBR MP3", "source": "derivative", "size": "9000000"}),
+            serde_json::json!({"name": "t1.flac", "format": "Flac", "source": "original", "size": "30000000"}),
+            serde_json::json!({"name": "t2.flac", "format": "Flac", "source": "original", "size": "20000000"}),
+            serde_json::json!({"name": "item_meta.xml", "format": "Metadata", "source": "metadata"}),
+        ];
+        assert_eq!(pick_best_audio_file(&files), Some("t1.flac"));
+    }
+
+    #[test]
+    fn test_pick_best_audio_file_none_without_audio() {
+        let files =
+            vec![serde_json::json!({"name": "cover.jpg", "format": "JPEG", "source": "original"})];
+        assert_eq!(pick_best_audio_file(&files), None);
+    }
+
+    #[test]
+    fn test_is_legal_license() {
+        assert!(is_legal_license(
+            "http://creativecommons.org/licenses/by-nc-sa/3.0/"
+        ));
+        assert!(is_legal_license(
+            "http://creativecommons.org/publicdomain/mark/1.0/"
+        ));
+        assert!(!is_legal_license(""));
+    }
+
+    fn track(id: &str, stream: Option<&str>) -> Track {
+        Track {
+            id: id.into(),
+            platform: Platform::InternetArchive,
+            title: id.into(),
+            artist: "a".into(),
+            thumbnail: None,
+            duration: None,
+            embed_url: String::new(),
+            external_url: String::new(),
+            preview_url: stream.map(str::to_string),
+        }
+    }
+
+    #[test]
+    fn test_merge_results_tops_up_mirror_with_upstream() {
+        let local = vec![track("a", Some("s")), track("b", Some("s"))];
+        let upstream = vec![track("b", None), track("c", None), track("d", None)];
+        let merged = merge_results(local, upstream, 3);
+        let ids: Vec<&str> = merged.iter().map(|t| t.id.as_str()).collect();
+        assert_eq!(ids, ["a", "b", "c"]);
+        // The mirror copy (with its resolved stream) wins over upstream's.
+        assert!(merged[1].preview_url.is_some());
+    }
+
     #[test]
     fn test_legal_collections_not_empty() {
         assert!(!LEGAL_COLLECTIONS.is_empty());
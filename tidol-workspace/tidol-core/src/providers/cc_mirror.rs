@@ -0,0 +1,260 @@
+// =========================================================================
+// Espejo local de catálogos CC/PD (tabla `cc_catalog`)
+//
+// Copia en MariaDB de los metadatos de ítems de colecciones legales junto con
+// el mejor stream precalculado. `ArchiveProvider` consulta aquí ANTES de ir a
+// `advancedsearch.php`/metadata API, así búsqueda y resolve sobreviven a
+// reinicios, se comparten entre réplicas y solo salen a upstream para refrescar.
+// El rastreador de fondo (`ArchiveProvider::sync_mirror`) es quien lo rellena.
+// =========================================================================
+use sqlx::MySqlPool;
+
+/// Fuente del ítem en el espejo (columna `source`).
+pub const SOURCE_ARCHIVE: &str = "archive";
+
+/// Filas por sentencia en los upserts multi-fila (acota el tamaño del paquete).
+const UPSERT_BATCH: usize = 200;
+
+/// Fila del espejo tal como la guarda el rastreador o el write-through.
+#[derive(Debug, Clone)]
+pub struct MirrorEntry {
+    pub item_id: String,
+    pub title: String,
+    pub artist: String,
+    /// URL directa del mejor fichero de audio; `None` = aún sin resolver
+    /// (el upsert conserva la que hubiera).
+    pub best_stream_url: Option<String>,
+    pub license_url: Option<String>,
+    /// Descargas en upstream: orden de relevancia secundario en búsquedas.
+    pub popularity: i64,
+}
+
+/// Acceso al espejo. Barato de clonar (solo envuelve el pool).
+#[derive(Clone)]
+pub struct CcMirror {
+    db: MySqlPool,
+}
+
+impl CcMirror {
+    pub fn new(db: MySqlPool) -> Self {
+        Self { db }
+    }
+
+    /// DDL idempotente del espejo (ver migrations/004_cc_catalog_mirror.sql).
+    pub async fn ensure_schema(db: &MySqlPool) -> Result<(), sqlx::Error> {
+        sqlx::query(
+            "CREATE TABLE IF NOT EXISTS cc_catalog (
+                source          VARCHAR(20)  NOT NULL,
+                item_id         VARCHAR(255) NOT NULL,
+                title           VARCHAR(500) NOT NULL,
+                artist          VARCHAR(255) NOT NULL,
+                best_stream_url TEXT         DEFAULT NULL,
+                license_url     TEXT         DEFAULT NULL,
+                popularity      BIGINT       NOT NULL DEFAULT 0,
+                rejected        TINYINT(1)   NOT NULL DEFAULT 0,
+                synced_at       TIMESTAMP    DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (source, item_id),
+                KEY idx_cc_catalog_stale (source, synced_at),
+                FULLTEXT KEY ft_cc_catalog (title, artist)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci",
+        )
+        .execute(db)
+        .await?;
+        // Tablas creadas antes de marcar los rechazos (migrations/009).
+        sqlx::query(
+            "ALTER TABLE cc_catalog
+                ADD COLUMN IF NOT EXISTS rejected TINYINT(1) NOT NULL DEFAULT 0",
+        )
+        .execute(db)
+        .await?;
+        Ok(())
+    }
+
+    /// Búsqueda full-text local: `(item_id, title, artist, best_stream_url)`
+    /// ordenado por relevancia y luego popularidad. Solo ítems con stream
+    /// resuelto: los pendientes o rechazados no se pueden reproducir. Consulta
+    /// sin términos indexables → vacío (el llamador cae a upstream).
+    pub async fn search(
+        &self,
+        source: &str,
+        query: &str,
+        limit: u32,
+    ) -> Result<Vec<(String, String, String, String)>, sqlx::Error> {
+        let Some(expr) = fulltext_expr(query) else {
+            return Ok(Vec::new());
+        };
+        sqlx::query_as::<_, (String, String, String, String)>(
+            "SELECT item_id, title, artist, best_stream_url
+             FROM cc_catalog
+             WHERE source = ? AND MATCH(title, artist) AGAINST (? IN BOOLEAN MODE)
+               AND best_stream_url IS NOT NULL
+             ORDER BY MATCH(title, artist) AGAINST (? IN BOOLEAN MODE) DESC, popularity DESC
+             LIMIT ?",
+        )
+        .bind(source)
+        .bind(&expr)
+        .bind(&expr)
+        .bind(limit)
+        .fetch_all(&self.db)
+        .await
+    }
+
+    /// Mejor stream precalculado de un ítem, si ya se resolvió alguna vez.
+    pub async fn best_stream(
+        &self,
+        source: &str,
+        item_id: &str,
+    ) -> Result<Option<String>, sqlx::Error> {
+        let row: Option<(Option<String>,)> = sqlx::query_as(
+            "SELECT best_stream_url FROM cc_catalog WHERE source = ? AND item_id = ?",
+        )
+        .bind(source)
+        .bind(item_id)
+        .fetch_optional(&self.db)
+        .await?;
+        Ok(row.and_then(|(url,)| url))
+    }
+
+    /// `(title, artist)` de un ítem del espejo con licencia legal anotada y sin
+    /// rechazar; `None` si no está o no consta como legal.
+    pub async fn legal_item(
+        &self,
+        source: &str,
+        item_id: &str,
+    ) -> Result<Option<(String, String)>, sqlx::Error> {
+        let row: Option<(String, String, String)> = sqlx::query_as(
+            "SELECT title, artist, license_url FROM cc_catalog
+             WHERE source = ? AND item_id = ? AND rejected = 0 AND license_url IS NOT NULL",
+        )
+        .bind(source)
+        .bind(item_id)
+        .fetch_optional(&self.db)
+        .await?;
+        Ok(row
+            .filter(|(_, _, license)| super::archive::is_legal_license(license))
+            .map(|(title, artist, _)| (title, artist)))
+    }
+
+    /// Ítems sin stream resuelto (y no rechazados) o resueltos/rechazados hace
+    /// más de `max_age_hours`, los más populares primero: la cola de trabajo
+    /// del rastreador. Un rechazo se reintenta solo al caducar.
+    pub async fn stale_items(
+        &self,
+        source: &str,
+        max_age_hours: u64,
+        limit: u32,
+    ) -> Result<Vec<String>, sqlx::Error> {
+        let rows: Vec<(String,)> = sqlx::query_as(
+            "SELECT item_id FROM cc_catalog
+             WHERE source = ?
+               AND ((best_stream_url IS NULL AND rejected = 0)
+                    OR synced_at < NOW() - INTERVAL ? HOUR)
+             ORDER BY popularity DESC
+             LIMIT ?",
+        )
+        .bind(source)
+        .bind(max_age_hours)
+        .bind(limit)
+        .fetch_all(&self.db)
+        .await?;
+        Ok(rows.into_iter().map(|(id,)| id).collect())
+    }
+
+    /// Upsert multi-fila por lotes. Un `best_stream_url`/`license_url` nulo no
+    /// pisa el valor existente (el listado de búsqueda no trae ficheros), y
+    /// `synced_at` (última resolución) solo avanza con un stream nuevo.
+    pub async fn upsert(&self, source: &str, entries: &[MirrorEntry]) -> Result<u64, sqlx::Error> {
+        let mut affected = 0;
+        for chunk in entries.chunks(UPSERT_BATCH) {
+            let mut qb = sqlx::QueryBuilder::<sqlx::MySql>::new(
+                "INSERT INTO cc_catalog
+                    (source, item_id, title, artist, best_stream_url, license_url, popularity) ",
+            );
+            qb.push_values(chunk, |mut b, e| {
+                b.push_bind(source)
+                    .push_bind(&e.item_id)
+                    .push_bind(&e.title)
+                    .push_bind(&e.artist)
+                    .push_bind(&e.best_stream_url)
+                    .push_bind(&e.license_url)
+                    .push_bind(e.popularity);
+            });
+            qb.push(
+                " ON DUPLICATE KEY UPDATE
+                    title = VALUES(title),
+                    artist = VALUES(artist),
+                    best_stream_url = COALESCE(VALUES(best_stream_url), best_stream_url),
+                    license_url = COALESCE(VALUES(license_url), license_url),
+                    popularity = GREATEST(VALUES(popularity), popularity),
+                    rejected = IF(VALUES(best_stream_url) IS NULL, rejected, 0),
+                    synced_at = IF(VALUES(best_stream_url) IS NULL, synced_at, CURRENT_TIMESTAMP)",
+            );
+            affected += qb.build().execute(&self.db).await?.rows_affected();
+        }
+        Ok(affected)
+    }
+
+    /// Marca ítems sin licencia legal o sin audio reproducible: salen de la
+    /// búsqueda y el rastreador no los reintenta hasta que caduquen.
+    pub async fn mark_rejected(
+        &self,
+        source: &str,
+        item_ids: &[String],
+    ) -> Result<u64, sqlx::Error> {
+        let mut affected = 0;
+        for chunk in item_ids.chunks(UPSERT_BATCH) {
+            let mut qb = sqlx::QueryBuilder::<sqlx::MySql>::new(
+                "UPDATE cc_catalog
+                 SET rejected = 1, best_stream_url = NULL, synced_at = CURRENT_TIMESTAMP
+                 WHERE source = ",
+            );
+            qb.push_bind(source).push(" AND item_id IN (");
+            let mut ids = qb.separated(", ");
+            for id in chunk {
+                ids.push_bind(id);
+            }
+            ids.push_unseparated(")");
+            affected += qb.build().execute(&self.db).await?.rows_affected();
+        }
+        Ok(affected)
+    }
+}
+
+/// Traduce la consulta del usuario a una expresión `BOOLEAN MODE`: cada
+/// palabra alfanumérica de ≥ 3 caracteres (mínimo por defecto de InnoDB) pasa
+/// a `+palabra*`. Los operadores del usuario se descartan para que no puedan
+/// alterar la semántica de la búsqueda.
+pub(crate) fn fulltext_expr(query: &str) -> Option<String> {
+    let terms: Vec<String> = query
+        .split(|c: char| !c.is_alphanumeric())
+        .filter(|w| w.chars().count() >= 3)
+        .map(|w| format!("+{}*", w.to_lowercase()))
+        .collect();
+    if terms.is_empty() {
+        None
+    } else {
+        Some(terms.join(" "))
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn fulltext_exige_todos_los_terminos_con_prefijo() {
+        assert_eq!(
+            fulltext_expr("Grateful Dead 1977").as_deref(),
+            Some("+grateful* +dead* +1977*")
+        );
+    }
+
+    #[test]
+    fn fulltext_descarta_operadores_y_palabras_cortas() {
+        assert_eq!(
+            fulltext_expr("-live +\"dj\" (set)").as_deref(),
+            Some("+live* +set*")
+        );
+        assert_eq!(fulltext_expr("a b ~"), None);
+    }
+}
@@ -1,4 +1,5 @@
 pub mod archive;
+pub mod cc_mirror;
 pub mod provider_trait;
 pub mod soundcloud;
 pub mod spotify;
@@ -98,6 +98,10 @@ pub enum ProviderError {
     #[error("Rate limited")]
     RateLimited,
 
+    /// The item exists but is not under a license we may stream.
+    #[error("Not CC/PD licensed: {0}")]
+    Unlicensed(String),
+
     #[error("Missing configuration: {0}")]
     MissingConfig(String),
 
@@ -0,0 +1,433 @@
+// =========================================================================
+// Sugerencias de búsqueda (GET /api/v1/search/suggest?q=…)
+//
+// Cada búsqueda iba a `/search/:query`, que sale a MusicBrainz; para teclear
+// no sirve. `searchClicks` ya guarda qué pista eligió la gente para cada
+// consulta normalizada (`normalize_query`), así que el índice de sugerencias
+// sale de ahí y se responde desde memoria, sin BD ni red:
+//
+// - Repartido en `SHARDS` fragmentos por el primer carácter de la consulta
+//   (tras normalizar solo quedan `a-z0-9`): una tecla solo bloquea su
+//   fragmento, y un click solo escribe en el suyo.
+// - Dentro de cada fragmento, un mapa ordenado consulta → (clicks, pistas más
+//   elegidas) resuelve los prefijos largos recorriendo su rango entero (solo
+//   se guarda el top pedido, no se ordena todo); para los cortos
+//   (≤ `HOT_PREFIX_LEN`), donde el rango abarcaría media tabla, se mantiene
+//   el top-K de consultas ya calculado.
+// - Una consulta no se sugiere hasta tener `MIN_CLICKS` clicks: filtra erratas
+//   y consultas sueltas, no es una garantía de privacidad (cuenta clicks, no
+//   usuarios distintos: quien repita la misma búsqueda la hace sugerible).
+// - `register_click` lo actualiza al momento (+1 a consulta y pista). Cada
+//   `REBUILD_INTERVAL` se reconstruye desde la BD (la réplica de lectura):
+//   incorpora los clicks que registraron otras réplicas y poda la cola larga.
+// =========================================================================
+use std::collections::{BTreeMap, HashMap};
+use std::ops::Bound;
+use std::sync::{Arc, PoisonError, RwLock};
+use std::time::Duration;
+
+use serde::Deserialize;
+use sqlx::{MySqlPool, Row};
+use tracing::{info, warn};
+
+use crate::catalog::normalize_query;
+use crate::db_router::DbRouter;
+use crate::models::{SuggestResponse, SuggestedTrack, Suggestion};
+use crate::TidolCore;
+
+/// `a-z` + `0-9`.
+const SHARDS: usize = 36;
+/// Prefijos con top-K precalculado; los más largos se resuelven por rango.
+const HOT_PREFIX_LEN: usize = 3;
+/// Consultas que se guardan por prefijo corto.
+const TOP_QUERIES: usize = 10;
+/// Pistas que se guardan por consulta.
+const TOP_TRACKS: usize = 5;
+/// Clicks mínimos para que una consulta se sugiera (filtro de ruido; no
+/// distingue usuarios).
+const MIN_CLICKS: u64 = 3;
+/// Tope de consultas por fragmento entre reconstrucciones (las nuevas por
+/// encima de él esperan a la siguiente).
+const MAX_QUERIES_PER_SHARD: usize = 20_000;
+/// Filas (consulta, pista) más clicadas que carga cada reconstrucción.
+const REBUILD_ROWS: i64 = 200_000;
+const REBUILD_INTERVAL: Duration = Duration::from_secs(6 * 3600);
+
+const DEFAULT_LIMIT: usize = 8;
+const MAX_LIMIT: usize = TOP_QUERIES;
+
+/// `GET /api/v1/search/suggest?q=…&limit=N` (limit 1..=10, por defecto 8).
+#[derive(Deserialize)]
+pub struct SuggestQuery {
+    #[serde(default)]
+    pub q: String,
+    pub limit: Option<usize>,
+}
+
+// -------------------------------------------------------------------------
+// FRAGMENTO
+// -------------------------------------------------------------------------
+#[derive(Default)]
+struct QueryEntry {
+    clicks: u64,
+    /// Más clicadas primero. Al recortar se pierde la cuenta de las que salen;
+    /// la siguiente reconstrucción la recupera de la BD.
+    tracks: Vec<SuggestedTrack>,
+}
+
+impl QueryEntry {
+    fn add(&mut self, track: SuggestedTrack, clicks: u64) {
+        self.clicks += clicks;
+        match self
+            .tracks
+            .iter_mut()
+            .find(|t| t.track_id == track.track_id)
+        {
+            // Metadatos del último click: la portada pudo cambiar.
+            Some(t) => {
+                let clicks = t.clicks + clicks;
+                *t = SuggestedTrack { clicks, ..track };
+            }
+            None => self.tracks.push(SuggestedTrack { clicks, ..track }),
+        }
+        self.tracks.sort_by(|a, b| b.clicks.cmp(&a.clicks));
+        self.tracks.truncate(TOP_TRACKS);
+    }
+}
+
+#[derive(Default)]
+struct Shard {
+    queries: BTreeMap<Arc<str>, QueryEntry>,
+    /// Prefijo corto → top-K (clicks, consulta), ya ordenado.
+    hot: HashMap<String, Vec<(u64, Arc<str>)>>,
+}
+
+/// Más clicks primero; a igualdad, la consulta más corta (y luego alfabético).
+fn rank(a: &(u64, Arc<str>), b: &(u64, Arc<str>)) -> std::cmp::Ordering {
+    b.0.cmp(&a.0)
+        .then_with(|| a.1.len().cmp(&b.1.len()))
+        .then_with(|| a.1.cmp(&b.1))
+}
+
+/// Sube `query` con su nuevo total a un top-K. Los totales solo crecen, así
+/// que lo que sale del top no puede haber debido quedarse.
+fn promote(top: &mut Vec<(u64, Arc<str>)>, query: &Arc<str>, clicks: u64) {
+    if let Some(pos) = top.iter().position(|(_, q)| q == query) {
+        top[pos].0 = clicks;
+    } else if top.len() < TOP_QUERIES || top.last().is_some_and(|(c, _)| *c < clicks) {
+        top.push((clicks, query.clone()));
+    } else {
+        return;
+    }
+    top.sort_by(rank);
+    top.truncate(TOP_QUERIES);
+}
+
+impl Shard {
+    fn record(&mut self, query: &str, track: SuggestedTrack, clicks: u64) {
+        let key = match self.queries.get_key_value(query) {
+            Some((key, _)) => key.clone(),
+            None if self.queries.len() >= MAX_QUERIES_PER_SHARD => return,
+            None => Arc::from(query),
+        };
+        let entry = self.queries.entry(key.clone()).or_default();
+        entry.add(track, clicks);
+        let total = entry.clicks;
+        for len in 1..=HOT_PREFIX_LEN.min(key.len()) {
+            let Some(prefix) = key.get(..len) else { break };
+            promote(self.hot.entry(prefix.to_string()).or_default(), &key, total);
+        }
+    }
+
+    fn suggest(&self, prefix: &str, limit: usize) -> Vec<Suggestion> {
+        let picks: Vec<(u64, Arc<str>)> = if prefix.len() <= HOT_PREFIX_LEN {
+            self.hot.get(prefix).cloned().unwrap_or_default()
+        } else {
+            // Todo el rango: una consulta popular puede ordenar al final.
+            let mut top: Vec<(u64, Arc<str>)> = Vec::with_capacity(limit + 1);
+            for (q, e) in self
+                .queries
+                .range::<str, _>((Bound::Included(prefix), Bound::Unbounded))
+                .take_while(|(q, _)| q.starts_with(prefix))
+                .filter(|(_, e)| e.clicks >= MIN_CLICKS)
+            {
+                let pick = (e.clicks, q.clone());
+                if top.len() == limit && top.last().is_some_and(|last| rank(&pick, last).is_ge()) {
+                    continue;
+                }
+                let pos = top.partition_point(|t| rank(t, &pick).is_lt());
+                top.insert(pos, pick);
+                top.truncate(limit);
+            }
+            top
+        };
+        picks
+            .into_iter()
+            // El top corto va ordenado: lo que no llega al mínimo está al final.
+            .take_while(|(clicks, _)| *clicks >= MIN_CLICKS)
+            .take(limit)
+            .filter_map(|(clicks, q)| {
+                let entry = self.queries.get(&*q)?;
+                Some(Suggestion {
+                    query: q.to_string(),
+                    clicks,
+                    tracks: entry.tracks.clone(),
+                })
+            })
+            .collect()
+    }
+}
+
+fn shard_of(query: &str) -> Option<usize> {
+    match *query.as_bytes().first()? {
+        b @ b'a'..=b'z' => Some((b - b'a') as usize),
+        b @ b'0'..=b'9' => Some(26 + (b - b'0') as usize),
+        _ => None,
+    }
+}
+
+// -------------------------------------------------------------------------
+// ÍNDICE
+// -------------------------------------------------------------------------
+/// Índice de sugerencias en memoria. Las consultas llegan ya normalizadas.
+pub(crate) struct SuggestIndex {
+    shards: Vec<RwLock<Shard>>,
+}
+
+impl SuggestIndex {
+    pub(crate) fn new() -> Self {
+        Self {
+            shards: (0..SHARDS).map(|_| RwLock::new(Shard::default())).collect(),
+        }
+    }
+
+    /// Un click en `track` para `query`.
+    pub(crate) fn record(&self, query: &str, track: SuggestedTrack) {
+        let Some(i) = shard_of(query) else { return };
+        self.shards[i]
+            .write()
+            .unwrap_or_else(PoisonError::into_inner)
+            .record(query, track, 1);
+    }
+
+    pub(crate) fn suggest(&self, prefix: &str, limit: usize) -> Vec<Suggestion> {
+        let Some(i) = shard_of(prefix) else {
+            return Vec::new();
+        };
+        self.shards[i]
+            .read()
+            .unwrap_or_else(PoisonError::into_inner)
+            .suggest(prefix, limit)
+    }
+
+    /// Carga las filas más clicadas de `searchClicks` en fragmentos nuevos y
+    /// los intercambia uno a uno (las lecturas nunca ven uno a medias).
+    async fn rebuild(&self, db: &MySqlPool) -> Result<usize, sqlx::Error> {
+        let rows = sqlx::query(
+            "SELECT sc.queryNormalized, sc.trackId, sc.clicks,
+                    tm.trackName, tm.artistName, tm.coverArtUrl, tm.sourceLink
+             FROM searchClicks sc
+             JOIN trackMetadata tm ON tm.trackId = sc.trackId
+             WHERE sc.clicks > 0
+             ORDER BY sc.clicks DESC
+             LIMIT ?",
+        )
+        .bind(REBUILD_ROWS)
+        .fetch_all(db)
+        .await?;
+
+        let mut shards: Vec<Shard> = (0..SHARDS).map(|_| Shard::default()).collect();
+        for row in &rows {
+            let query: String = row.try_get("queryNormalized")?;
+            // Filas anteriores a normalize_query: se normalizan al cargar.
+            let query = normalize_query(&query);
+            let Some(i) = shard_of(&query) else { continue };
+            let clicks: Option<i32> = row.try_get("clicks")?;
+            let track = SuggestedTrack {
+                track_id: row.try_get("trackId")?,
+                track_name: row.try_get("trackName")?,
+                artist_name: row.try_get("artistName")?,
+                cover_art_url: row.try_get("coverArtUrl")?,
+                source_link: row.try_get("sourceLink")?,
+                clicks: 0,
+            };
+            shards[i].record(&query, track, clicks.unwrap_or(0).max(0) as u64);
+        }
+
+        let mut queries = 0;
+        for (slot, fresh) in self.shards.iter().zip(shards) {
+            queries += fresh.queries.len();
+            *slot.write().unwrap_or_else(PoisonError::into_inner) = fresh;
+        }
+        Ok(queries)
+    }
+
+    /// Primera carga al arrancar (en segundo plano: no retrasa el servidor) y
+    /// luego cada `REBUILD_INTERVAL`.
+    pub(crate) fn spawn_rebuild(self: &Arc<Self>, router: DbRouter) {
+        let index = self.clone();
+        tokio::spawn(async move {
+            let mut tick = tokio::time::interval(REBUILD_INTERVAL);
+            loop {
+                tick.tick().await;
+                match index.rebuild(router.reader()).await {
+                    Ok(n) => info!("[suggest] índice reconstruido: {} consultas", n),
+                    Err(e) => warn!("[suggest] reconstrucción fallida: {}", e),
+                }
+            }
+        });
+    }
+}
+
+impl TidolCore {
+    /// GET /api/v1/search/suggest — consultas populares que empiezan por `q`
+    /// (normalizada) con sus pistas más elegidas. Solo memoria: sin BD ni red.
+    pub fn suggest_queries(&self, q: &str, limit: Option<usize>) -> SuggestResponse {
+        let prefix = normalize_query(q);
+        let limit = limit.unwrap_or(DEFAULT_LIMIT).clamp(1, MAX_LIMIT);
+        SuggestResponse {
+            suggestions: self.suggest.suggest(&prefix, limit),
+            query: prefix,
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn track(id: &str) -> SuggestedTrack {
+        SuggestedTrack {
+            track_id: id.into(),
+            track_name: format!("Tema {id}"),
+            artist_name: Some("Artista".into()),
+            cover_art_url: None,
+            source_link: None,
+            clicks: 0,
+        }
+    }
+
+    fn clicks(index: &SuggestIndex, query: &str, id: &str, n: usize) {
+        for _ in 0..n {
+            index.record(query, track(id));
+        }
+    }
+
+    fn queries(s: &[Suggestion]) -> Vec<&str> {
+        s.iter().map(|s| s.query.as_str()).collect()
+    }
+
+    #[test]
+    fn prefijo_corto_ordena_por_clicks() {
+        let index = SuggestIndex::new();
+        clicks(&index, "daft punk", "a", 5);
+        clicks(&index, "dance gavin dance", "b", 3);
+        clicks(&index, "david bowie", "c", 9);
+        clicks(&index, "queen", "d", 50);
+
+        let s = index.suggest("da", 10);
+        assert_eq!(
+            queries(&s),
+            ["david bowie", "daft punk", "dance gavin dance"]
+        );
+        assert_eq!(s[0].clicks, 9);
+        assert_eq!(queries(&index.suggest("daf", 10)), ["daft punk"]);
+        assert!(index.suggest("x", 10).is_empty());
+    }
+
+    #[test]
+    fn prefijo_largo_por_rango() {
+        let index = SuggestIndex::new();
+        clicks(&index, "daft punk", "a", 3);
+        clicks(&index, "daft punk discovery", "b", 5);
+        clicks(&index, "daft punkers", "c", 4);
+        clicks(&index, "daft pun", "d", 7);
+
+        let s = index.suggest("daft punk", 10);
+        assert_eq!(
+            queries(&s),
+            ["daft punk discovery", "daft punkers", "daft punk"]
+        );
+        assert_eq!(
+            queries(&index.suggest("daft punk", 1)),
+            ["daft punk discovery"]
+        );
+    }
+
+    #[test]
+    fn prefijo_largo_recorre_todo_el_rango() {
+        let index = SuggestIndex::new();
+        for i in 0..3_000 {
+            clicks(
+                &index,
+                &format!("daft punk {i:04}"),
+                "a",
+                MIN_CLICKS as usize,
+            );
+        }
+        // Ordena detrás de todas las anteriores, pero es la más clicada.
+        clicks(&index, "daft punk zzz", "b", 50);
+
+        assert_eq!(queries(&index.suggest("daft punk", 1)), ["daft punk zzz"]);
+        assert_eq!(index.suggest("daft punk", 3).len(), 3);
+    }
+
+    #[test]
+    fn pocos_clicks_no_se_sugieren() {
+        let index = SuggestIndex::new();
+        clicks(&index, "daft pnuk", "a", MIN_CLICKS as usize - 1);
+        assert!(index.suggest("da", 10).is_empty());
+        assert!(index.suggest("daft pn", 10).is_empty());
+
+        clicks(&index, "daft pnuk", "a", 1);
+        assert_eq!(queries(&index.suggest("da", 10)), ["daft pnuk"]);
+        assert_eq!(queries(&index.suggest("daft pn", 10)), ["daft pnuk"]);
+    }
+
+    #[test]
+    fn pistas_mas_elegidas_por_consulta() {
+        let index = SuggestIndex::new();
+        clicks(&index, "muse", "uprising", 3);
+        clicks(&index, "muse", "hysteria", 5);
+        for i in 0..TOP_TRACKS + 2 {
+            clicks(&index, "muse", &format!("otra-{i}"), 1);
+        }
+
+        let s = index.suggest("mu", 1);
+        assert_eq!(s[0].clicks, 8 + TOP_TRACKS as u64 + 2);
+        let ids: Vec<&str> = s[0].tracks.iter().map(|t| t.track_id.as_str()).collect();
+        assert_eq!(ids.len(), TOP_TRACKS);
+        assert_eq!(&ids[..2], ["hysteria", "uprising"]);
+        assert_eq!(s[0].tracks[0].clicks, 5);
+    }
+
+    #[test]
+    fn top_corto_acotado_y_al_dia() {
+        let index = SuggestIndex::new();
+        for i in 0..TOP_QUERIES + 5 {
+            clicks(&index, &format!("rock {i:02}"), "t", 3);
+        }
+        // Una consulta que no estaba en el top entra al superar al último.
+        clicks(&index, "rock 14", "t", 5);
+
+        let s = index.suggest("r", MAX_LIMIT);
+        assert_eq!(s.len(), TOP_QUERIES);
+        assert_eq!(s[0].query, "rock 14");
+        assert_eq!(s[0].clicks, 8);
+    }
+
+    #[test]
+    fn fragmentos_por_primer_caracter() {
+        assert_eq!(shard_of("abc"), Some(0));
+        assert_eq!(shard_of("zz"), Some(25));
+        assert_eq!(shard_of("0 to 100"), Some(26));
+        assert_eq!(shard_of("9"), Some(35));
+        assert_eq!(shard_of(""), None);
+        assert_eq!(shard_of(" a"), None);
+
+        let index = SuggestIndex::new();
+        clicks(&index, "2pac", "a", MIN_CLICKS as usize);
+        assert_eq!(queries(&index.suggest("2", 10)), ["2pac"]);
+        assert!(index.suggest("", 10).is_empty());
+    }
+}
@@ -1,9 +1,23 @@
+use base64::engine::general_purpose::URL_SAFE_NO_PAD;
+use base64::Engine;
 use serde::Deserialize;
+use sqlx::types::time::OffsetDateTime;
+use sqlx::{MySql, MySqlPool, QueryBuilder};
 use thiserror::Error;
 use uuid::Uuid;
 
+use crate::like_sync::LikeOp;
+use crate::models::{
+    HistoryEntry, LikedTrack, Page, PlaylistDetail, PlaylistSong, PlaylistSummary,
+};
 use crate::TidolCore;
 
+/// Página por defecto y máxima de los listados paginados por cursor.
+const DEFAULT_PAGE_SIZE: u32 = 50;
+const MAX_PAGE_SIZE: u32 = 200;
+/// Tope del historial sin paginar (comportamiento previo del endpoint).
+const LEGACY_HISTORY_LIMIT: u32 = 50;
+
 // -------------------------------------------------------------------------
 // PAYLOADS
 // -------------------------------------------------------------------------
@@ -80,6 +94,42 @@ pub struct ToggleLikePayload {
 pub struct LikesDetailedQuery {
     /// 'local' | 'archive' | ausente (= todos)
     pub source: Option<String>,
+    // Campos de `PageQuery` repetidos: `#[serde(flatten)]` rompe los números
+    // en query strings (serde_urlencoded los entrega como texto).
+    pub limit: Option<u32>,
+    pub cursor: Option<String>,
+}
+
+impl LikesDetailedQuery {
+    pub fn page(&self) -> PageQuery {
+        PageQuery {
+            limit: self.limit,
+            cursor: self.cursor.clone(),
+        }
+    }
+}
+
+/// `?limit=&cursor=` de los listados de biblioteca (likes, historial,
+/// canciones de playlist). Sin ninguno de los dos, el endpoint responde el
+/// array de siempre; con alguno, `{ items, nextCursor }` (keyset: cada página
+/// es una lectura por índice que empieza donde acabó la anterior).
+#[derive(Deserialize, Default)]
+pub struct PageQuery {
+    pub limit: Option<u32>,
+    /// Opaco: el `nextCursor` de la página anterior.
+    pub cursor: Option<String>,
+}
+
+impl PageQuery {
+    pub fn is_paged(&self) -> bool {
+        self.limit.is_some() || self.cursor.is_some()
+    }
+
+    fn size(&self) -> u32 {
+        self.limit
+            .unwrap_or(DEFAULT_PAGE_SIZE)
+            .clamp(1, MAX_PAGE_SIZE)
+    }
 }
 
 // -------------------------------------------------------------------------
@@ -124,30 +174,277 @@ pub enum ToggleIaLikeError {
     MissingId,
 }
 
+/// `InvalidCursor` → 400 "Cursor inválido".
+#[derive(Debug, PartialEq, Eq)]
+pub enum PageError {
+    InvalidCursor,
+}
+
+// -------------------------------------------------------------------------
+// CURSORES (keyset)
+// -------------------------------------------------------------------------
+// El cursor es la clave de orden de la última fila servida, en base64url para
+// que el cliente lo trate como opaco. Likes e historial ordenan por
+// (fecha DESC, id DESC); las canciones de playlist por (position, track_id).
+
+fn encode_cursor(raw: String) -> String {
+    URL_SAFE_NO_PAD.encode(raw)
+}
+
+fn decode_cursor(cursor: &str) -> Result<String, PageError> {
+    let bytes = URL_SAFE_NO_PAD
+        .decode(cursor.trim())
+        .map_err(|_| PageError::InvalidCursor)?;
+    String::from_utf8(bytes).map_err(|_| PageError::InvalidCursor)
+}
+
+/// Cursor `(fecha, id)`. Una fila sin fecha da un cursor solo de id (`:id`):
+/// en orden DESC los NULL van al final, así que lo que queda tras ella son
+/// filas sin fecha ordenadas por id.
+fn time_cursor(at: Option<OffsetDateTime>, id: i64) -> String {
+    match at {
+        Some(at) => encode_cursor(format!("{}:{}", at.unix_timestamp(), id)),
+        None => encode_cursor(format!(":{}", id)),
+    }
+}
+
+fn parse_time_cursor(cursor: &str) -> Result<(Option<OffsetDateTime>, i64), PageError> {
+    let raw = decode_cursor(cursor)?;
+    let (ts, id) = raw.split_once(':').ok_or(PageError::InvalidCursor)?;
+    let id: i64 = id.parse().map_err(|_| PageError::InvalidCursor)?;
+    if ts.is_empty() {
+        return Ok((None, id));
+    }
+    let ts: i64 = ts.parse().map_err(|_| PageError::InvalidCursor)?;
+    let at = OffsetDateTime::from_unix_timestamp(ts).map_err(|_| PageError::InvalidCursor)?;
+    Ok((Some(at), id))
+}
+
+/// Condición keyset "después de `after`" para un orden `(fecha DESC, id DESC)`
+/// con fechas que pueden ser NULL (van al final).
+fn push_time_after(
+    qb: &mut QueryBuilder<'_, MySql>,
+    at_col: &str,
+    id_col: &str,
+    after: Option<(Option<OffsetDateTime>, i64)>,
+) {
+    match after {
+        None => {}
+        Some((Some(at), id)) => {
+            qb.push(format!(" AND ({at_col} < "))
+                .push_bind(at)
+                .push(format!(" OR ({at_col} = "))
+                .push_bind(at)
+                .push(format!(" AND {id_col} < "))
+                .push_bind(id)
+                .push(format!(") OR {at_col} IS NULL)"));
+        }
+        Some((None, id)) => {
+            qb.push(format!(" AND {at_col} IS NULL AND {id_col} < "))
+                .push_bind(id);
+        }
+    }
+}
+
+/// Cursor `(position, track_id)`; el track_id va al final porque puede
+/// contener `:`.
+fn position_cursor(position: i32, track_id: &str) -> String {
+    encode_cursor(format!("{}:{}", position, track_id))
+}
+
+fn parse_position_cursor(cursor: &str) -> Result<(i32, String), PageError> {
+    let raw = decode_cursor(cursor)?;
+    let (position, track_id) = raw.split_once(':').ok_or(PageError::InvalidCursor)?;
+    let position: i32 = position.parse().map_err(|_| PageError::InvalidCursor)?;
+    Ok((position, track_id.to_string()))
+}
+
+/// Parte `limit + 1` filas en la página y su `nextCursor` (la fila extra solo
+/// indica que hay más).
+fn into_page<R, T>(
+    mut rows: Vec<R>,
+    size: u32,
+    cursor_of: impl Fn(&R) -> Option<String>,
+    to_item: impl Fn(R) -> T,
+) -> Page<T> {
+    let has_more = rows.len() > size as usize;
+    rows.truncate(size as usize);
+    let next_cursor = if has_more {
+        rows.last().and_then(&cursor_of)
+    } else {
+        None
+    };
+    Page {
+        items: rows.into_iter().map(to_item).collect(),
+        next_cursor,
+    }
+}
+
+// -------------------------------------------------------------------------
+// RESUMEN DESNORMALIZADO DE PLAYLISTS
+// -------------------------------------------------------------------------
+/// Columnas de resumen en `playlists` (nº de canciones, duración, likes,
+/// portada) e índices de los listados paginados. Ver
+/// migrations/006_playlist_summaries_keyset.sql. El backfill solo corre la vez
+/// que se crean las columnas; después las mantienen las mutaciones.
+pub(crate) async fn ensure_library_schema(db: &MySqlPool) -> Result<(), sqlx::Error> {
+    let (present,): (i64,) = sqlx::query_as(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS
+         WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'playlists' AND COLUMN_NAME = 'song_count'",
+    )
+    .fetch_one(db)
+    .await?;
+
+    if present == 0 {
+        sqlx::query(
+            "ALTER TABLE playlists
+                ADD COLUMN IF NOT EXISTS song_count     INT    NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS total_duration BIGINT NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS likes_count    INT    NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS cover_url      TEXT   DEFAULT NULL",
+        )
+        .execute(db)
+        .await?;
+        sqlx::query(&format!(
+            "UPDATE playlists p SET {SONGS_SUMMARY_SET}, {LIKES_SUMMARY_SET}"
+        ))
+        .execute(db)
+        .await?;
+    }
+
+    sqlx::query(
+        "ALTER TABLE user_likes ADD INDEX IF NOT EXISTS idx_user_likes_recent (user_id, liked_at)",
+    )
+    .execute(db)
+    .await?;
+    sqlx::query(
+        "ALTER TABLE play_history ADD INDEX IF NOT EXISTS idx_play_history_recent (user_id, played_at)",
+    )
+    .execute(db)
+    .await?;
+    Ok(())
+}
+
+/// Recalcula, desde `playlist_songs`, el resumen de canciones de la playlist `p`.
+const SONGS_SUMMARY_SET: &str = "
+    p.song_count = (SELECT COUNT(*) FROM playlist_songs ps WHERE ps.playlist_id = p.id),
+    p.total_duration = (SELECT COALESCE(SUM(ps.duration), 0) FROM playlist_songs ps WHERE ps.playlist_id = p.id),
+    p.cover_url = (SELECT ps.cover_url FROM playlist_songs ps WHERE ps.playlist_id = p.id
+                   ORDER BY ps.position ASC, ps.track_id ASC LIMIT 1)";
+
+/// Recalcula, desde `playlist_likes`, el contador de likes de la playlist `p`.
+pub(crate) const LIKES_SUMMARY_SET: &str =
+    "p.likes_count = (SELECT COUNT(*) FROM playlist_likes pl WHERE pl.playlist_id = p.id)";
+
+// -------------------------------------------------------------------------
+// FILAS DE LOS LISTADOS
+// -------------------------------------------------------------------------
+/// (id, name, created_at, owner, song_count, total_duration, likes_count, cover_url)
+type PlaylistSummaryRow = (
+    String,
+    String,
+    Option<OffsetDateTime>,
+    String,
+    i32,
+    i64,
+    i32,
+    Option<String>,
+);
+
+/// (track_id, song_source, title, artist, cover_url, duration, url, position)
+type PlaylistSongRow = (
+    String,
+    Option<String>,
+    Option<String>,
+    Option<String>,
+    Option<String>,
+    Option<i32>,
+    Option<String>,
+    i32,
+);
+
+/// (id, track_mbid, played_at, title, artist, cover_url)
+type HistoryRow = (
+    i64,
+    Option<String>,
+    Option<OffsetDateTime>,
+    Option<String>,
+    Option<String>,
+    Option<String>,
+);
+
+/// (id, track_id, source, liked_at, title, artist, cover_url)
+type LikeRow = (
+    i64,
+    String,
+    String,
+    Option<OffsetDateTime>,
+    Option<String>,
+    Option<String>,
+    Option<String>,
+);
+
+// Las filas se mueven al modelo tipado sin clonar: los alias de clave que
+// espera el frontend los escribe el `Serialize` de cada modelo.
+fn playlist_song(row: PlaylistSongRow) -> PlaylistSong {
+    let (track_id, song_source, title, artist, cover_url, duration, url, _) = row;
+    PlaylistSong {
+        track_id,
+        source_type: song_source.unwrap_or_else(|| "local".to_string()),
+        title,
+        artist,
+        cover_url,
+        duration,
+        url,
+    }
+}
+
+fn history_entry(row: HistoryRow) -> HistoryEntry {
+    let (_, track_id, played_at, title, artist, cover_url) = row;
+    HistoryEntry {
+        id: track_id,
+        title,
+        artist,
+        artwork_url: cover_url,
+        played_at: played_at.map(|dt| dt.unix_timestamp()),
+    }
+}
+
+fn liked_track(row: LikeRow) -> LikedTrack {
+    let (_, track_id, source, liked_at, title, artist, cover_url) = row;
+    let cover_url = cover_url
+        .filter(|c| !c.is_empty())
+        .unwrap_or_else(|| format!("/api/v1/covers/{}", track_id));
+    LikedTrack {
+        track_id,
+        title: title.unwrap_or_else(|| "Sin título".to_string()),
+        artist: artist.unwrap_or_else(|| "Artista desconocido".to_string()),
+        cover_url,
+        source,
+        liked_at: liked_at.map(|dt| dt.unix_timestamp()),
+    }
+}
+
 impl TidolCore {
     // -------------------------------------------------------------------------
     // PLAYLISTS
     // -------------------------------------------------------------------------
-    pub async fn get_playlists(&self, user_id: i64) -> Vec<serde_json::Value> {
+    pub async fn get_playlists(&self, user_id: i64) -> Vec<PlaylistSummary> {
         // Enriquecido: dueño, nº de canciones, duración total, likes y portada
-        // (primera canción). Antes solo {id, nombre} y la Library mostraba
-        // "0 canciones" y sin imagen para todo.
-        let rows = sqlx::query!(
+        // (primera canción). Se leen de las columnas de resumen de `playlists`
+        // (ver `ensure_library_schema`): antes eran cuatro subconsultas
+        // correlacionadas por fila, que escalaban con el tamaño de cada playlist.
+        let rows: Vec<PlaylistSummaryRow> = sqlx::query_as(
             r#"
-            SELECT
-                p.id, p.name, p.created_at,
-                u.username AS owner,
-                (SELECT COUNT(*) FROM playlist_songs ps WHERE ps.playlist_id = p.id) AS song_count,
-                (SELECT CAST(COALESCE(SUM(ps.duration), 0) AS SIGNED) FROM playlist_songs ps WHERE ps.playlist_id = p.id) AS total_duration,
-                (SELECT COUNT(*) FROM playlist_likes pl WHERE pl.playlist_id = p.id) AS likes,
-                (SELECT ps.cover_url FROM playlist_songs ps WHERE ps.playlist_id = p.id ORDER BY ps.position ASC, ps.added_at ASC LIMIT 1) AS cover_url
+            SELECT p.id, p.name, p.created_at, u.username,
+                   p.song_count, p.total_duration, p.likes_count, p.cover_url
             FROM playlists p
             JOIN users u ON u.id = p.user_id
             WHERE p.user_id = ?
             ORDER BY p.created_at DESC
             "#,
-            user_id
         )
+        .bind(user_id)
         .fetch_all(&self.db)
         .await
         .unwrap_or_else(|e| {
@@ -157,18 +454,20 @@ impl TidolCore {
         });
 
         rows.into_iter()
-            .map(|r| {
-                serde_json::json!({
-                    "id": r.id,
-                    "nombre": r.name,
-                    "creada_en": r.created_at.map(|dt| dt.unix_timestamp()),
-                    "owner": r.owner,
-                    "songCount": r.song_count,
-                    "totalDuration": r.total_duration,
-                    "likes": r.likes,
-                    "coverUrl": r.cover_url
-                })
-            })
+            .map(
+                |(id, name, created_at, owner, song_count, total_duration, likes, cover_url)| {
+                    PlaylistSummary {
+                        id,
+                        name,
+                        created_at: created_at.map(|dt| dt.unix_timestamp()),
+                        owner,
+                        song_count,
+                        total_duration,
+                        likes,
+                        cover_url,
+                    }
+                },
+            )
             .collect()
     }
 
@@ -217,89 +516,57 @@ impl TidolCore {
         &self,
         user_id: i64,
         playlist_id: &str,
-    ) -> Option<serde_json::Value> {
-        let playlist = sqlx::query!(
-            r#"
-            SELECT
-                p.id, p.name, p.created_at, p.user_id,
-                u.username AS owner,
-                (SELECT COUNT(*) FROM playlist_likes pl WHERE pl.playlist_id = p.id) AS likes,
-                (SELECT CAST(EXISTS(
-                    SELECT 1 FROM playlist_likes pl2 WHERE pl2.playlist_id = p.id AND pl2.user_id = ?
-                ) AS SIGNED)) AS liked_by_me
-            FROM playlists p
-            JOIN users u ON u.id = p.user_id
-            WHERE p.id = ? AND p.user_id = ?
-            "#,
-            user_id,
-            playlist_id,
-            user_id
-        )
-        .fetch_optional(&self.db)
-        .await
-        .unwrap_or(None);
-
-        let playlist = playlist?;
+    ) -> Option<PlaylistDetail> {
+        // (id, name, created_at, user_id, owner, likes, liked_by_me)
+        #[allow(clippy::type_complexity)]
+        let playlist: Option<(String, String, Option<OffsetDateTime>, i64, String, i64, i64)> =
+            sqlx::query_as(
+                r#"
+                SELECT
+                    p.id, p.name, p.created_at, p.user_id,
+                    u.username AS owner,
+                    (SELECT COUNT(*) FROM playlist_likes pl WHERE pl.playlist_id = p.id) AS likes,
+                    (SELECT CAST(EXISTS(
+                        SELECT 1 FROM playlist_likes pl2 WHERE pl2.playlist_id = p.id AND pl2.user_id = ?
+                    ) AS SIGNED)) AS liked_by_me
+                FROM playlists p
+                JOIN users u ON u.id = p.user_id
+                WHERE p.id = ? AND p.user_id = ?
+                "#,
+            )
+            .bind(user_id)
+            .bind(playlist_id)
+            .bind(user_id)
+            .fetch_optional(&self.db)
+            .await
+            .unwrap_or(None);
 
-        let rows = sqlx::query!(
-            "SELECT track_id, song_source, title, artist, cover_url, duration, url FROM playlist_songs WHERE playlist_id = ? ORDER BY position ASC, added_at ASC",
-            playlist_id
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
-            tracing::error!("user_data: error de DB en listado: {}", e);
-            Vec::new()
-        });
+        let (id, name, created_at, owner_id, owner, likes, liked_by_me) = playlist?;
 
-        let total_duration: i64 = rows.iter().map(|r| r.duration.unwrap_or(0) as i64).sum();
-
-        let songs: Vec<serde_json::Value> = rows
-            .into_iter()
-            .map(|r| {
-                // Claves alineadas con normalizeTrack() del frontend: emitimos los
-                // nombres canónicos (trackName/artistName/coverArtUrl) además de los
-                // legacy (titulo/artista/portada). Antes solo se enviaba
-                // artist/artworkUrl → el normalizador los ignoraba y mostraba
-                // "Unknown Artist" y la portada por defecto.
-                serde_json::json!({
-                    "id": r.track_id,
-                    "trackId": r.track_id,
-                    "sourceType": r.song_source.unwrap_or_else(|| "local".to_string()),
-                    "trackName": r.title,
-                    "title": r.title,
-                    "titulo": r.title,
-                    "artistName": r.artist,
-                    "artist": r.artist,
-                    "artista": r.artist,
-                    "coverArtUrl": r.cover_url,
-                    "artworkUrl": r.cover_url,
-                    "portada": r.cover_url,
-                    "duration": r.duration,
-                    "duracion": r.duration,
-                    // URL de reproducción directa (Internet Archive); las pistas de
-                    // catálogo (MusicBrainz) no la tienen y se resuelven vía embed.
-                    "url": r.url,
-                    "playbackUrl": r.url
-                })
-            })
-            .collect();
-
-        Some(serde_json::json!({
-            "id": playlist.id,
-            "nombre": playlist.name,
-            "creada_en": playlist.created_at.map(|dt| dt.unix_timestamp()),
-            "owner": playlist.owner,
-            // Siempre `true`: la consulta ya filtra por dueño. Se mantiene en el
-            // payload por compatibilidad con los clientes que lo leen.
-            "isOwner": playlist.user_id == user_id,
-            "likes": playlist.likes,
-            "likedByMe": playlist.liked_by_me != 0,
-            "songCount": songs.len(),
-            "totalDuration": total_duration,
-            "songs": songs
-        }))
+        let rows = self
+            .fetch_playlist_songs(playlist_id, None, None)
+            .await
+            .unwrap_or_else(|e| {
+                // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            });
+
+        let total_duration: i64 = rows.iter().map(|r| r.5.unwrap_or(0) as i64).sum();
+        let songs: Vec<PlaylistSong> = rows.into_iter().map(playlist_song).collect();
+
+        Some(PlaylistDetail {
+            id,
+            name,
+            created_at: created_at.map(|dt| dt.unix_timestamp()),
+            owner,
+            is_owner: owner_id == user_id,
+            likes,
+            liked_by_me: liked_by_me != 0,
+            song_count: songs.len(),
+            total_duration,
+            songs,
+        })
     }
 
     /// POST /api/v1/playlists/:id/like — alterna el like y devuelve estado + contador.
@@ -345,14 +612,27 @@ impl TidolCore {
             false
         };
 
-        let likes = sqlx::query!(
-            "SELECT COUNT(*) AS n FROM playlist_likes WHERE playlist_id = ?",
-            playlist_id
-        )
-        .fetch_one(&self.db)
+        // El contador desnormalizado se recalcula aquí (junto con el borrado de
+        // cuenta, las únicas mutaciones de playlist_likes) y es también lo que
+        // se devuelve.
+        if let Err(e) = sqlx::query(&format!(
+            "UPDATE playlists p SET {LIKES_SUMMARY_SET} WHERE p.id = ?"
+        ))
+        .bind(playlist_id)
+        .execute(&self.db)
         .await
-        .map(|r| r.n)
-        .unwrap_or(0);
+        {
+            tracing::error!(
+                "toggle_playlist_like: fallo al actualizar el contador: {}",
+                e
+            );
+        }
+        let likes = sqlx::query_as::<_, (i32,)>("SELECT likes_count FROM playlists WHERE id = ?")
+            .bind(playlist_id)
+            .fetch_one(&self.db)
+            .await
+            .map(|(n,)| n)
+            .unwrap_or(0);
 
         Ok(serde_json::json!({ "liked": liked, "likes": likes }))
     }
@@ -393,55 +673,114 @@ impl TidolCore {
         &self,
         user_id: i64,
         playlist_id: &str,
-    ) -> Option<Vec<serde_json::Value>> {
-        let playlist = sqlx::query!(
-            "SELECT id FROM playlists WHERE id = ? AND user_id = ?",
-            playlist_id,
-            user_id
-        )
-        .fetch_optional(&self.db)
-        .await
-        .unwrap_or(None);
+    ) -> Option<Vec<PlaylistSong>> {
+        if !self.owns_playlist(user_id, playlist_id).await {
+            return None;
+        }
 
-        playlist.as_ref()?;
+        let rows = self
+            .fetch_playlist_songs(playlist_id, None, None)
+            .await
+            .unwrap_or_else(|e| {
+                // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            });
 
-        let rows = sqlx::query!(
-            "SELECT track_id, song_source, title, artist, cover_url, duration, url FROM playlist_songs WHERE playlist_id = ? ORDER BY position ASC, added_at ASC",
-            playlist_id
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
-            tracing::error!("user_data: error de DB en listado: {}", e);
-            Vec::new()
-        });
+        Some(rows.into_iter().map(playlist_song).collect())
+    }
 
-        let songs: Vec<serde_json::Value> = rows
-            .into_iter()
-            .map(|r| {
-                serde_json::json!({
-                    "id": r.track_id,
-                    "trackId": r.track_id,
-                    "sourceType": r.song_source.unwrap_or_else(|| "local".to_string()),
-                    "trackName": r.title,
-                    "title": r.title,
-                    "titulo": r.title,
-                    "artistName": r.artist,
-                    "artist": r.artist,
-                    "artista": r.artist,
-                    "coverArtUrl": r.cover_url,
-                    "artworkUrl": r.cover_url,
-                    "portada": r.cover_url,
-                    "duration": r.duration,
-                    "duracion": r.duration,
-                    "url": r.url,
-                    "playbackUrl": r.url
-                })
-            })
-            .collect();
-
-        Some(songs)
+    /// Versión paginada de `get_playlist_songs` (`?limit=&cursor=`): orden
+    /// (position, track_id), servido por el índice `(playlist_id, position)`.
+    /// `Ok(None)` → 404.
+    pub async fn get_playlist_songs_page(
+        &self,
+        user_id: i64,
+        playlist_id: &str,
+        page: &PageQuery,
+    ) -> Result<Option<Page<PlaylistSong>>, PageError> {
+        let after = page
+            .cursor
+            .as_deref()
+            .map(parse_position_cursor)
+            .transpose()?;
+        if !self.owns_playlist(user_id, playlist_id).await {
+            return Ok(None);
+        }
+
+        let size = page.size();
+        let rows = self
+            .fetch_playlist_songs(playlist_id, after.as_ref(), Some(size + 1))
+            .await
+            .unwrap_or_else(|e| {
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            });
+
+        Ok(Some(into_page(
+            rows,
+            size,
+            |r| Some(position_cursor(r.7, &r.0)),
+            playlist_song,
+        )))
+    }
+
+    async fn owns_playlist(&self, user_id: i64, playlist_id: &str) -> bool {
+        sqlx::query_as::<_, (String,)>("SELECT id FROM playlists WHERE id = ? AND user_id = ?")
+            .bind(playlist_id)
+            .bind(user_id)
+            .fetch_optional(&self.db)
+            .await
+            .unwrap_or(None)
+            .is_some()
+    }
+
+    async fn fetch_playlist_songs(
+        &self,
+        playlist_id: &str,
+        after: Option<&(i32, String)>,
+        limit: Option<u32>,
+    ) -> Result<Vec<PlaylistSongRow>, sqlx::Error> {
+        let mut qb = QueryBuilder::<MySql>::new(
+            "SELECT track_id, song_source, title, artist, cover_url, duration, url, position
+             FROM playlist_songs WHERE playlist_id = ",
+        );
+        qb.push_bind(playlist_id);
+        if let Some((position, track_id)) = after {
+            qb.push(" AND (position > ")
+                .push_bind(*position)
+                .push(" OR (position = ")
+                .push_bind(*position)
+                .push(" AND track_id > ")
+                .push_bind(track_id.as_str())
+                .push("))");
+        }
+        // Mismo orden con y sin página: el desempate (tras un reorden
+        // parcial) tiene que ser la segunda mitad del cursor.
+        qb.push(" ORDER BY position ASC, track_id ASC");
+        if let Some(limit) = limit {
+            qb.push(" LIMIT ").push_bind(limit);
+        }
+        qb.build_query_as().fetch_all(&self.db).await
+    }
+
+    /// Recalcula el resumen de canciones de una playlist tras una mutación.
+    /// Solo toca esa fila; un fallo se registra pero no revierte la mutación
+    /// (el siguiente cambio de la playlist lo vuelve a cuadrar).
+    async fn refresh_songs_summary(&self, playlist_id: &str) {
+        let res = sqlx::query(&format!(
+            "UPDATE playlists p SET {SONGS_SUMMARY_SET} WHERE p.id = ?"
+        ))
+        .bind(playlist_id)
+        .execute(&self.db)
+        .await;
+        if let Err(e) = res {
+            tracing::error!(
+                "user_data: no se pudo actualizar el resumen de {}: {}",
+                playlist_id,
+                e
+            );
+        }
     }
 
     pub async fn add_song_to_playlist(
@@ -507,7 +846,10 @@ impl TidolCore {
         .await;
 
         match result {
-            Ok(_) => Ok(serde_json::json!({ "added": true, "already": false })),
+            Ok(_) => {
+                self.refresh_songs_summary(playlist_id).await;
+                Ok(serde_json::json!({ "added": true, "already": false }))
+            }
             Err(e) => {
                 tracing::error!("add_song_to_playlist: fallo al insertar: {}", e);
                 Err(AddSongError::Insert)
@@ -569,6 +911,9 @@ impl TidolCore {
             return Err(ReorderError::Db);
         }
 
+        // La portada del resumen es la de la primera canción: puede cambiar.
+        self.refresh_songs_summary(playlist_id).await;
+
         Ok(serde_json::json!({ "ok": true }))
     }
 
@@ -593,13 +938,19 @@ impl TidolCore {
             return false;
         }
 
-        let _ = sqlx::query!(
+        let deleted = sqlx::query!(
             "DELETE FROM playlist_songs WHERE playlist_id = ? AND track_id = ?",
             playlist_id,
             track_id
         )
         .execute(&self.db)
-        .await;
+        .await
+        .map(|r| r.rows_affected())
+        .unwrap_or(0);
+
+        if deleted > 0 {
+            self.refresh_songs_summary(playlist_id).await;
+        }
 
         true
     }
@@ -607,39 +958,63 @@ impl TidolCore {
     // -------------------------------------------------------------------------
     // HISTORIAL
     // -------------------------------------------------------------------------
-    pub async fn get_history(&self, user_id: i64) -> Vec<serde_json::Value> {
+    pub async fn get_history(&self, user_id: i64) -> Vec<HistoryEntry> {
         // Fuente única: play_history (la escribe POST /tracks/:mbid/log-play y la
         // leen también Home y "Volver a escuchar").
-        let rows = sqlx::query!(
-            r#"
-            SELECT p.track_mbid AS track_id, p.played_at, t.title, t.artist, t.cover_url
-            FROM play_history p
-            JOIN track_links t ON t.mbid = p.track_mbid
-            WHERE p.user_id = ?
-            ORDER BY p.played_at DESC
-            LIMIT 50
-            "#,
-            user_id
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
-            tracing::error!("user_data: error de DB en listado: {}", e);
-            Vec::new()
-        });
+        let rows = self
+            .fetch_history(user_id, None, LEGACY_HISTORY_LIMIT)
+            .await
+            .unwrap_or_else(|e| {
+                // No silenciar: antes un fallo de DB devolvía lista vacía sin rastro.
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            });
 
-        rows.into_iter()
-            .map(|r| {
-                serde_json::json!({
-                    "id": r.track_id,
-                    "title": r.title,
-                    "artist": r.artist,
-                    "artworkUrl": r.cover_url,
-                    "playedAt": r.played_at.map(|dt| dt.unix_timestamp())
-                })
-            })
-            .collect()
+        rows.into_iter().map(history_entry).collect()
+    }
+
+    /// Versión paginada de `get_history` (`?limit=&cursor=`): keyset sobre
+    /// (played_at DESC, id DESC), servido por `idx_play_history_recent`.
+    pub async fn get_history_page(
+        &self,
+        user_id: i64,
+        page: &PageQuery,
+    ) -> Result<Page<HistoryEntry>, PageError> {
+        let after = page.cursor.as_deref().map(parse_time_cursor).transpose()?;
+        let size = page.size();
+        let rows = self
+            .fetch_history(user_id, after, size + 1)
+            .await
+            .unwrap_or_else(|e| {
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            });
+
+        Ok(into_page(
+            rows,
+            size,
+            |r| Some(time_cursor(r.2, r.0)),
+            history_entry,
+        ))
+    }
+
+    async fn fetch_history(
+        &self,
+        user_id: i64,
+        after: Option<(Option<OffsetDateTime>, i64)>,
+        limit: u32,
+    ) -> Result<Vec<HistoryRow>, sqlx::Error> {
+        let mut qb = QueryBuilder::<MySql>::new(
+            "SELECT p.id, p.track_mbid, p.played_at, t.title, t.artist, t.cover_url
+             FROM play_history p
+             JOIN track_links t ON t.mbid = p.track_mbid
+             WHERE p.user_id = ",
+        );
+        qb.push_bind(user_id);
+        push_time_after(&mut qb, "p.played_at", "p.id", after);
+        qb.push(" ORDER BY p.played_at DESC, p.id DESC LIMIT ")
+            .push_bind(limit);
+        qb.build_query_as().fetch_all(&self.db).await
     }
 
     // -------------------------------------------------------------------------
@@ -650,12 +1025,57 @@ impl TidolCore {
         &self,
         user_id: i64,
         source: Option<String>,
-    ) -> Vec<serde_json::Value> {
+    ) -> Vec<LikedTrack> {
+        let rows = self
+            .fetch_likes_detailed(user_id, source.as_deref(), None, None)
+            .await
+            .unwrap_or_else(|e| {
+                tracing::error!("user_data: error de DB en likes detailed: {}", e);
+                Vec::new()
+            });
+
+        rows.into_iter().map(liked_track).collect()
+    }
+
+    /// Versión paginada de `get_likes_detailed` (`?limit=&cursor=`): keyset
+    /// sobre (liked_at DESC, id DESC), servido por `idx_user_likes_recent`.
+    pub async fn get_likes_detailed_page(
+        &self,
+        user_id: i64,
+        source: Option<&str>,
+        page: &PageQuery,
+    ) -> Result<Page<LikedTrack>, PageError> {
+        let after = page.cursor.as_deref().map(parse_time_cursor).transpose()?;
+        let size = page.size();
+        let rows = self
+            .fetch_likes_detailed(user_id, source, after, Some(size + 1))
+            .await
+            .unwrap_or_else(|e| {
+                tracing::error!("user_data: error de DB en likes detailed: {}", e);
+                Vec::new()
+            });
+
+        Ok(into_page(
+            rows,
+            size,
+            |r| Some(time_cursor(r.3, r.0)),
+            liked_track,
+        ))
+    }
+
+    async fn fetch_likes_detailed(
+        &self,
+        user_id: i64,
+        source: Option<&str>,
+        after: Option<(Option<OffsetDateTime>, i64)>,
+        limit: Option<u32>,
+    ) -> Result<Vec<LikeRow>, sqlx::Error> {
         // La metadata puede vivir en track_links (mbid, catálogo) o en trackMetadata
         // (caché de búsquedas/IA); se toma la primera disponible.
-        let rows = sqlx::query!(
+        let mut qb = QueryBuilder::<MySql>::new(
             r#"
             SELECT
+                ul.id,
                 ul.track_id,
                 ul.source,
                 ul.liked_at,
@@ -665,98 +1085,83 @@ impl TidolCore {
             FROM user_likes ul
             LEFT JOIN track_links   tl ON tl.mbid    = ul.track_id
             LEFT JOIN trackMetadata tm ON tm.trackId = ul.track_id
-            WHERE ul.user_id = ?
-              AND (? IS NULL
-                   OR (? = 'local'   AND ul.source = 'local')
-                   OR (? = 'archive' AND ul.source != 'local'))
-            ORDER BY ul.liked_at DESC
-            "#,
-            user_id,
-            source,
-            source,
-            source
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            tracing::error!("user_data: error de DB en likes detailed: {}", e);
-            Vec::new()
-        });
-
-        rows.into_iter()
-            .map(|r| {
-                let cover = r
-                    .cover_url
-                    .filter(|c| !c.is_empty())
-                    .unwrap_or_else(|| format!("/api/v1/covers/{}", r.track_id));
-                serde_json::json!({
-                    "id": r.track_id,
-                    "trackId": r.track_id,
-                    "title": r.title.unwrap_or_else(|| "Sin título".to_string()),
-                    "artist": r.artist.unwrap_or_else(|| "Artista desconocido".to_string()),
-                    "coverUrl": cover,
-                    "source": r.source,
-                    "likedAt": r.liked_at.map(|dt| dt.unix_timestamp())
-                })
-            })
-            .collect()
+            WHERE ul.user_id = "#,
+        );
+        qb.push_bind(user_id);
+        match source {
+            None => {}
+            Some("local") => {
+                qb.push(" AND ul.source = 'local'");
+            }
+            Some("archive") => {
+                qb.push(" AND ul.source != 'local'");
+            }
+            // Filtro desconocido: lista vacía (como la consulta anterior).
+            Some(_) => return Ok(Vec::new()),
+        }
+        push_time_after(&mut qb, "ul.liked_at", "ul.id", after);
+        qb.push(" ORDER BY ul.liked_at DESC, ul.id DESC");
+        if let Some(limit) = limit {
+            qb.push(" LIMIT ").push_bind(limit);
+        }
+        qb.build_query_as().fetch_all(&self.db).await
     }
 
+    // Las listas de ids salen del conjunto en memoria de like_sync: la
+    // comprobación de versión es una lectura por PK en vez de recorrer
+    // user_likes en cada llamada.
     pub async fn get_local_likes(&self, user_id: i64) -> Vec<String> {
-        let rows = sqlx::query!(
-            "SELECT track_id FROM user_likes WHERE user_id = ? AND source = 'local'",
-            user_id
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            tracing::error!("user_data: error de DB en listado: {}", e);
-            Vec::new()
-        });
-
-        rows.into_iter().map(|r| r.track_id).collect()
+        match self.like_set(user_id).await {
+            Ok(set) => set.local.iter().map(|id| id.to_string()).collect(),
+            Err(e) => {
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            }
+        }
     }
 
     pub async fn get_ia_likes(&self, user_id: i64) -> Vec<String> {
-        let rows = sqlx::query!(
-            "SELECT track_id FROM user_likes WHERE user_id = ? AND source != 'local'",
-            user_id
-        )
-        .fetch_all(&self.db)
-        .await
-        .unwrap_or_else(|e| {
-            tracing::error!("user_data: error de DB en listado: {}", e);
-            Vec::new()
-        });
-
-        rows.into_iter().map(|r| r.track_id).collect()
+        match self.like_set(user_id).await {
+            Ok(set) => set.archive.iter().map(|id| id.to_string()).collect(),
+            Err(e) => {
+                tracing::error!("user_data: error de DB en listado: {}", e);
+                Vec::new()
+            }
+        }
     }
 
     /// POST /api/v1/music/songs/:id/like — da like. Idempotente: repetirlo no
     /// lo quita. `uq_user_likes (user_id, track_id)` sostiene el `INSERT IGNORE`.
+    /// Como toda escritura de likes, pasa por `write_likes` (versión + log de
+    /// la sincronización incremental).
     pub async fn set_local_like(&self, user_id: i64, track_id: &str) -> serde_json::Value {
-        let _ = sqlx::query!(
-            "INSERT IGNORE INTO user_likes (user_id, track_id, source) VALUES (?, ?, 'local')",
-            user_id,
-            track_id
-        )
-        .execute(&self.db)
-        .await;
+        self.write_like(user_id, track_id, "local", true).await;
         serde_json::json!({"liked": true})
     }
 
     /// DELETE /api/v1/music/songs/:id/like — quita el like. Idempotente.
     pub async fn unset_local_like(&self, user_id: i64, track_id: &str) -> serde_json::Value {
-        let _ = sqlx::query!(
-            "DELETE FROM user_likes WHERE user_id = ? AND track_id = ?",
-            user_id,
-            track_id
-        )
-        .execute(&self.db)
-        .await;
+        self.write_like(user_id, track_id, "local", false).await;
         serde_json::json!({"liked": false})
     }
 
+    /// Like/unlike suelto. Como antes, un fallo de BD no cambia la respuesta
+    /// del endpoint; se registra.
+    async fn write_like(&self, user_id: i64, track_id: &str, source: &str, liked: bool) {
+        let op = LikeOp {
+            id: track_id.to_string(),
+            source: Some(source.to_string()),
+            liked,
+        };
+        if let Err(e) = self.write_likes(user_id, &[op]).await {
+            tracing::error!(
+                "user_data: no se pudo guardar el like de {}: {}",
+                track_id,
+                e
+            );
+        }
+    }
+
     pub async fn toggle_ia_like(
         &self,
         user_id: i64,
@@ -812,25 +1217,9 @@ impl TidolCore {
         .await
         .unwrap_or(None);
 
-        if existing.is_some() {
-            let _ = sqlx::query!(
-                "DELETE FROM user_likes WHERE user_id = ? AND track_id = ?",
-                user_id,
-                track_id
-            )
-            .execute(&self.db)
-            .await;
-            Ok(serde_json::json!({"liked": false}))
-        } else {
-            let _ = sqlx::query!(
-                "INSERT INTO user_likes (user_id, track_id, source) VALUES (?, ?, 'archive')",
-                user_id,
-                track_id
-            )
-            .execute(&self.db)
-            .await;
-            Ok(serde_json::json!({"liked": true}))
-        }
+        let liked = existing.is_none();
+        self.write_like(user_id, &track_id, "archive", liked).await;
+        Ok(serde_json::json!({ "liked": liked }))
     }
 }
 
@@ -877,4 +1266,76 @@ mod tests {
             .to_string()
             .starts_with("Error DB: "));
     }
+
+    // Cursores keyset: ida y vuelta y rechazo de basura (→ 400).
+    #[test]
+    fn cursor_de_fecha_ida_y_vuelta() {
+        let at = OffsetDateTime::from_unix_timestamp(1_700_000_000).unwrap();
+        let cursor = time_cursor(Some(at), 42);
+        assert_eq!(parse_time_cursor(&cursor), Ok((Some(at), 42)));
+        // Sin fecha la paginación sigue, solo por id.
+        let cursor = time_cursor(None, 42);
+        assert_eq!(parse_time_cursor(&cursor), Ok((None, 42)));
+    }
+
+    #[test]
+    fn cursor_de_posicion_admite_dos_puntos_en_el_id() {
+        let cursor = position_cursor(7, "ia:foo:bar");
+        assert_eq!(
+            parse_position_cursor(&cursor),
+            Ok((7, "ia:foo:bar".to_string()))
+        );
+    }
+
+    #[test]
+    fn cursor_invalido_se_rechaza() {
+        for raw in [
+            "",
+            "%%",
+            "no-base64!",
+            &encode_cursor("sin-separador".into()),
+        ] {
+            assert_eq!(
+                parse_time_cursor(raw),
+                Err(PageError::InvalidCursor),
+                "{raw}"
+            );
+        }
+        assert_eq!(
+            parse_time_cursor(&encode_cursor("x:1".into())),
+            Err(PageError::InvalidCursor)
+        );
+        assert_eq!(
+            parse_position_cursor(&encode_cursor("uno:t".into())),
+            Err(PageError::InvalidCursor)
+        );
+    }
+
+    #[test]
+    fn pagina_con_fila_extra_emite_next_cursor() {
+        let page = into_page(vec![1, 2, 3], 2, |n| Some(n.to_string()), |n| n);
+        assert_eq!(
+            serde_json::to_value(&page).unwrap(),
+            serde_json::json!({ "items": [1, 2], "nextCursor": "2" })
+        );
+        let last = into_page(vec![1, 2], 2, |n| Some(n.to_string()), |n| n);
+        assert_eq!(last.next_cursor, None);
+    }
+
+    #[test]
+    fn tamano_de_pagina_acotado() {
+        assert!(!PageQuery::default().is_paged());
+        assert_eq!(PageQuery::default().size(), DEFAULT_PAGE_SIZE);
+        let grande = PageQuery {
+            limit: Some(10_000),
+            cursor: None,
+        };
+        assert_eq!(grande.size(), MAX_PAGE_SIZE);
+        let cero = PageQuery {
+            limit: Some(0),
+            cursor: None,
+        };
+        assert!(cero.is_paged());
+        assert_eq!(cero.size(), 1);
+    }
 }
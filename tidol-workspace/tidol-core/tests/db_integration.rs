@@ -19,10 +19,12 @@
 use std::sync::atomic::{AtomicU64, Ordering};
 
 use tidol_core::config::CoreConfig;
+use tidol_core::models::{PlaylistSong, PlaylistSummary};
 use tidol_core::{
-    AddSongToPlaylistPayload, CreatePlaylistPayload, LoginError, LoginPayload, LogPlayPayload,
-    RegisterError, RegisterPayload, RenameError, RenamePlaylistPayload, ReorderError, TidolCore,
-    ToggleLikePayload,
+    AddSongToPlaylistPayload, CreatePlaylistPayload, IngestError, IngestMetadata,
+    IngestRemotePayload, LikeBatchError, LikeBatchPayload, LikeOp, LogPlayPayload, LoginError,
+    LoginPayload, PageError, PageQuery, RegisterError, RegisterPayload, RenameError,
+    RenamePlaylistPayload, ReorderError, TidolCore, ToggleLikePayload,
 };
 
 fn test_url() -> String {
@@ -42,6 +44,8 @@ async fn core() -> TidolCore {
     TidolCore::new(CoreConfig {
         database_url: test_url(),
         database_max_connections: 5,
+        database_replica_urls: Vec::new(),
+        replica_max_lag_secs: 5,
         proxy_pool: vec!["direct".into()],
         plugins_dir: "/nonexistent".into(), // sin plugin de letras: warn y sigue
         youtube_api_key: String::new(),
@@ -49,6 +53,14 @@ async fn core() -> TidolCore {
         spotify_client_secret: String::new(),
         soundcloud_client_id: String::new(),
         jwt_secret: Some("secreto-integracion".into()),
+        cc_mirror_sync_hours: 0,
+        redis_url: None,
+        // Real y estable entre ejecuciones: la marca de almacenamiento de la BD
+        // de prueba tiene que coincidir con la del directorio (ver ingest.rs).
+        audio_cache_dir: std::env::temp_dir()
+            .join("tidol-test-audio")
+            .to_string_lossy()
+            .into_owned(),
     })
     .await
     .expect("TidolCore::new contra la BD de prueba (¿está levantada? ver scripts/test-db.sh)")
@@ -98,11 +110,8 @@ fn song(id: &str, titulo: &str) -> AddSongToPlaylistPayload {
     }
 }
 
-fn ids_of(songs: &[serde_json::Value]) -> Vec<String> {
-    songs
-        .iter()
-        .map(|s| s["id"].as_str().unwrap().to_string())
-        .collect()
+fn ids_of(songs: &[PlaylistSong]) -> Vec<String> {
+    songs.iter().map(|s| s.track_id.clone()).collect()
 }
 
 // ─────────────────────────────────────────────────────────────────────────
@@ -188,6 +197,7 @@ async fn delete_account_borra_todo_y_revoca_tokens() {
         .await
         .unwrap();
     core.toggle_playlist_like(uid, &pid).await.unwrap(); // playlist_likes
+    core.toggle_playlist_like(uid, &vecino_pid).await.unwrap(); // like a playlist ajena
     core.set_local_like(uid, &unique("dl")).await; // user_likes
     core.log_play(
         &unique("dmb"),
@@ -201,7 +211,15 @@ async fn delete_account_borra_todo_y_revoca_tokens() {
     .await
     .expect("log_play"); // play_history
 
+    let likes_del_vecino = |ps: Vec<PlaylistSummary>| {
+        ps.into_iter()
+            .find(|p| p.id == vecino_pid)
+            .expect("playlist del vecino")
+            .likes
+    };
+
     // Precondición: hay datos.
+    assert_eq!(likes_del_vecino(core.get_playlists(vecino).await), 1);
     assert!(!core.get_playlists(uid).await.is_empty());
     assert!(!core.get_history(uid).await.is_empty());
     assert!(!core.get_local_likes(uid).await.is_empty());
@@ -232,6 +250,13 @@ async fn delete_account_borra_todo_y_revoca_tokens() {
         core.get_playlist(vecino, &vecino_pid).await.is_some(),
         "el borrado no debe tocar a otros usuarios"
     );
+
+    // 5. …salvo el contador de likes que la víctima le había dado.
+    assert_eq!(
+        likes_del_vecino(core.get_playlists(vecino).await),
+        0,
+        "likes_count recalculado tras la cascada"
+    );
 }
 
 #[tokio::test]
@@ -269,15 +294,15 @@ async fn create_get_rename_delete_playlist() {
 
     // Aparece en el listado con los campos enriquecidos de la base.
     let lists = core.get_playlists(uid).await;
-    let mine = lists.iter().find(|p| p["id"] == serde_json::json!(pid)).expect("en listado");
-    assert_eq!(mine["songCount"], 0);
-    assert_eq!(mine["likes"], 0);
+    let mine = lists.iter().find(|p| p.id == pid).expect("en listado");
+    assert_eq!(mine.song_count, 0);
+    assert_eq!(mine.likes, 0);
 
     // get_playlist: detalle correcto; isOwner true.
     let detail = core.get_playlist(uid, &pid).await.expect("detalle");
-    assert_eq!(detail["nombre"], "Mi lista");
-    assert_eq!(detail["isOwner"], true);
-    assert_eq!(detail["songCount"], 0);
+    assert_eq!(detail.name, "Mi lista");
+    assert!(detail.is_owner);
+    assert_eq!(detail.song_count, 0);
 
     // rename: trim aplicado; vacío → EmptyName; ajeno → NotFound.
     let renamed = core
@@ -330,7 +355,7 @@ async fn playlist_ajena_no_es_legible() {
 
     // Y tampoco asoma en su listado.
     let del_intruso = core.get_playlists(intruso).await;
-    assert!(del_intruso.iter().all(|p| p["id"] != serde_json::json!(pid)));
+    assert!(del_intruso.iter().all(|p| p.id != pid));
 }
 
 #[tokio::test]
@@ -357,7 +382,7 @@ async fn add_song_posiciones_duplicados_y_propiedad() {
     assert_eq!(ids_of(&songs), vec![id_a.clone(), id_b.clone()]);
 
     // Payload con todos los alias de clave que espera el frontend.
-    let s = &songs[0];
+    let s = serde_json::to_value(&songs[0]).unwrap();
     for key in ["trackName", "title", "titulo"] {
         assert_eq!(s[key], "A", "clave {key}");
     }
@@ -380,8 +405,8 @@ async fn add_song_posiciones_duplicados_y_propiedad() {
 
     // Totales agregados en el detalle.
     let detail = core.get_playlist(uid, &pid).await.unwrap();
-    assert_eq!(detail["songCount"], 2);
-    assert_eq!(detail["totalDuration"], 240);
+    assert_eq!(detail.song_count, 2);
+    assert_eq!(detail.total_duration, 240);
 }
 
 #[tokio::test]
@@ -497,6 +522,102 @@ async fn toggle_playlist_like_alterna_y_cuenta() {
     ));
 }
 
+#[tokio::test]
+async fn resumen_de_playlist_se_mantiene_con_las_mutaciones() {
+    let core = core().await;
+    let (uid, _tok, _u) = register_user(&core).await;
+    let pid = core
+        .create_playlist(uid, CreatePlaylistPayload { nombre: "Resumen".into() })
+        .await
+        .unwrap()["id"]
+        .as_str()
+        .unwrap()
+        .to_string();
+    let resumen = |lista: Vec<PlaylistSummary>| {
+        lista
+            .into_iter()
+            .find(|p| p.id == pid)
+            .expect("playlist en el listado")
+    };
+
+    let r = resumen(core.get_playlists(uid).await);
+    assert_eq!((r.song_count, r.total_duration), (0, 0));
+    assert!(r.cover_url.is_none());
+
+    let (a, b) = (unique("sa"), unique("sb"));
+    core.add_song_to_playlist(uid, &pid, song(&a, "A")).await.unwrap();
+    let mut con_portada = song(&b, "B");
+    con_portada.portada = Some("https://example.invalid/b.jpg".into());
+    core.add_song_to_playlist(uid, &pid, con_portada).await.unwrap();
+    let r = resumen(core.get_playlists(uid).await);
+    assert_eq!(r.song_count, 2);
+    assert_eq!(r.total_duration, 240);
+    assert_eq!(
+        r.cover_url.as_deref(),
+        Some("https://example.invalid/c.jpg")
+    );
+
+    // Reordenar cambia la portada (primera canción); quitar resta.
+    core.reorder_playlist_songs(uid, &pid, vec![b.clone(), a.clone()]).await.unwrap();
+    assert_eq!(
+        resumen(core.get_playlists(uid).await).cover_url.as_deref(),
+        Some("https://example.invalid/b.jpg")
+    );
+    assert!(core.remove_song_from_playlist(uid, &pid, &b).await);
+    let r = resumen(core.get_playlists(uid).await);
+    assert_eq!(r.song_count, 1);
+    assert_eq!(r.total_duration, 120);
+
+    core.toggle_playlist_like(uid, &pid).await.unwrap();
+    assert_eq!(resumen(core.get_playlists(uid).await).likes, 1);
+}
+
+#[tokio::test]
+async fn canciones_de_playlist_paginadas_por_cursor() {
+    let core = core().await;
+    let (uid, _tok, _u) = register_user(&core).await;
+    let pid = core
+        .create_playlist(uid, CreatePlaylistPayload { nombre: "Paginas".into() })
+        .await
+        .unwrap()["id"]
+        .as_str()
+        .unwrap()
+        .to_string();
+    for i in 0..5 {
+        core.add_song_to_playlist(uid, &pid, song(&unique(&format!("p{i}_")), "P"))
+            .await
+            .unwrap();
+    }
+    let completa = ids_of(&core.get_playlist_songs(uid, &pid).await.unwrap());
+
+    // Páginas de 2 → 2 + 2 + 1, mismo orden que el listado completo.
+    let mut vistos = Vec::new();
+    let mut cursor = None;
+    loop {
+        let page = PageQuery { limit: Some(2), cursor: cursor.take() };
+        let res = core
+            .get_playlist_songs_page(uid, &pid, &page)
+            .await
+            .expect("cursor válido")
+            .expect("playlist propia");
+        vistos.extend(ids_of(&res.items));
+        match res.next_cursor {
+            Some(next) => cursor = Some(next),
+            None => break,
+        }
+    }
+    assert_eq!(vistos, completa);
+
+    let ajena = PageQuery::default();
+    let (otro, _t, _un) = register_user(&core).await;
+    assert_eq!(core.get_playlist_songs_page(otro, &pid, &ajena).await, Ok(None));
+    let rota = PageQuery { limit: None, cursor: Some("%%".into()) };
+    assert_eq!(
+        core.get_playlist_songs_page(uid, &pid, &rota).await,
+        Err(PageError::InvalidCursor)
+    );
+}
+
 // ─────────────────────────────────────────────────────────────────────────
 // LIKES + HISTORIAL (P3)
 // ─────────────────────────────────────────────────────────────────────────
@@ -564,12 +685,12 @@ async fn likes_local_e_ia_y_detallados() {
     let detailed = core.get_likes_detailed(uid, Some("archive".into())).await;
     let entry = detailed
         .iter()
-        .find(|e| e["id"] == serde_json::json!(ia_id))
+        .find(|e| e.track_id == ia_id)
         .expect("like IA en detailed");
-    assert_eq!(entry["title"], "Tema IA");
-    assert_eq!(entry["artist"], "Autor IA");
+    assert_eq!(entry.title, "Tema IA");
+    assert_eq!(entry.artist, "Autor IA");
     let solo_local = core.get_likes_detailed(uid, Some("local".into())).await;
-    assert!(solo_local.iter().all(|e| e["id"] != serde_json::json!(ia_id)));
+    assert!(solo_local.iter().all(|e| e.track_id != ia_id));
 
     // Alternar de nuevo el IA like → fuera.
     let r = core
@@ -603,6 +724,129 @@ async fn likes_local_e_ia_y_detallados() {
     assert!(!core.get_local_likes(uid).await.contains(&local_id));
 }
 
+#[tokio::test]
+async fn likes_paginados_siguen_tras_filas_sin_fecha() {
+    let core = core().await;
+    let (uid, _tok, _u) = register_user(&core).await;
+    let ids: Vec<String> = (0..3).map(|_| unique("l")).collect();
+    for id in &ids {
+        core.set_local_like(uid, id).await;
+    }
+    // Filas antiguas sin fecha: van al final y deben seguir saliendo.
+    let pool = sqlx::MySqlPool::connect(&test_url()).await.unwrap();
+    sqlx::query("UPDATE user_likes SET liked_at = NULL WHERE user_id = ? AND track_id <> ?")
+        .bind(uid)
+        .bind(&ids[0])
+        .execute(&pool)
+        .await
+        .unwrap();
+
+    let mut vistos = Vec::new();
+    let mut cursor = None;
+    loop {
+        let page = PageQuery { limit: Some(1), cursor: cursor.take() };
+        let res = core
+            .get_likes_detailed_page(uid, None, &page)
+            .await
+            .expect("cursor válido");
+        vistos.extend(res.items.into_iter().map(|e| e.track_id));
+        match res.next_cursor {
+            Some(next) => cursor = Some(next),
+            None => break,
+        }
+    }
+    assert_eq!(vistos.len(), 3, "{vistos:?}");
+    assert_eq!(vistos[0], ids[0]);
+    for id in &ids {
+        assert!(vistos.contains(id), "{id} falta en {vistos:?}");
+    }
+}
+
+#[tokio::test]
+async fn likes_versionados_sync_incremental_y_lote() {
+    let core = core().await;
+    let (uid, _tok, _u) = register_user(&core).await;
+    let (a, b, c) = (unique("la"), unique("lb"), unique("ia_c"));
+
+    // Sin versión previa → conjunto completo.
+    core.set_local_like(uid, &a).await;
+    let full = core.sync_likes(uid, None).await.expect("sync");
+    assert_eq!(full["full"], true);
+    assert_eq!(full["local"], serde_json::json!([a]));
+    let v1 = full["version"].as_i64().unwrap();
+    assert!(v1 > 0);
+
+    // Repetir un like no cambia nada → misma versión.
+    core.set_local_like(uid, &a).await;
+    let same = core.sync_likes(uid, Some(v1)).await.unwrap();
+    assert_eq!(same["version"], v1);
+    assert_eq!(same["added"], serde_json::json!([]));
+
+    // Lote: una transacción, una versión; solo cuenta lo que cambió.
+    let batch = core
+        .apply_like_batch(
+            uid,
+            LikeBatchPayload {
+                ops: vec![
+                    LikeOp { id: b.clone(), source: None, liked: true },
+                    LikeOp { id: c.clone(), source: Some("archive".into()), liked: true },
+                    LikeOp { id: a.clone(), source: None, liked: false },
+                    LikeOp { id: unique("nunca"), source: None, liked: false },
+                ],
+            },
+        )
+        .await
+        .expect("lote");
+    assert_eq!(batch["applied"], 3);
+    assert_eq!(batch["version"], v1 + 1);
+
+    let delta = core.sync_likes(uid, Some(v1)).await.unwrap();
+    assert_eq!(delta["full"], false);
+    assert_eq!(delta["version"], v1 + 1);
+    assert_eq!(delta["removed"], serde_json::json!([a]));
+    let added = delta["added"].as_array().unwrap();
+    assert_eq!(added.len(), 2);
+    assert!(added.contains(&serde_json::json!({ "id": c, "source": "archive" })));
+
+    // Las listas clásicas salen del mismo conjunto.
+    assert_eq!(core.get_local_likes(uid).await, vec![b.clone()]);
+    assert_eq!(core.get_ia_likes(uid).await, vec![c.clone()]);
+
+    // Versión desconocida (mayor que la actual) → conjunto completo otra vez.
+    assert_eq!(core.sync_likes(uid, Some(v1 + 100)).await.unwrap()["full"], true);
+
+    assert!(matches!(
+        core.apply_like_batch(uid, LikeBatchPayload { ops: vec![] }).await.unwrap_err(),
+        LikeBatchError::Invalid
+    ));
+}
+
+#[tokio::test]
+async fn likes_sin_version_se_siembran_al_arrancar() {
+    let core = core().await;
+    let (uid, _tok, _u) = register_user(&core).await;
+    let viejo = unique("l");
+    // Like anterior al log: fila en user_likes sin versión del usuario.
+    let pool = sqlx::MySqlPool::connect(&test_url()).await.unwrap();
+    sqlx::query("INSERT INTO user_likes (user_id, track_id, source) VALUES (?, ?, 'local')")
+        .bind(uid)
+        .bind(&viejo)
+        .execute(&pool)
+        .await
+        .unwrap();
+
+    // El arranque siembra la versión: tras la primera completa, solo deltas.
+    let core = core().await;
+    let full = core.sync_likes(uid, None).await.expect("sync");
+    assert_eq!(full["full"], true);
+    assert_eq!(full["local"], serde_json::json!([viejo]));
+    let v = full["version"].as_i64().unwrap();
+    assert!(v > 0);
+    let delta = core.sync_likes(uid, Some(v)).await.unwrap();
+    assert_eq!(delta["full"], false);
+    assert_eq!(delta["added"], serde_json::json!([]));
+}
+
 #[tokio::test]
 async fn log_play_alimenta_el_historial() {
     let core = core().await;
@@ -624,11 +868,138 @@ async fn log_play_alimenta_el_historial() {
     let history = core.get_history(uid).await;
     let entry = history
         .iter()
-        .find(|h| h["id"] == serde_json::json!(mbid))
+        .find(|h| h.id.as_deref() == Some(mbid.as_str()))
         .expect("entrada de historial");
-    assert_eq!(entry["title"], "Cancion H");
-    assert_eq!(entry["artist"], "Artista H");
-    assert!(entry["playedAt"].as_i64().is_some());
+    assert_eq!(entry.title.as_deref(), Some("Cancion H"));
+    assert_eq!(entry.artist.as_deref(), Some("Artista H"));
+    assert!(entry.played_at.is_some());
+}
+
+// ─────────────────────────────────────────────────────────────────────────
+// INGESTA REMOTA
+// ─────────────────────────────────────────────────────────────────────────
+
+fn ingest_payload(audio_url: String) -> IngestRemotePayload {
+    IngestRemotePayload {
+        audio_url,
+        cover_url: None,
+        metadata: IngestMetadata {
+            title: Some("Unknown".into()),
+            artist: None,
+        },
+    }
+}
+
+#[tokio::test]
+async fn ingesta_remota_deduplica_por_fuente() {
+    let core = core().await;
+    let item = unique("ia");
+    // Ítem legal en el espejo: la verificación de licencia no sale a la red.
+    let pool = sqlx::MySqlPool::connect(&test_url()).await.unwrap();
+    sqlx::query(
+        "INSERT INTO cc_catalog (source, item_id, title, artist, license_url)
+         VALUES ('archive', ?, 'Tema', 'Autor', 'https://creativecommons.org/licenses/by/4.0/')",
+    )
+    .bind(&item)
+    .execute(&pool)
+    .await
+    .unwrap();
+    let first = core
+        .ingest_remote(ingest_payload(format!(
+            "https://archive.org/download/{item}/a.mp3"
+        )))
+        .await
+        .expect("encolada");
+    assert!(!first.already_exists);
+    assert!(first.track_id.starts_with("ingest-"));
+
+    // Misma fuente por otro nodo de IA: no se encola otra vez.
+    let again = core
+        .ingest_remote(ingest_payload(format!(
+            "https://ia800305.us.archive.org/download/{item}/a.mp3"
+        )))
+        .await
+        .expect("deduplicada");
+    assert_eq!(again.track_id, first.track_id);
+
+    assert!(matches!(
+        core.ingest_remote(ingest_payload("https://example.com/a.mp3".into()))
+            .await,
+        Err(IngestError::Forbidden)
+    ));
+}
+
+// ─────────────────────────────────────────────────────────────────────────
+// BIBLIOTECA LOCAL (con `--features db-tests,local-library`)
+// ─────────────────────────────────────────────────────────────────────────
+
+#[cfg(feature = "local-library")]
+#[tokio::test]
+async fn import_path_deduplica_y_es_incremental() {
+    let core = core().await;
+    let root = std::env::temp_dir().join(unique("tidol-import"));
+    std::fs::create_dir_all(root.join("sub")).unwrap();
+    // Sin etiquetas legibles: el título cae al nombre del fichero. El
+    // contenido lleva un sufijo único para no chocar con otras ejecuciones.
+    let contenido = unique("audio-a");
+    std::fs::write(root.join("Uno.mp3"), &contenido).unwrap();
+    std::fs::write(root.join("sub/copia.mp3"), &contenido).unwrap();
+    let largo = "x".repeat(300);
+    std::fs::write(root.join(format!("{largo}.flac")), unique("audio-b")).unwrap();
+    std::fs::write(root.join("cover.jpg"), b"no es audio").unwrap();
+
+    let report = core.import_path(&root, |_| {}).await.expect("importa");
+    assert_eq!(report.scanned, 3);
+    assert_eq!(report.imported, 2);
+    assert_eq!(report.duplicates, 1);
+    assert_eq!(report.failed, 0);
+
+    let pool = sqlx::MySqlPool::connect(&test_url()).await.unwrap();
+    let mbid_de = |path: std::path::PathBuf| {
+        let pool = pool.clone();
+        async move {
+            sqlx::query_scalar::<_, String>("SELECT track_mbid FROM local_files WHERE path = ?")
+                .bind(path.to_string_lossy().into_owned())
+                .fetch_one(&pool)
+                .await
+                .expect("fila en local_files")
+        }
+    };
+    let uno = mbid_de(root.join("Uno.mp3")).await;
+    assert_eq!(uno, mbid_de(root.join("sub/copia.mp3")).await);
+
+    let (title, audio): (String, Option<String>) =
+        sqlx::query_as("SELECT title, provisional_audio_path FROM track_links WHERE mbid = ?")
+            .bind(&uno)
+            .fetch_one(&pool)
+            .await
+            .unwrap();
+    assert_eq!(title, "Uno");
+    // La ruta local no es audio del servidor: no entra en la radio.
+    assert_eq!(audio, None);
+    let local: Option<String> =
+        sqlx::query_scalar("SELECT localAudioPath FROM trackMetadata WHERE trackId = ?")
+            .bind(&uno)
+            .fetch_one(&pool)
+            .await
+            .unwrap();
+    assert!(local.is_some());
+
+    // Etiqueta (aquí, nombre de fichero) de más de 255 caracteres: recortada.
+    let flac = mbid_de(root.join(format!("{largo}.flac"))).await;
+    let flac_title: String = sqlx::query_scalar("SELECT title FROM track_links WHERE mbid = ?")
+        .bind(&flac)
+        .fetch_one(&pool)
+        .await
+        .unwrap();
+    assert_eq!(flac_title.chars().count(), 255);
+
+    // Re-escaneo sin cambios: nada que reimportar.
+    let again = core.import_path(&root, |_| {}).await.expect("re-escanea");
+    assert_eq!(again.unchanged, 3);
+    assert_eq!(again.imported, 0);
+
+    std::fs::remove_dir_all(&root).ok();
 }
 
 // ─────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,86 @@
+// ingestCache.ts - Pistas remotas que el servidor ya guardó en disco
+//
+// URL remota → /api/v1/audio/ingest-N, en localStorage: las reproducciones
+// siguientes salen de la copia del servidor en vez de ir a upstream. El
+// servidor puede expulsar esa copia (LRU); si la URL local falla al
+// reproducirse, el motor vuelve a la remota (`remotePlaybackUrl`) y
+// PlayerContext olvida la entrada y pide una nueva ingesta.
+import api from './axiosConfig';
+import { UnifiedTrack } from '../types/music';
+
+const INGESTED_KEY = 'tidol_ingested_v1';
+const INGESTED_MAX = 2000;
+
+export function readIngested(): Record<string, string> {
+    try {
+        const data = JSON.parse(localStorage.getItem(INGESTED_KEY) || '{}');
+        return data && typeof data === 'object' ? data : {};
+    } catch {
+        return {};
+    }
+}
+
+function writeIngested(map: Record<string, string>) {
+    try {
+        localStorage.setItem(INGESTED_KEY, JSON.stringify(map));
+    } catch { /* cuota llena: se seguirá reproduciendo desde upstream */ }
+}
+
+export function rememberIngested(remoteUrl: string, localUrl: string) {
+    const map = readIngested();
+    map[remoteUrl] = localUrl;
+    const keys = Object.keys(map);
+    // Orden de inserción: se descartan las más antiguas.
+    keys.slice(0, Math.max(0, keys.length - INGESTED_MAX)).forEach((k) => delete map[k]);
+    writeIngested(map);
+}
+
+export function forgetIngested(remoteUrl: string) {
+    const map = readIngested();
+    if (!(remoteUrl in map)) return;
+    delete map[remoteUrl];
+    writeIngested(map);
+}
+
+/** Sustituye la URL remota por la copia local, conservando la remota de reserva. */
+export function withLocalPlayback(song: UnifiedTrack, ingested: Record<string, string>): UnifiedTrack {
+    const local = song?.playbackUrl ? ingested[song.playbackUrl] : undefined;
+    return local ? { ...song, playbackUrl: local, remotePlaybackUrl: song.playbackUrl } : song;
+}
+
+/**
+ * Pide al servidor que descargue la pista remota (POST /spectra/ingest-remote).
+ * Si ya la tenía, recuerda su URL local.
+ */
+export function requestIngest(song: UnifiedTrack) {
+    const remoteUrl = song.remotePlaybackUrl || song.playbackUrl;
+    if (!remoteUrl) return;
+
+    api.post('/spectra/ingest-remote', {
+        audioUrl: remoteUrl,
+        coverUrl: song.attributes?.artwork?.url || null,
+        metadata: {
+            title: song.attributes?.name || 'Unknown',
+            artist: song.attributes?.artistName || 'Unknown',
+            album: song.attributes?.albumName || 'Internet Archive',
+            ia_id: song.id,
+            duration: song.attributes?.durationInSeconds || 0
+        }
+    })
+        .then(response => {
+            const data = response.data;
+            if (data.success) {
+                if (data.alreadyExists) {
+                    if (data.localUrl) rememberIngested(remoteUrl, data.localUrl);
+                    console.log('💾 Pista ya estaba en caché:', song.attributes?.name || 'Unknown');
+                } else {
+                    console.log('📥 Descarga iniciada:', song.attributes?.name || 'Unknown', `(Track ID: ${data.trackId})`);
+                }
+            } else {
+                console.warn('⚠️  Backend respondió con error:', data.error);
+            }
+        })
+        .catch(error => {
+            console.warn('⚠️  No se pudo cachear la pista:', error.message);
+        });
+}
@@ -0,0 +1,129 @@
+// likeSync.js - Estado de "me gusta" sincronizado por versión
+//
+// Guarda en localStorage el último conjunto de likes y su versión; al abrir la
+// app solo pide al backend lo cambiado desde esa versión
+// (GET /music/likes/sync?since=N). Sin copia local, o si el backend no
+// reconoce la versión, responde el conjunto completo (full: true).
+//
+// Las escrituras se agrupan: cada like/unlike se encola y, tras una pausa sin
+// clics, se envían todos juntos en POST /music/likes/batch (una transacción).
+
+import api from './axiosConfig';
+
+const PREFIX = 'tidol_likes_v1_';
+
+// Pausa sin nuevos clics antes de enviar el lote.
+const FLUSH_DELAY_MS = 800;
+// Mismo tope que el backend (MAX_BATCH_OPS en like_sync.rs).
+const MAX_BATCH_OPS = 500;
+
+// Una copia por usuario: dos cuentas en el mismo navegador no comparten likes.
+function storageKey() {
+  return `${PREFIX}${localStorage.getItem('username') || 'anon'}`;
+}
+
+function readStored() {
+  try {
+    const data = JSON.parse(localStorage.getItem(storageKey()));
+    if (data && Number.isFinite(data.version) && Array.isArray(data.ids)) return data;
+  } catch { /* copia corrupta: se re-sincroniza completa */ }
+  return { version: 0, ids: [] };
+}
+
+/**
+ * Devuelve el conjunto de ids con like (locales + Internet Archive) al día.
+ * @returns {Promise<Set<string>>}
+ */
+export async function syncLikes() {
+  const stored = readStored();
+  const res = await api.get('/music/likes/sync', { params: { since: stored.version } });
+  const data = res.data || {};
+
+  let ids;
+  if (data.full) {
+    ids = new Set([...(data.local || []), ...(data.archive || [])]);
+  } else {
+    ids = new Set(stored.ids);
+    (data.removed || []).forEach((id) => ids.delete(id));
+    (data.added || []).forEach((entry) => ids.add(entry.id));
+  }
+
+  try {
+    localStorage.setItem(storageKey(), JSON.stringify({ version: data.version || 0, ids: [...ids] }));
+  } catch { /* cuota llena: la próxima vez será una sincronización completa */ }
+  return ids;
+}
+
+// ── Escrituras por lotes ─────────────────────────────────────────────────────
+// Por id: la operación a enviar, el estado que tenía el servidor al encolarla
+// y cómo deshacer el cambio optimista si el lote falla.
+const pending = new Map();
+let flushTimer = null;
+
+/** ¿Hay un like/unlike de este id todavía sin enviar? */
+export function hasPendingLike(id) {
+  return pending.has(String(id));
+}
+
+/**
+ * Encola un like/unlike. Varios clics sobre la misma pista se quedan en el
+ * último estado, y si vuelve al que tenía el servidor no se envía nada.
+ * @param {{ id: string|number, source?: 'local'|'archive', liked: boolean,
+ *           wasLiked: boolean, onError?: () => void }} change
+ */
+export function queueLike({ id, source = 'local', liked, wasLiked, onError }) {
+  const key = String(id);
+  const prev = pending.get(key);
+  const serverLiked = prev ? prev.wasLiked : wasLiked;
+  if (liked === serverLiked) {
+    pending.delete(key);
+  } else {
+    pending.set(key, { op: { id: key, source, liked }, wasLiked: serverLiked, onError: onError || prev?.onError });
+  }
+  clearTimeout(flushTimer);
+  flushTimer = setTimeout(flushLikes, FLUSH_DELAY_MS);
+}
+
+function takePending() {
+  clearTimeout(flushTimer);
+  flushTimer = null;
+  const entries = [...pending.values()];
+  pending.clear();
+  const chunks = [];
+  for (let i = 0; i < entries.length; i += MAX_BATCH_OPS) {
+    chunks.push(entries.slice(i, i + MAX_BATCH_OPS));
+  }
+  return chunks;
+}
+
+/** Envía ya lo encolado. Si un lote falla, deshace sus cambios optimistas. */
+export async function flushLikes() {
+  for (const chunk of takePending()) {
+    try {
+      await api.post('/music/likes/batch', { ops: chunk.map((e) => e.op) });
+    } catch (err) {
+      console.error('[likeSync] Lote de likes fallido:', err);
+      chunk.forEach((e) => e.onError?.());
+    }
+  }
+}
+
+// Al ocultar/cerrar la pestaña no se espera a la pausa: `keepalive` deja que la
+// petición termine aunque la página se descargue (axios no lo permite).
+if (typeof document !== 'undefined') {
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState !== 'hidden' || pending.size === 0) return;
+    const token = localStorage.getItem('token');
+    for (const chunk of takePending()) {
+      fetch('/api/v1/music/likes/batch', {
+        method: 'POST',
+        keepalive: true,
+        headers: {
+          'Content-Type': 'application/json',
+          ...(token ? { Authorization: `Bearer ${token}` } : {}),
+        },
+        body: JSON.stringify({ ops: chunk.map((e) => e.op) }),
+      }).catch(() => chunk.forEach((e) => e.onError?.()));
+    }
+  });
+}
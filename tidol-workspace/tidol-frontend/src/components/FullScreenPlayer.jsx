@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate } from 'react-router-dom';
 import api from '../api/axiosConfig';
 import { usePlayerState, usePlayerProgress, usePlayer } from '../context/PlayerContext';
@@ -82,7 +82,7 @@ function QueueRow({ song, isCurrent, isPlaying, accent, onPlay }) {
 }
 
 export default function FullScreenPlayer({ isEmbedded = false }) {
-    const { currentSong, isPlaying, isFullScreenOpen, volume, originalQueue, currentIndex } = usePlayerState();
+    const { currentSong, isPlaying, isFullScreenOpen, volume, originalQueue, currentIndex, lyricsVersion } = usePlayerState();
 
     const {
         togglePlayPause, nextSong, previousSong,
@@ -118,6 +118,7 @@ export default function FullScreenPlayer({ isEmbedded = false }) {
     const [lyricsData, setLyricsData] = useState(null);
     const [lyricsLoading, setLyricsLoading] = useState(false);
     const [lyricsError, setLyricsError] = useState(false);
+    const lyricsKeyRef = useRef(null);
 
     useEffect(() => {
         // Flag de cancelación: al cambiar rápido de pista quedaban dos requests en
@@ -128,12 +129,20 @@ export default function FullScreenPlayer({ isEmbedded = false }) {
         // `trackId` (Home "Volver a escuchar"/normalizeToUnifiedTrack).
         const mbid = currentSong?.id || currentSong?.trackId;
         if (mbid) {
-            setViewMode('cover');
-            // Limpiar SIEMPRE la letra anterior al cambiar de pista: si el fetch
-            // nuevo falla o se retrasa, la letra de la canción previa no debe
-            // quedarse en pantalla (bug: A terminaba, sonaba B, seguía la letra de A).
-            setLyricsData(null);
-            setLyricsError(false);
+            // `lyricsVersion` sube cuando el backend avisa (SSE `lyrics_ready` /
+            // `resync`) de que la letra de la pista actual ya está lista: en ese
+            // caso solo se re-pide, sin volver a la vista de portada.
+            const key = `${mbid}|${isFullScreenOpen}`;
+            const trackChanged = lyricsKeyRef.current !== key;
+            lyricsKeyRef.current = key;
+            if (trackChanged) {
+                setViewMode('cover');
+                // Limpiar SIEMPRE la letra anterior al cambiar de pista: si el fetch
+                // nuevo falla o se retrasa, la letra de la canción previa no debe
+                // quedarse en pantalla (bug: A terminaba, sonaba B, seguía la letra de A).
+                setLyricsData(null);
+                setLyricsError(false);
+            }
             if (isFullScreenOpen) {
                 setLyricsLoading(true);
                 api.get(`/lyrics/${mbid}`)
@@ -163,7 +172,7 @@ export default function FullScreenPlayer({ isEmbedded = false }) {
             }
         }
         return () => { cancelled = true; };
-    }, [currentSong?.id, currentSong?.trackId, isFullScreenOpen]);
+    }, [currentSong?.id, currentSong?.trackId, isFullScreenOpen, lyricsVersion]);
 
     useEffect(() => {
         if (isEmbedded) {
@@ -1,6 +1,7 @@
 import React from 'react';
 import { IoHeart, IoHeartOutline } from 'react-icons/io5';
 import api from '../api/axiosConfig';
+import { queueLike, hasPendingLike } from '../api/likeSync';
 
 /**
  * Botón para dar "Me Gusta" a una canción.
@@ -27,24 +28,30 @@ export default function LikeButton({ song, isLiked, onLikeToggle, isArchive = fa
       return;
     }
 
-    // Fallback: LikeButton will call API itself if no parent handler
+    // Fallback: LikeButton will call API itself if no parent handler.
+    // Igual que toggleLike del PlayerContext: todo va al lote de
+    // /music/likes/batch salvo el like nuevo de Internet Archive, que necesita
+    // el toggle para guardar su metadata.
+    if (!isArchive || isLiked || hasPendingLike(songId)) {
+      queueLike({
+        id: songId,
+        source: isArchive ? 'archive' : 'local',
+        liked: !isLiked,
+        wasLiked: isLiked,
+      });
+      return;
+    }
     try {
-      if (isArchive) {
-        const body = {
-          identifier: songId,
-          title: song.attributes?.name || song.title || song.titulo || 'Unknown',
-          artist: song.attributes?.artistName || song.artist || song.artista || 'Unknown',
-          source: song.source || 'internet_archive',
-          url: song.playbackUrl || song.url,
-          portada: song.attributes?.artwork?.url || song.artworkUrl || song.portada || song.cover,
-          duration: song.attributes?.durationInSeconds || song.duration
-        };
-        await api.post('/music/ia/likes/toggle', body);
-      } else if (isLiked) {
-        await api.delete(`/music/songs/${songId}/like`);
-      } else {
-        await api.post(`/music/songs/${songId}/like`);
-      }
+      const body = {
+        identifier: songId,
+        title: song.attributes?.name || song.title || song.titulo || 'Unknown',
+        artist: song.attributes?.artistName || song.artist || song.artista || 'Unknown',
+        source: song.source || 'internet_archive',
+        url: song.playbackUrl || song.url,
+        portada: song.attributes?.artwork?.url || song.artworkUrl || song.portada || song.cover,
+        duration: song.attributes?.durationInSeconds || song.duration
+      };
+      await api.post('/music/ia/likes/toggle', body);
     } catch (error) {
       const serverMsg = error?.response?.data?.error || error?.message || 'Unknown error';
       console.error("Error al dar/quitar like:", serverMsg, error?.response?.data);
@@ -1,15 +1,43 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { IoSearch, IoReload } from 'react-icons/io5';
+import api from '../api/axiosConfig';
 
 export default function SearchInput({ onSearch, loading, initialValue = '' }) {
   const [query, setQuery] = useState(initialValue);
   const [isFocused, setIsFocused] = useState(false);
+  const [suggestions, setSuggestions] = useState([]);
+  const lastRequest = useRef(0);
 
   // Sincroniza el input si cambia la URL o se selecciona algo del historial.
   useEffect(() => {
     setQuery(initialValue);
   }, [initialValue]);
 
+  // Sugerencias del índice en memoria del backend (GET /search/suggest): no
+  // sale a MusicBrainz, así que basta una petición por tecla. Solo se aplica
+  // la respuesta de la última.
+  useEffect(() => {
+    const q = query.trim();
+    if (!isFocused || !q || q === initialValue) {
+      setSuggestions([]);
+      return;
+    }
+    const id = ++lastRequest.current;
+    api.get('/search/suggest', { params: { q, limit: 6 } })
+      .then((res) => {
+        if (id === lastRequest.current) setSuggestions(res.data?.suggestions || []);
+      })
+      .catch(() => {
+        if (id === lastRequest.current) setSuggestions([]);
+      });
+  }, [query, isFocused, initialValue]);
+
+  const pickSuggestion = (term) => {
+    setQuery(term);
+    setSuggestions([]);
+    onSearch(term);
+  };
+
   const handleSubmit = (e) => {
     if (e.key === 'Enter') {
       if (query.trim()) {
@@ -21,7 +49,7 @@ export default function SearchInput({ onSearch, loading, initialValue = '' }) {
   };
 
   return (
-    <div className="w-full">
+    <div className="relative w-full">
       <div
         className={`
           relative flex items-center rounded-full
@@ -57,6 +85,32 @@ export default function SearchInput({ onSearch, loading, initialValue = '' }) {
           </div>
         )}
       </div>
+
+      {isFocused && suggestions.length > 0 && (
+        <ul className="absolute left-0 right-0 top-full mt-2 z-20 py-2 rounded-2xl bg-neutral-900/95 border border-white/10 shadow-xl backdrop-blur">
+          {suggestions.map((s) => (
+            <li key={s.query}>
+              <button
+                type="button"
+                // onMouseDown: el blur del input llega antes que el click.
+                onMouseDown={(e) => {
+                  e.preventDefault();
+                  pickSuggestion(s.query);
+                }}
+                className="w-full flex items-center gap-3 px-4 py-2 text-left hover:bg-white/10 transition-colors"
+              >
+                <IoSearch className="text-white/35 shrink-0" size={16} />
+                <span className="text-white text-sm font-medium truncate">{s.query}</span>
+                {s.tracks?.[0] && (
+                  <span className="ml-auto text-white/40 text-xs truncate">
+                    {s.tracks[0].trackName}
+                  </span>
+                )}
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
     </div>
   );
 }
@@ -4,6 +4,8 @@ import {
 } from 'react';
 import { useMotionValue, MotionValue } from 'framer-motion';
 import api from '../api/axiosConfig';
+import { syncLikes, queueLike, hasPendingLike } from '../api/likeSync';
+import { forgetIngested, requestIngest } from '../api/ingestCache';
 import { TidolAudioEngine } from '../engine/TidolAudioEngine';
 import { resolvePlayback } from '../engine/embedResolver';
 import { startKeepAlive, stopKeepAlive } from '../engine/backgroundKeepAlive';
@@ -166,15 +168,11 @@ export function PlayerProvider({ children }: { children: ReactNode }) {
 
     // ── Likes ────────────────────────────────────────────────────
     useEffect(() => {
+        // Delta desde la versión guardada en local (ver api/likeSync.js): antes
+        // se descargaban las dos listas completas de ids en cada arranque.
         const fetchLikes = async () => {
             try {
-                const [localRes, iaRes] = await Promise.all([
-                    api.get('/music/songs/likes').catch(() => ({ data: [] })),
-                    api.get('/music/ia/likes').catch(() => ({ data: [] }))
-                ]);
-                const localIds = localRes.data || [];
-                const iaIds = iaRes.data || [];
-                setLikedSongs(new Set([...localIds, ...iaIds]));
+                setLikedSongs(await syncLikes());
             } catch (err) {
                 console.error('[PlayerContext] Failed to fetch likes:', err);
             }
@@ -197,6 +195,47 @@ export function PlayerProvider({ children }: { children: ReactNode }) {
         }
     }, [currentTrack, isPlaying]);
 
+    // ── Eventos del backend (SSE) ────────────────────────────────
+    // Una sola conexión a /api/v1/events filtrada por la pista actual: los
+    // workers avisan cuando la letra o la portada están listas y solo entonces
+    // se vuelve a pedir. `lyricsVersion` sube con cada aviso para que el
+    // fullscreen re-pida la letra; en `cover_ready` la portada servida por
+    // /api/v1/covers/:mbid se recarga con un cache-buster. `resync` (el backend
+    // descartó eventos por ir atrasados) re-pide ambas cosas.
+    const [lyricsVersion, setLyricsVersion] = useState(0);
+    const eventsTrackId = currentTrack
+        ? String(currentTrack.id || currentTrack.trackId || (currentTrack as any).mbid || '')
+        : '';
+    useEffect(() => {
+        const token = localStorage.getItem('token');
+        if (!eventsTrackId || eventsTrackId.startsWith('blob') || !token) return;
+
+        const params = new URLSearchParams({ tracks: eventsTrackId, token });
+        const source = new EventSource(`/api/v1/events?${params}`);
+
+        const refreshCover = () => {
+            setCurrentTrack(prev => {
+                const id = prev && String(prev.id || prev.trackId || (prev as any).mbid || '');
+                if (!prev || id !== eventsTrackId) return prev;
+                // Solo la portada del backend cambia: una portada real remota se deja tal cual.
+                const shown = getCoverSrc({ ...prev, resolvedCover: undefined }, true);
+                if (!shown.startsWith('/api/v1/covers/')) return prev;
+                return {
+                    ...prev,
+                    resolvedCover: `/api/v1/covers/${encodeURIComponent(eventsTrackId)}?v=${Date.now()}`,
+                    extractedColors: undefined,
+                };
+            });
+        };
+        const refreshLyrics = () => setLyricsVersion(v => v + 1);
+
+        source.addEventListener('lyrics_ready', refreshLyrics);
+        source.addEventListener('cover_ready', refreshCover);
+        source.addEventListener('resync', () => { refreshLyrics(); refreshCover(); });
+
+        return () => source.close();
+    }, [eventsTrackId]);
+
     // ── VOX ──────────────────────────────────────────────────────
 
     const { voxState, processAndListen, startStems, stopStems, setActiveType, checkDrift } = useVoxAudio();
@@ -433,15 +472,25 @@ export function PlayerProvider({ children }: { children: ReactNode }) {
             console.log('[PlayerContext] Song ended, playing next...');
             nextSongRef.current();
         };
+        // La copia del servidor ya no existe (expulsada): el motor ya suena desde
+        // la URL remota; se olvida la copia y se pide una nueva ingesta.
+        const handleSourceFallback = (e: any) => {
+            const track: UnifiedTrack = e.detail;
+            if (!track.remotePlaybackUrl) return;
+            forgetIngested(track.remotePlaybackUrl);
+            requestIngest(track);
+        };
 
         engine.addEventListener('timeupdate', handleTimeUpdate);
         engine.addEventListener('statechange', handleStateChange);
         engine.addEventListener('ended', handleEnded);
+        engine.addEventListener('sourcefallback', handleSourceFallback);
 
         return () => {
             engine.removeEventListener('timeupdate', handleTimeUpdate);
             engine.removeEventListener('statechange', handleStateChange);
             engine.removeEventListener('ended', handleEnded);
+            engine.removeEventListener('sourcefallback', handleSourceFallback);
         };
     }, []);
 
@@ -798,30 +847,39 @@ export function PlayerProvider({ children }: { children: ReactNode }) {
             isCurrentlyLiked ? next.delete(id) : next.add(id);
             return next;
         });
+        const rollback = () => setLikedSongs(prev => {
+            const next = new Set(prev);
+            isCurrentlyLiked ? next.add(id) : next.delete(id);
+            return next;
+        });
+
+        // Los clics se agrupan en POST /music/likes/batch (ver api/likeSync.js).
+        // Excepción: el like NUEVO a una pista de Internet Archive va suelto por
+        // /music/ia/likes/toggle, que además guarda su título/artista/portada.
+        if (!isIA || isCurrentlyLiked || hasPendingLike(id)) {
+            queueLike({
+                id,
+                source: isIA ? 'archive' : 'local',
+                liked: !isCurrentlyLiked,
+                wasLiked: isCurrentlyLiked,
+                onError: rollback,
+            });
+            return;
+        }
 
         try {
-            if (isIA) {
-                await api.post('/music/ia/likes/toggle', {
-                    identifier: id,
-                    title: song?.attributes?.name || song?.title || (song as any)?.titulo || 'Unknown',
-                    artist: song?.attributes?.artistName || song?.artist || (song as any)?.artista || 'Unknown',
-                    source: (song as any)?.source || 'internet_archive',
-                    url: song?.playbackUrl || (song as any)?.url,
-                    portada: song?.attributes?.artwork?.url || song?.artworkUrl || (song as any)?.portada,
-                    duration: song?.attributes?.durationInSeconds || (song as any)?.duration
-                });
-            } else if (isCurrentlyLiked) {
-                await api.delete(`/music/songs/${id}/like`);
-            } else {
-                await api.post(`/music/songs/${id}/like`, {});
-            }
+            await api.post('/music/ia/likes/toggle', {
+                identifier: id,
+                title: song?.attributes?.name || song?.title || (song as any)?.titulo || 'Unknown',
+                artist: song?.attributes?.artistName || song?.artist || (song as any)?.artista || 'Unknown',
+                source: (song as any)?.source || 'internet_archive',
+                url: song?.playbackUrl || (song as any)?.url,
+                portada: song?.attributes?.artwork?.url || song?.artworkUrl || (song as any)?.portada,
+                duration: song?.attributes?.durationInSeconds || (song as any)?.duration
+            });
         } catch (error: any) {
             console.error('[PlayerContext] Toggle like failed:', error);
-            setLikedSongs(prev => {
-                const next = new Set(prev);
-                isCurrentlyLiked ? next.add(id) : next.delete(id);
-                return next;
-            });
+            rollback();
         }
     }, [likedSongs]);
 
@@ -843,9 +901,10 @@ export function PlayerProvider({ children }: { children: ReactNode }) {
         currentIndex,
         detectedQuality: null,
         isVoxLoading,
+        lyricsVersion,
         playbackDetails: { provider: 'unknown' as const },
     }), [currentTrack, isPlaying, volume, isMuted, isFullScreenOpen, isDataSaving,
-         voxMode, voxType, queue, currentIndex, isVoxLoading]);
+         voxMode, voxType, queue, currentIndex, isVoxLoading, lyricsVersion]);
 
     // Acciones: todas son useCallback estables ⇒ identidad constante ⇒ los
     // consumidores de usePlayerActions NO re-renderizan por cambios de estado.
@@ -242,7 +242,7 @@ export class TidolAudioEngine extends EventTarget {
                 streamUrl: track.playbackUrl,
                 provider: track.sourceType || 'direct',
                 metadata: { source: track.sourceType },
-                fallbacks: []
+                fallbacks: track.remotePlaybackUrl ? [track.remotePlaybackUrl] : []
             };
         }
 
@@ -260,8 +260,10 @@ export class TidolAudioEngine extends EventTarget {
         this.dispatchEvent(new CustomEvent('trackchange', { detail: track }));
         this.dispatchEvent(new CustomEvent('statechange', { detail: this.state }));
 
+        let fallbackUrl: string | undefined;
         try {
-            const { streamUrl, provider, metadata } = await this.resolveStreamUrl(track);
+            const { streamUrl, provider, metadata, fallbacks } = await this.resolveStreamUrl(track);
+            if (!provider?.startsWith('vox-')) fallbackUrl = fallbacks[0];
 
             this.dispatchEvent(new CustomEvent('providerchange', {
                 detail: { provider, metadata, songId: track.id }
@@ -314,6 +316,14 @@ export class TidolAudioEngine extends EventTarget {
                 return;
             }
 
+            // Copia ingerida por el servidor ya expulsada (404): se reproduce la
+            // URL remota original y se avisa para que se olvide la copia.
+            if (fallbackUrl) {
+                console.warn('[AudioEngine] Source failed, falling back to remote URL:', fallbackUrl);
+                this.dispatchEvent(new CustomEvent('sourcefallback', { detail: track }));
+                return this.playTrack({ ...track, playbackUrl: fallbackUrl, remotePlaybackUrl: undefined }, startTime);
+            }
+
             console.error('Play error:', error);
             if (error instanceof Error) console.error('Error stack:', error.stack);
             if (this.getActiveAudio().error) {
@@ -2,7 +2,7 @@
 import { useCallback } from 'react';
 import { usePlayer } from '../context/PlayerContext';
 import { UnifiedTrack } from '../types/music';
-import api from '../api/axiosConfig';
+import { readIngested, requestIngest, withLocalPlayback } from '../api/ingestCache';
 
 export function useLazyCaching() {
     const { playSongList } = usePlayer();
@@ -30,34 +30,10 @@ export function useLazyCaching() {
             return;
         }
 
-        const SPECTRA_URL = '/spectra';
+        // Ya en disco del servidor (ver api/ingestCache.ts).
+        if (readIngested()[song.playbackUrl]) return;
 
-        api.post(`${SPECTRA_URL}/ingest-remote`, {
-            audioUrl: song.playbackUrl,
-            coverUrl: song.attributes.artwork?.url || null,
-            metadata: {
-                title: song.attributes?.name || 'Unknown',
-                artist: song.attributes?.artistName || 'Unknown',
-                album: song.attributes?.albumName || 'Internet Archive',
-                ia_id: song.id,
-                duration: song.attributes?.durationInSeconds || 0
-            }
-        })
-            .then(response => {
-                const data = response.data;
-                if (data.success) {
-                    if (data.alreadyExists) {
-                        console.log('💾 Pista ya estaba en caché:', song.attributes?.name || 'Unknown');
-                    } else {
-                        console.log('📥 Descarga iniciada:', song.attributes?.name || 'Unknown', `(Track ID: ${data.trackId})`);
-                    }
-                } else {
-                    console.warn('⚠️  Backend respondió con error:', data.error);
-                }
-            })
-            .catch(error => {
-                console.warn('⚠️  No se pudo cachear la pista:', error.message);
-            });
+        requestIngest(song);
     }, []);
 
     const handlePlayTrack = useCallback(async (song: UnifiedTrack) => {
@@ -66,7 +42,7 @@ export function useLazyCaching() {
             return;
         }
 
-        playSongList([song], 0);
+        playSongList([withLocalPlayback(song, readIngested())], 0);
         console.log('▶️  Reproducción iniciada:', song.attributes?.name || 'Unknown');
         triggerBackgroundDownload(song);
     }, [playSongList, triggerBackgroundDownload]);
@@ -74,7 +50,8 @@ export function useLazyCaching() {
     const handlePlayList = useCallback((songs: UnifiedTrack[], startIndex = 0) => {
         if (!songs || songs.length === 0) return;
 
-        playSongList(songs, startIndex);
+        const ingested = readIngested();
+        playSongList(songs.map((song) => withLocalPlayback(song, ingested)), startIndex);
 
         songs.forEach((song, index) => {
             setTimeout(() => {
@@ -1,6 +1,10 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
 import api from '../api/axiosConfig';
 
+// Tamaño de página de los favoritos (cursor keyset en el backend). Las
+// playlists siguen llegando completas: son pocas y ya vienen resumidas.
+const PAGE_SIZE = 60;
+
 export const useLibrary = () => {
     const [currentView, setCurrentView] = useState('favorites');
     const [layout, setLayout] = useState('grid');
@@ -13,6 +17,9 @@ export const useLibrary = () => {
     // Un fallo de red no es una biblioteca vacía: sin esto, un 500 se veía como
     // "Aún no tienes playlists".
     const [error, setError] = useState(null);
+    // Cursor de la página siguiente (null = no hay más o vista sin paginar).
+    const [nextCursor, setNextCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const latestView = useRef(currentView);
 
     const fetchData = useCallback(async (view) => {
@@ -20,23 +27,21 @@ export const useLibrary = () => {
         setIsLoading(true);
         setError(null);
         setItems([]); // no mostrar contenido de la pestaña anterior
+        setNextCursor(null);
 
-        let endpoint = '';
-        switch (view) {
-            // likes/detailed devuelve título/artista/portada; los endpoints
-            // antiguos (/music/songs/likes) solo devuelven IDs y la Library
-            // mostraba "Sin título" en todo.
-            case 'favorites': endpoint = '/music/likes/detailed?source=local'; break;
-            case 'ia-likes': endpoint = '/music/likes/detailed?source=archive'; break;
-            case 'playlists': endpoint = '/playlists'; break;
-            default:
-                setIsLoading(false);
-                return;
+        const endpoint = endpointFor(view);
+        if (!endpoint) {
+            setIsLoading(false);
+            return;
         }
 
         try {
             const res = await api.get(endpoint);
-            if (latestView.current === view) setItems(res.data || []);
+            if (latestView.current === view) {
+                const page = readPage(res.data);
+                setItems(page.items);
+                setNextCursor(page.nextCursor);
+            }
         } catch (err) {
             if (latestView.current === view) {
                 setItems([]);
@@ -49,6 +54,28 @@ export const useLibrary = () => {
         }
     }, []);
 
+    // Añade la página siguiente a la lista actual. Si el usuario cambia de
+    // pestaña mientras carga, la respuesta se descarta.
+    const loadMore = useCallback(async () => {
+        const view = latestView.current;
+        const endpoint = endpointFor(view);
+        if (!endpoint || !nextCursor || isLoadingMore) return;
+
+        setIsLoadingMore(true);
+        try {
+            const res = await api.get(`${endpoint}&cursor=${encodeURIComponent(nextCursor)}`);
+            if (latestView.current === view) {
+                const page = readPage(res.data);
+                setItems((prev) => [...prev, ...page.items]);
+                setNextCursor(page.nextCursor);
+            }
+        } catch {
+            // Se conserva lo ya cargado; el botón permite reintentar.
+        } finally {
+            setIsLoadingMore(false);
+        }
+    }, [nextCursor, isLoadingMore]);
+
     useEffect(() => {
         void fetchData(currentView);
     }, [currentView, fetchData]);
@@ -61,6 +88,27 @@ export const useLibrary = () => {
         data: items,
         isLoading,
         error,
+        hasMore: Boolean(nextCursor),
+        isLoadingMore,
+        loadMore,
         refresh: () => fetchData(currentView)
     };
 };
+
+// likes/detailed devuelve título/artista/portada; los endpoints antiguos
+// (/music/songs/likes) solo devuelven IDs y la Library mostraba "Sin título"
+// en todo.
+function endpointFor(view) {
+    switch (view) {
+        case 'favorites': return `/music/likes/detailed?source=local&limit=${PAGE_SIZE}`;
+        case 'ia-likes': return `/music/likes/detailed?source=archive&limit=${PAGE_SIZE}`;
+        case 'playlists': return '/playlists';
+        default: return null;
+    }
+}
+
+// Paginado → { items, nextCursor }; sin paginar → array.
+function readPage(data) {
+    if (Array.isArray(data)) return { items: data, nextCursor: null };
+    return { items: data?.items || [], nextCursor: data?.nextCursor || null };
+}
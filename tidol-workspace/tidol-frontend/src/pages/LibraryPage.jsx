@@ -33,7 +33,10 @@ function formatMinutes(seconds) {
 }
 
 export default function LibraryPage() {
-  const { currentView, setCurrentView, layout, setLayout, data, isLoading, error, refresh } = useLibrary();
+  const {
+    currentView, setCurrentView, layout, setLayout, data, isLoading, error, refresh,
+    hasMore, isLoadingMore, loadMore,
+  } = useLibrary();
   const { playSongList } = usePlayer();
   const { createPlaylist } = usePlaylist();
   const navigate = useNavigate();
@@ -101,7 +104,7 @@ export default function LibraryPage() {
               {VIEW_TITLES[currentView]}
             </h1>
             <p className="text-white/45 text-sm mt-1.5">
-              {isLoading ? "Cargando…" : error ? "—" : `${data.length} ${data.length === 1 ? "elemento" : "elementos"}`}
+              {isLoading ? "Cargando…" : error ? "—" : `${data.length}${hasMore ? "+" : ""} ${data.length === 1 && !hasMore ? "elemento" : "elementos"}`}
             </p>
           </div>
 
@@ -212,6 +215,18 @@ export default function LibraryPage() {
             )}
           </div>
         )}
+
+        {!isLoading && !error && hasMore && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="px-5 py-2.5 rounded-full bg-white/[0.08] border border-white/15 text-white font-semibold hover:bg-white/[0.14] transition-colors disabled:opacity-50"
+            >
+              {isLoadingMore ? "Cargando…" : "Cargar más"}
+            </button>
+          </div>
+        )}
       </div>
 
       <PlaylistNameModal
@@ -58,6 +58,9 @@ export interface UnifiedTrack {
 
     /** URL de streaming o path local resuelto */
     playbackUrl?: string;
+    /** URL remota original cuando `playbackUrl` es la copia ingerida por el servidor
+     *  (/api/v1/audio/ingest-N); el motor vuelve a ella si la copia ya no existe. */
+    remotePlaybackUrl?: string;
 
     /** Plataforma legal de origen para reproducción por embed (YouTube/Spotify/SoundCloud/IA). */
     platform?: Platform;
@@ -68,10 +68,34 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
     let spotify_client_secret = std::env::var("SPOTIFY_CLIENT_SECRET").unwrap_or_default();
     let soundcloud_client_id = std::env::var("SOUNDCLOUD_CLIENT_ID").unwrap_or_default();
     let jwt_secret = std::env::var("JWT_SECRET").ok();
+    let cc_mirror_sync_hours = std::env::var("CC_MIRROR_SYNC_HOURS")
+        .ok()
+        .and_then(|v| v.parse::<u64>().ok())
+        .unwrap_or(24);
+    let redis_url = std::env::var("REDIS_URL")
+        .ok()
+        .filter(|s| !s.trim().is_empty());
+    let database_replica_urls: Vec<String> = std::env::var("DATABASE_REPLICA_URLS")
+        .ok()
+        .map(|s| {
+            s.split(',')
+                .map(|u| u.trim().to_string())
+                .filter(|u| !u.is_empty())
+                .collect()
+        })
+        .unwrap_or_default();
+    let replica_max_lag_secs = std::env::var("REPLICA_MAX_LAG_SECS")
+        .ok()
+        .and_then(|v| v.parse::<u64>().ok())
+        .unwrap_or(5);
+    let audio_cache_dir =
+        std::env::var("AUDIO_CACHE_DIR").unwrap_or_else(|_| "storage/audio".to_string());
 
     let config = CoreConfig {
         database_url,
         database_max_connections,
+        database_replica_urls,
+        replica_max_lag_secs,
         proxy_pool,
         plugins_dir,
         youtube_api_key,
@@ -79,6 +103,9 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
         spotify_client_secret,
         soundcloud_client_id,
         jwt_secret,
+        cc_mirror_sync_hours,
+        redis_url,
+        audio_cache_dir,
     };
 
     // El core abre el pool, ejecuta migraciones, carga plugin y monta proveedores.
@@ -120,6 +147,8 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
         )
         .route("/api/v1/lyrics/:track_id", get(handlers::get_lyrics_handler))
         .route("/api/v1/covers/:mbid", get(handlers::get_cover_handler))
+        // Audio cacheado por la ingesta remota (Range para que <audio> pueda buscar)
+        .route("/api/v1/audio/:track_id", get(handlers::audio_handler))
         // Embed endpoints (public so frontend can use without auth for search preview)
         .route("/api/v1/embed/search", get(handlers::embed_search_handler))
         .route(
@@ -130,6 +159,8 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
     // ─── PROTECTED ROUTES ───
     let protected_routes = Router::new()
         .route("/api/v1/home", get(handlers::get_home_dashboard_handler))
+        // Eventos de progreso (SSE): letra/portada lista, prefetch terminado
+        .route("/api/v1/events", get(handlers::events_handler))
         .route(
             "/api/v1/tracks/listen-again",
             get(handlers::get_listen_again_handler),
@@ -142,6 +173,10 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
             "/api/v1/auth/me",
             get(handlers::me_handler).delete(handlers::delete_me_handler),
         )
+        .route(
+            "/api/v1/search/suggest",
+            get(handlers::search_suggest_handler),
+        )
         .route("/api/v1/search/:query", get(handlers::search_handler))
         .route(
             "/api/v1/artists/:mbid",
@@ -157,6 +192,10 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
             post(handlers::report_cover_404_handler),
         )
         .route("/api/v1/radio", get(handlers::radio_handler))
+        .route(
+            "/api/v1/spectra/ingest-remote",
+            post(handlers::ingest_remote_handler),
+        )
         .route("/api/v1/search/click", post(handlers::click_handler))
         .route("/api/v1/auth/logout", post(handlers::logout_handler))
         .route(
@@ -208,6 +247,14 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
             "/api/v1/music/likes/detailed",
             get(handlers::get_likes_detailed_handler),
         )
+        .route(
+            "/api/v1/music/likes/sync",
+            get(handlers::sync_likes_handler),
+        )
+        .route(
+            "/api/v1/music/likes/batch",
+            post(handlers::like_batch_handler),
+        )
         .route(
             "/api/v1/music/songs/:id/like",
             post(handlers::set_local_like_handler).delete(handlers::unset_local_like_handler),
@@ -282,6 +329,12 @@ async fn main() -> Result<(), Box<dyn std::error::Error>> {
         core_bg.hydrate_unknown_tracks().await;
     });
 
+    // Background: rastreador del espejo CC/PD (Internet Archive)
+    let core_mirror = app_state.core.clone();
+    tokio::spawn(async move {
+        core_mirror.sync_cc_mirror().await;
+    });
+
     axum::serve(
         listener,
         app.into_make_service_with_connect_info::<SocketAddr>(),
@@ -9,17 +9,19 @@
 //! `NotImplemented` / `todo_core`), pero el prompt jamás aborta.
 
 use std::path::Path;
+use std::sync::atomic::{AtomicU32, Ordering};
 use std::sync::Arc;
 use std::time::Instant;
 
 use async_trait::async_trait;
 
-use tidol_core::TidolCore;
+use tidol_core::{AuthContext, CoverOutcome, LogPlayPayload, TidolCore};
 
 use super::{
     AlbumResponse, ArtistResponse, HealthCheck, HealthReport, ImportSummary, LocalAdmin, Mode,
     SearchResponse, Stats, StatusInfo, TidolBackend, TrackMetadataResponse,
 };
+use crate::bench::{AllocWindow, BenchOp, BenchSpec, Counters, OpReport, StubUpstream};
 use crate::error::{BackendError, BackendResult};
 
 /// Backend en modo local. Barato de clonar conceptualmente: solo comparte el
@@ -29,6 +31,9 @@ pub struct LocalBackend {
     started: Instant,
     db_url_redacted: String,
     plugins_dir: String,
+    /// Proxy stub de upstreams (`--stub-upstream`); sin él el bench no puede
+    /// contar llamadas salientes.
+    stub: Option<Arc<StubUpstream>>,
 }
 
 impl LocalBackend {
@@ -43,9 +48,15 @@ impl LocalBackend {
             started,
             db_url_redacted,
             plugins_dir,
+            stub: None,
         }
     }
 
+    pub fn with_stub_upstream(mut self, stub: Arc<StubUpstream>) -> Self {
+        self.stub = Some(stub);
+        self
+    }
+
     /// Sonda de conectividad barata contra la BD, reutilizando un método real del
     /// core (`resolve_artist` con patrón vacío → `LIKE '%%' LIMIT 1`). Devuelve
     /// `Ok` con la BD viva, `Err(Db)` si el pool no conecta. Mapea aquí el
@@ -66,6 +77,99 @@ fn cap<T>(mut v: Vec<T>, limit: u32) -> Vec<T> {
     v
 }
 
+/// Entradas fijas de cada llamada del bench (resueltas una vez, fuera de la
+/// medición).
+struct BenchFixture {
+    user_id: i64,
+    query: String,
+    mbid: String,
+    playlist: String,
+    /// Orden actual de `playlist`: el reorder lo reescribe tal cual, sin
+    /// cambiar la playlist del usuario.
+    order: Vec<String>,
+    /// Usuario desechable de `play` (su historial se borra al terminar) y
+    /// título/artista ya guardados de `mbid`: con ellos `log_play` no consulta
+    /// MusicBrainz ni cambia `track_links`.
+    play_user: i64,
+    play_title: String,
+    play_artist: String,
+}
+
+/// Una llamada a la operación; `false` si el core devolvió error.
+async fn bench_call(core: &TidolCore, op: BenchOp, fx: &BenchFixture) -> bool {
+    match op {
+        BenchOp::Search => core.search_catalog(&fx.query, 20, 0).await.is_ok(),
+        BenchOp::Home => core.get_home_dashboard(fx.user_id).await.is_ok(),
+        BenchOp::Cover => !matches!(
+            core.get_cover(&fx.mbid, None).await,
+            CoverOutcome::InvalidId
+        ),
+        BenchOp::Lyrics => core.get_lyrics(&fx.mbid).await.is_ok(),
+        BenchOp::Reorder => core
+            .reorder_playlist_songs(fx.user_id, &fx.playlist, fx.order.clone())
+            .await
+            .is_ok(),
+        BenchOp::Play => {
+            let payload = LogPlayPayload {
+                title: Some(fx.play_title.clone()),
+                artist: Some(fx.play_artist.clone()),
+                cover_url: None,
+            };
+            core.log_play(&fx.mbid, fx.play_user, Some(payload))
+                .await
+                .is_ok()
+        }
+        BenchOp::Suggest => {
+            core.suggest_queries(&fx.query, None);
+            true
+        }
+    }
+}
+
+/// Ejecuta `calls` llamadas repartidas entre `concurrency` tareas. Devuelve las
+/// latencias (µs, ordenadas) y el número de errores.
+async fn bench_batch(
+    core: &Arc<TidolCore>,
+    op: BenchOp,
+    fx: &Arc<BenchFixture>,
+    calls: u32,
+    concurrency: u32,
+) -> (Vec<u64>, u64) {
+    let next = Arc::new(AtomicU32::new(0));
+    let workers: Vec<_> = (0..concurrency.min(calls))
+        .map(|_| {
+            let (core, fx, next) = (core.clone(), fx.clone(), next.clone());
+            tokio::spawn(async move {
+                let mut latencies = Vec::new();
+                let mut errors = 0u64;
+                while next.fetch_add(1, Ordering::Relaxed) < calls {
+                    let t = Instant::now();
+                    if !bench_call(&core, op, &fx).await {
+                        errors += 1;
+                    }
+                    latencies.push(t.elapsed().as_micros() as u64);
+                }
+                (latencies, errors)
+            })
+        })
+        .collect();
+
+    let mut latencies = Vec::with_capacity(calls as usize);
+    let mut errors = 0;
+    for w in workers {
+        match w.await {
+            Ok((l, e)) => {
+                latencies.extend(l);
+                errors += e;
+            }
+            // Una tarea que paniquea cuenta como error, no tumba el REPL.
+            Err(_) => errors += 1,
+        }
+    }
+    latencies.sort_unstable();
+    (latencies, errors)
+}
+
 #[async_trait]
 impl TidolBackend for LocalBackend {
     async fn list_artists(&self, _limit: u32) -> BackendResult<Vec<ArtistResponse>> {
@@ -181,13 +285,13 @@ impl TidolBackend for LocalBackend {
             detail: self.plugins_dir.clone(),
         });
 
-        // "Rutas de audio válidas": la reproducción desde biblioteca local vive
-        // tras la feature `local-library`, hoy un placeholder sin implementación.
+        // "Rutas de audio válidas": la biblioteca local (comando `import`) vive
+        // tras la feature `local-library`.
         checks.push(HealthCheck {
             name: "local_library".into(),
             ok: cfg!(feature = "local-library"),
             detail: if cfg!(feature = "local-library") {
-                "feature activa (import stub, pendiente en el core)".into()
+                "feature activa (import habilitado)".into()
             } else {
                 "feature inactiva (recompila con --features tidol-core/local-library)".into()
             },
@@ -207,10 +311,41 @@ impl LocalAdmin for LocalBackend {
         // se intenta (y el comando ni se compila: ver commands/).
         #[cfg(feature = "local-library")]
         {
-            let _ = path; // la firma esperada del core recibirá la ruta ya validada.
-            Err(BackendError::todo_core(
-                "TidolCore::import_path(path: &std::path::Path) -> Result<ImportSummary, TidolError> (tras feature local-library; escanea archivos YA presentes en disco, no descarga)",
-            ))
+            use tidol_core::ImportProgress;
+            // Escanea archivos YA presentes en disco (no descarga). El progreso
+            // llega desde hilos de trabajo del core; se pinta en vivo.
+            let report = self
+                .core
+                .import_path(path, |p| {
+                    crate::render::print_progress(&match p {
+                        ImportProgress::Discovered { found, changed } => {
+                            format!(
+                                "import: {found} ficheros de audio, {changed} nuevos o cambiados"
+                            )
+                        }
+                        ImportProgress::Analyzed { done, total } => {
+                            format!("import: analizando {done}/{total}")
+                        }
+                        ImportProgress::Written { done, total } => {
+                            format!("import: escribiendo {done}/{total}")
+                        }
+                    })
+                })
+                .await;
+            crate::render::end_progress();
+            let r = report.map_err(|e| match e {
+                tidol_core::error::TidolError::NotFound { resource } => {
+                    BackendError::NotFound(resource)
+                }
+                other => BackendError::Db(other.to_string()),
+            })?;
+            Ok(ImportSummary {
+                scanned: r.scanned,
+                imported: r.imported,
+                skipped: r.unchanged,
+                duplicates: r.duplicates,
+                failed: r.failed,
+            })
         }
         #[cfg(not(feature = "local-library"))]
         {
@@ -238,4 +373,119 @@ impl LocalAdmin for LocalBackend {
             "TidolCore::run_migration(name: &str) -> Result<(), sqlx::Error>",
         ))
     }
+
+    async fn bench(&self, spec: &BenchSpec) -> BackendResult<Vec<OpReport>> {
+        let needs = |op| spec.ops.contains(&op);
+        let mbid = spec.mbid.clone().unwrap_or_default();
+        if mbid.is_empty()
+            && [BenchOp::Cover, BenchOp::Lyrics, BenchOp::Play]
+                .into_iter()
+                .any(needs)
+        {
+            return Err(BackendError::Invalid(
+                "cover, lyrics y play necesitan --mbid".into(),
+            ));
+        }
+        let playlist = spec.playlist.clone().unwrap_or_default();
+        let order = if needs(BenchOp::Reorder) {
+            if playlist.is_empty() {
+                return Err(BackendError::Invalid("reorder necesita --playlist".into()));
+            }
+            let songs = self
+                .core
+                .get_playlist_songs(spec.user_id, &playlist)
+                .await
+                .ok_or_else(|| {
+                    BackendError::NotFound(format!(
+                        "playlist {playlist} del usuario {}",
+                        spec.user_id
+                    ))
+                })?;
+            let order: Vec<String> = songs.into_iter().map(|s| s.track_id).collect();
+            if order.is_empty() {
+                return Err(BackendError::Invalid(format!(
+                    "la playlist {playlist} está vacía; reorder no tendría qué medir"
+                )));
+            }
+            order
+        } else {
+            Vec::new()
+        };
+        let (play_title, play_artist) = if needs(BenchOp::Play) {
+            self.core
+                .get_track_title_artist(&mbid)
+                .await
+                .map_err(|e| BackendError::Db(e.to_string()))?
+                .ok_or_else(|| {
+                    BackendError::NotFound(format!(
+                        "pista {mbid} en track_links (play necesita una pista ya registrada)"
+                    ))
+                })?
+        } else {
+            Default::default()
+        };
+        let play_user = if needs(BenchOp::Play) {
+            self.core
+                .create_scratch_user("bench")
+                .await
+                .map_err(|e| BackendError::Db(e.to_string()))?
+        } else {
+            AuthContext {
+                user_id: spec.user_id,
+                device_id: String::new(),
+            }
+        };
+        let fx = Arc::new(BenchFixture {
+            user_id: spec.user_id,
+            query: spec.query.clone(),
+            mbid,
+            playlist,
+            order,
+            play_user: play_user.user_id,
+            play_title,
+            play_artist,
+        });
+
+        let reports = self.bench_ops(spec, &fx).await;
+        // El usuario desechable se lleva su historial (delete_account borra
+        // play_history); se borra aunque alguna op haya fallado.
+        if needs(BenchOp::Play) {
+            self.core
+                .delete_account(&play_user)
+                .await
+                .map_err(|e| BackendError::Db(e.to_string()))?;
+        }
+        Ok(reports)
+    }
+}
+
+impl LocalBackend {
+    /// Mide cada op de `spec` en orden (calentamiento fuera de los contadores).
+    async fn bench_ops(&self, spec: &BenchSpec, fx: &Arc<BenchFixture>) -> Vec<OpReport> {
+        let mut reports = Vec::with_capacity(spec.ops.len());
+        for &op in &spec.ops {
+            if spec.warmup > 0 {
+                bench_batch(&self.core, op, fx, spec.warmup, spec.concurrency).await;
+            }
+            // Lo que el calentamiento haya disparado no se imputa a esta op.
+            if let Some(stub) = &self.stub {
+                stub.take_hits();
+            }
+            let before = Counters::read();
+            let (latencies, errors) = {
+                let _window = AllocWindow::open();
+                bench_batch(&self.core, op, fx, spec.iterations, spec.concurrency).await
+            };
+            let counters = Counters::read().since(before);
+            reports.push(OpReport {
+                op,
+                calls: latencies.len() as u64,
+                errors,
+                latencies_us: latencies,
+                counters,
+                outbound: self.stub.as_ref().map(|s| s.take_hits()),
+            });
+        }
+        reports
+    }
 }
@@ -13,6 +13,7 @@ use std::time::Duration;
 
 use async_trait::async_trait;
 
+use crate::bench::{BenchSpec, OpReport};
 use crate::error::BackendResult;
 
 pub mod local;
@@ -81,7 +82,12 @@ pub struct HealthCheck {
 pub struct ImportSummary {
     pub scanned: u64,
     pub imported: u64,
+    /// Sin cambios desde el último escaneo (mismo tamaño y mtime).
     pub skipped: u64,
+    /// Contenido idéntico a otro fichero ya importado.
+    pub duplicates: u64,
+    /// Ilegibles; se reintentan en el próximo `import`.
+    pub failed: u64,
 }
 
 // =========================================================================
@@ -129,4 +135,6 @@ pub trait LocalAdmin: TidolBackend {
     async fn delete_artist(&self, id: &str, cascade: bool) -> BackendResult<u64>;
     async fn delete_track(&self, id: &str) -> BackendResult<u64>;
     async fn run_migration(&self, name: &str) -> BackendResult<()>;
+    /// Mide operaciones del core en proceso (comando `bench`).
+    async fn bench(&self, spec: &BenchSpec) -> BackendResult<Vec<OpReport>>;
 }
@@ -0,0 +1,819 @@
+//! Instrumentación del comando `bench` (solo-local).
+//!
+//! El bench corre operaciones reales de `tidol-core` **en proceso** y mide, por
+//! operación: latencia (percentiles), asignaciones de memoria, consultas a BD y
+//! llamadas salientes. Cada métrica sale de un contador de proceso distinto:
+//!
+//! - **Asignaciones**: [`CountingAlloc`], el `#[global_allocator]` del binario.
+//!   Solo cuenta mientras un bench está midiendo (fuera de eso es un `load`).
+//! - **Consultas**: [`QueryCounter`], un `Layer` de `tracing` que cuenta los
+//!   eventos `sqlx::query` (sqlx emite uno por sentencia ejecutada).
+//! - **Salientes**: [`StubUpstream`], un proxy HTTP local que cuenta por host y
+//!   contesta con respuestas enlatadas de éxito (JSON de MusicBrainz, LRCLIB e
+//!   iTunes, una imagen para las portadas), de modo que se mide el camino
+//!   feliz y no el de error. Para HTTPS termina TLS con una CA efímera que
+//!   el proceso acepta vía `SSL_CERT_FILE`. Se arma con `--stub-upstream` al
+//!   arrancar, porque reqwest (y el cliente global de musicbrainz_rs) leen
+//!   `HTTP(S)_PROXY` una sola vez por proceso. El stub corre en su propio
+//!   hilo y sus asignaciones no cuentan.
+//!
+//! Los contadores son globales: con `--concurrency > 1` las cifras "por
+//! llamada" son la media del lote, e incluyen el trabajo de fondo que la propia
+//! operación dispare (p. ej. prefetch) mientras el lote sigue en curso.
+
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::cell::Cell;
+use std::collections::{BTreeMap, HashMap};
+use std::path::PathBuf;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Arc, Mutex, MutexGuard};
+
+use openssl::asn1::Asn1Time;
+use openssl::bn::{BigNum, MsbOption};
+use openssl::ec::{EcGroup, EcKey};
+use openssl::error::ErrorStack;
+use openssl::hash::MessageDigest;
+use openssl::nid::Nid;
+use openssl::pkey::{PKey, Private};
+use openssl::x509::extension::{BasicConstraints, KeyUsage, SubjectAlternativeName};
+use openssl::x509::{X509NameBuilder, X509};
+use tokio::io::{AsyncRead, AsyncReadExt, AsyncWriteExt};
+use tokio::net::{TcpListener, TcpStream};
+use tracing::{Event, Level, Subscriber};
+use tracing_subscriber::filter::Targets;
+use tracing_subscriber::layer::{Context, Layer};
+
+/// Operaciones del core que sabe medir el bench.
+#[derive(Clone, Copy, Debug, PartialEq, Eq, clap::ValueEnum)]
+pub enum BenchOp {
+    /// `search_catalog` (MusicBrainz).
+    Search,
+    /// `get_home_dashboard` del `--user`.
+    Home,
+    /// `get_cover` del `--mbid`.
+    Cover,
+    /// `get_lyrics` del `--mbid`.
+    Lyrics,
+    /// `reorder_playlist_songs` de `--playlist` con su orden actual.
+    Reorder,
+    /// `log_play` del `--mbid` con su título/artista, a nombre de un usuario
+    /// desechable que se borra al terminar.
+    Play,
+    /// `suggest_queries` con el `--query` (índice en memoria).
+    Suggest,
+}
+
+impl BenchOp {
+    pub fn label(self) -> &'static str {
+        match self {
+            BenchOp::Search => "search",
+            BenchOp::Home => "home",
+            BenchOp::Cover => "cover",
+            BenchOp::Lyrics => "lyrics",
+            BenchOp::Reorder => "reorder",
+            BenchOp::Play => "play",
+            BenchOp::Suggest => "suggest",
+        }
+    }
+}
+
+/// Parámetros de una corrida, ya validados por el comando.
+#[derive(Clone, Debug)]
+pub struct BenchSpec {
+    pub ops: Vec<BenchOp>,
+    pub iterations: u32,
+    pub concurrency: u32,
+    /// Llamadas previas descartadas (calientan pool, cachés y conexiones).
+    pub warmup: u32,
+    pub user_id: i64,
+    pub playlist: Option<String>,
+    pub mbid: Option<String>,
+    pub query: String,
+}
+
+// =========================================================================
+// CONTADORES DE PROCESO
+// =========================================================================
+static COUNTING: AtomicBool = AtomicBool::new(false);
+static ALLOCS: AtomicU64 = AtomicU64::new(0);
+static ALLOC_BYTES: AtomicU64 = AtomicU64::new(0);
+static DB_QUERIES: AtomicU64 = AtomicU64::new(0);
+
+thread_local! {
+    /// Hilo cuyas asignaciones nunca cuentan (el del stub de upstream).
+    static UNCOUNTED: Cell<bool> = const { Cell::new(false) };
+}
+
+/// Target con el que sqlx registra cada sentencia.
+const SQLX_QUERY_TARGET: &str = "sqlx::query";
+
+/// Asignador del binario: delega en `System` y, durante una medición, cuenta
+/// asignaciones (un `realloc` cuenta como una) y bytes pedidos.
+pub struct CountingAlloc;
+
+#[inline]
+fn count_alloc(bytes: usize) {
+    if COUNTING.load(Ordering::Relaxed) && !UNCOUNTED.try_with(Cell::get).unwrap_or(false) {
+        ALLOCS.fetch_add(1, Ordering::Relaxed);
+        ALLOC_BYTES.fetch_add(bytes as u64, Ordering::Relaxed);
+    }
+}
+
+// SAFETY: delega cada operación tal cual en `System`; solo añade contadores
+// atómicos y lee un thread-local `const` sin destructor, nada de lo cual asigna
+// memoria.
+unsafe impl GlobalAlloc for CountingAlloc {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        count_alloc(layout.size());
+        System.alloc(layout)
+    }
+
+    unsafe fn alloc_zeroed(&self, layout: Layout) -> *mut u8 {
+        count_alloc(layout.size());
+        System.alloc_zeroed(layout)
+    }
+
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        count_alloc(new_size);
+        System.realloc(ptr, layout, new_size)
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        System.dealloc(ptr, layout)
+    }
+}
+
+/// `Layer` que cuenta las sentencias de sqlx. Va con su propio filtro
+/// ([`query_counter_filter`]) para no depender del `RUST_LOG` del usuario.
+pub struct QueryCounter;
+
+impl<S: Subscriber> Layer<S> for QueryCounter {
+    fn on_event(&self, event: &Event<'_>, _ctx: Context<'_, S>) {
+        if event.metadata().target() == SQLX_QUERY_TARGET {
+            DB_QUERIES.fetch_add(1, Ordering::Relaxed);
+        }
+    }
+}
+
+/// Filtro por capa de [`QueryCounter`]: solo `sqlx::query`, a cualquier nivel
+/// (sqlx lo emite en DEBUG, o en WARN si la sentencia fue lenta).
+pub fn query_counter_filter() -> Targets {
+    Targets::new().with_target(SQLX_QUERY_TARGET, Level::TRACE)
+}
+
+/// Lectura puntual de los contadores; la diferencia entre dos lecturas es lo
+/// que consumió el lote medido entre ambas.
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct Counters {
+    pub allocs: u64,
+    pub alloc_bytes: u64,
+    pub db_queries: u64,
+}
+
+impl Counters {
+    pub fn read() -> Self {
+        Counters {
+            allocs: ALLOCS.load(Ordering::Relaxed),
+            alloc_bytes: ALLOC_BYTES.load(Ordering::Relaxed),
+            db_queries: DB_QUERIES.load(Ordering::Relaxed),
+        }
+    }
+
+    pub fn since(self, before: Counters) -> Counters {
+        Counters {
+            allocs: self.allocs.saturating_sub(before.allocs),
+            alloc_bytes: self.alloc_bytes.saturating_sub(before.alloc_bytes),
+            db_queries: self.db_queries.saturating_sub(before.db_queries),
+        }
+    }
+}
+
+/// Activa el conteo de asignaciones mientras vive; lo apaga al soltarse (también
+/// si el lote medido termina por error).
+pub struct AllocWindow(());
+
+impl AllocWindow {
+    pub fn open() -> Self {
+        COUNTING.store(true, Ordering::Relaxed);
+        AllocWindow(())
+    }
+}
+
+impl Drop for AllocWindow {
+    fn drop(&mut self) {
+        COUNTING.store(false, Ordering::Relaxed);
+    }
+}
+
+// =========================================================================
+// STUB DE UPSTREAM (proxy HTTP local)
+// =========================================================================
+/// Variables de proxy que respetan reqwest y curl-likes.
+const PROXY_VARS: [&str; 6] = [
+    "HTTP_PROXY",
+    "http_proxy",
+    "HTTPS_PROXY",
+    "https_proxy",
+    "ALL_PROXY",
+    "all_proxy",
+];
+/// Excepciones de proxy: se vacían para que NINGÚN host salga directo.
+const NO_PROXY_VARS: [&str; 2] = ["NO_PROXY", "no_proxy"];
+
+/// Tope de cabecera leída por petición (solo interesa la línea de petición).
+const MAX_HEAD: usize = 16 * 1024;
+
+/// MusicBrainz: un mismo cuerpo sirve a la búsqueda de grabaciones y artistas
+/// (`count`/`recordings`/`artists`) y al lookup de grabación con releases que
+/// usa `get_cover` (`releases`).
+const MB_BODY: &str = r#"{"count":1,"offset":0,
+"id":"00000000-0000-4000-8000-000000000001","title":"Bench Song","length":215000,
+"artist-credit":[{"name":"Tidol Bench","artist":{"id":"00000000-0000-4000-8000-000000000002","name":"Tidol Bench"}}],
+"recordings":[{"id":"00000000-0000-4000-8000-000000000001","title":"Bench Song","length":215000,
+  "artist-credit":[{"name":"Tidol Bench","artist":{"id":"00000000-0000-4000-8000-000000000002","name":"Tidol Bench"}}]}],
+"artists":[{"id":"00000000-0000-4000-8000-000000000002","name":"Tidol Bench"}],
+"releases":[{"id":"00000000-0000-4000-8000-000000000003","title":"Bench Album","status":"Official","date":"2020-01-01",
+  "artist-credit":[{"name":"Tidol Bench"}],
+  "release-group":{"id":"00000000-0000-4000-8000-000000000004","primary-type":"Album","secondary-types":[]}}]}"#;
+
+/// LRCLIB `/api/search`: una coincidencia con letra sincronizada.
+const LRCLIB_SEARCH_BODY: &str = r#"[{"id":1,"trackName":"Bench Song","artistName":"Tidol Bench",
+"albumName":"Bench Album","duration":215,"instrumental":false,
+"plainLyrics":"Primera línea\nSegunda línea",
+"syncedLyrics":"[00:01.00] Primera línea\n[00:05.50] Segunda línea"}]"#;
+
+/// iTunes `/search?entity=song`: portada del artista de la búsqueda.
+const ITUNES_BODY: &str = r#"{"resultCount":1,"results":[{"artistName":"Tidol Bench",
+"trackName":"Bench Song","artworkUrl100":"https://is1-ssl.mzstatic.com/image/thumb/bench/100x100bb.jpg"}]}"#;
+
+/// Portada enlatada: PNG de 8×8 (más de los 100 bytes que exige `get_cover`).
+const STUB_IMAGE: &[u8] = &[
+    0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a, 0x00, 0x00, 0x00, 0x0d, 0x49, 0x48, 0x44, 0x52,
+    0x00, 0x00, 0x00, 0x08, 0x00, 0x00, 0x00, 0x08, 0x08, 0x02, 0x00, 0x00, 0x00, 0x4b, 0x6d, 0x29,
+    0xdc, 0x00, 0x00, 0x00, 0x1f, 0x74, 0x45, 0x58, 0x74, 0x53, 0x6f, 0x66, 0x74, 0x77, 0x61, 0x72,
+    0x65, 0x00, 0x74, 0x69, 0x64, 0x6f, 0x6c, 0x2d, 0x73, 0x68, 0x65, 0x6c, 0x6c, 0x20, 0x62, 0x65,
+    0x6e, 0x63, 0x68, 0x20, 0x73, 0x74, 0x75, 0x62, 0x00, 0x1a, 0xf9, 0x62, 0x00, 0x00, 0x00, 0x11,
+    0x49, 0x44, 0x41, 0x54, 0x78, 0xda, 0x63, 0x88, 0xb2, 0xe9, 0xc1, 0x8a, 0x18, 0x86, 0x96, 0x04,
+    0x00, 0x47, 0xec, 0x48, 0x81, 0x62, 0xfc, 0x62, 0x61, 0x00, 0x00, 0x00, 0x00, 0x49, 0x45, 0x4e,
+    0x44, 0xae, 0x42, 0x60, 0x82,
+];
+
+/// Proxy local que sustituye a todos los upstreams (MusicBrainz, LRCLIB, CAA…)
+/// y cuenta las peticiones por host.
+pub struct StubUpstream {
+    addr: std::net::SocketAddr,
+    hits: Arc<Mutex<BTreeMap<String, u64>>>,
+    ca_file: PathBuf,
+}
+
+impl StubUpstream {
+    /// Abre el puerto (efímero, solo loopback), genera la CA efímera y atiende
+    /// en un hilo propio con su runtime: ni su CPU compite con el lote medido
+    /// en el runtime del shell ni sus asignaciones cuentan.
+    pub fn start() -> std::io::Result<Self> {
+        let std_listener = std::net::TcpListener::bind(("127.0.0.1", 0))?;
+        std_listener.set_nonblocking(true)?;
+        let addr = std_listener.local_addr()?;
+
+        let tls = Arc::new(StubTls::new().map_err(std::io::Error::other)?);
+        let ca_file =
+            std::env::temp_dir().join(format!("tidol-bench-ca-{}.pem", std::process::id()));
+        std::fs::write(&ca_file, tls.ca.to_pem().map_err(std::io::Error::other)?)?;
+
+        let rt = tokio::runtime::Builder::new_current_thread()
+            .enable_all()
+            .build()?;
+        let hits = Arc::new(Mutex::new(BTreeMap::new()));
+        let accept_hits = hits.clone();
+        std::thread::Builder::new()
+            .name("bench-stub".into())
+            .spawn(move || {
+                UNCOUNTED.with(|u| u.set(true));
+                rt.block_on(async move {
+                    let listener = match TcpListener::from_std(std_listener) {
+                        Ok(l) => l,
+                        Err(e) => {
+                            tracing::warn!("upstream stub: no se pudo escuchar: {e}");
+                            return;
+                        }
+                    };
+                    loop {
+                        match listener.accept().await {
+                            Ok((sock, _)) => {
+                                tokio::spawn(serve_stub(sock, accept_hits.clone(), tls.clone()));
+                            }
+                            // EMFILE y similares: no girar en caliente.
+                            Err(_) => {
+                                tokio::time::sleep(std::time::Duration::from_millis(10)).await
+                            }
+                        }
+                    }
+                });
+            })?;
+
+        Ok(StubUpstream {
+            addr,
+            hits,
+            ca_file,
+        })
+    }
+
+    /// Apunta las variables de proxy del proceso al stub y hace que TLS confíe
+    /// solo en su CA. Debe llamarse ANTES de construir el núcleo: los clientes
+    /// HTTP capturan proxy y raíces de confianza al crearse.
+    pub fn route_process_proxies(&self) {
+        let url = format!("http://{}", self.addr);
+        for var in PROXY_VARS {
+            std::env::set_var(var, &url);
+        }
+        for var in NO_PROXY_VARS {
+            std::env::remove_var(var);
+        }
+        std::env::set_var("SSL_CERT_FILE", &self.ca_file);
+        tracing::info!("upstream stub activo en {url}: toda salida HTTP queda en local");
+    }
+
+    #[cfg(test)]
+    fn addr(&self) -> std::net::SocketAddr {
+        self.addr
+    }
+
+    /// Devuelve las peticiones recibidas por host desde la última llamada y
+    /// reinicia el conteo.
+    pub fn take_hits(&self) -> BTreeMap<String, u64> {
+        std::mem::take(&mut *lock(&self.hits))
+    }
+}
+
+impl Drop for StubUpstream {
+    fn drop(&mut self) {
+        let _ = std::fs::remove_file(&self.ca_file);
+    }
+}
+
+/// CA efímera del stub y un aceptador TLS por host, emitido bajo demanda.
+struct StubTls {
+    ca: X509,
+    ca_key: PKey<Private>,
+    acceptors: Mutex<HashMap<String, tokio_native_tls::TlsAcceptor>>,
+}
+
+impl StubTls {
+    fn new() -> Result<Self, ErrorStack> {
+        let ca_key = new_key()?;
+        let ca = build_cert("tidol-shell bench stub CA", &ca_key, None)?;
+        Ok(StubTls {
+            ca,
+            ca_key,
+            acceptors: Mutex::new(HashMap::new()),
+        })
+    }
+
+    fn acceptor(&self, host: &str) -> Result<tokio_native_tls::TlsAcceptor, String> {
+        if let Some(acceptor) = lock(&self.acceptors).get(host) {
+            return Ok(acceptor.clone());
+        }
+        let key = new_key().map_err(|e| e.to_string())?;
+        let cert =
+            build_cert(host, &key, Some((&self.ca, &self.ca_key))).map_err(|e| e.to_string())?;
+        let cert_pem = cert.to_pem().map_err(|e| e.to_string())?;
+        let key_pem = key.private_key_to_pem_pkcs8().map_err(|e| e.to_string())?;
+        let identity =
+            native_tls::Identity::from_pkcs8(&cert_pem, &key_pem).map_err(|e| e.to_string())?;
+        let acceptor: tokio_native_tls::TlsAcceptor = native_tls::TlsAcceptor::new(identity)
+            .map_err(|e| e.to_string())?
+            .into();
+        lock(&self.acceptors).insert(host.to_string(), acceptor.clone());
+        Ok(acceptor)
+    }
+}
+
+fn new_key() -> Result<PKey<Private>, ErrorStack> {
+    let group = EcGroup::from_curve_name(Nid::X9_62_PRIME256V1)?;
+    PKey::from_ec_key(EcKey::generate(&group)?)
+}
+
+/// Certificado válido un día: la CA autofirmada (`issuer == None`) o uno de
+/// servidor para `cn` firmado por ella.
+fn build_cert(
+    cn: &str,
+    key: &PKey<Private>,
+    issuer: Option<(&X509, &PKey<Private>)>,
+) -> Result<X509, ErrorStack> {
+    let mut name = X509NameBuilder::new()?;
+    name.append_entry_by_nid(Nid::COMMONNAME, cn)?;
+    let name = name.build();
+
+    let mut builder = X509::builder()?;
+    builder.set_version(2)?;
+    let mut serial = BigNum::new()?;
+    serial.rand(127, MsbOption::MAYBE_ZERO, false)?;
+    builder.set_serial_number(&serial.to_asn1_integer()?)?;
+    builder.set_subject_name(&name)?;
+    builder.set_pubkey(key)?;
+    builder.set_not_before(&Asn1Time::days_from_now(0)?)?;
+    builder.set_not_after(&Asn1Time::days_from_now(1)?)?;
+    match issuer {
+        None => {
+            builder.set_issuer_name(&name)?;
+            builder.append_extension(BasicConstraints::new().critical().ca().build()?)?;
+            builder.append_extension(
+                KeyUsage::new()
+                    .critical()
+                    .key_cert_sign()
+                    .crl_sign()
+                    .build()?,
+            )?;
+            builder.sign(key, MessageDigest::sha256())?;
+        }
+        Some((ca, ca_key)) => {
+            builder.set_issuer_name(ca.subject_name())?;
+            let san = SubjectAlternativeName::new()
+                .dns(cn)
+                .build(&builder.x509v3_context(Some(ca), None))?;
+            builder.append_extension(san)?;
+            builder.sign(ca_key, MessageDigest::sha256())?;
+        }
+    }
+    Ok(builder.build())
+}
+
+/// Bloqueo tolerante a envenenamiento (mismo criterio que `logbuf`).
+fn lock<T>(m: &Mutex<T>) -> MutexGuard<'_, T> {
+    match m.lock() {
+        Ok(g) => g,
+        Err(poisoned) => poisoned.into_inner(),
+    }
+}
+
+/// Cabecera de una petición (hasta la línea en blanco o `MAX_HEAD`); `None`
+/// si el cliente cerró sin mandar nada.
+async fn read_head<S: AsyncRead + Unpin>(sock: &mut S) -> Option<String> {
+    let mut head = Vec::with_capacity(1024);
+    let mut chunk = [0u8; 1024];
+    while !head.windows(4).any(|w| w == b"\r\n\r\n") && head.len() < MAX_HEAD {
+        match sock.read(&mut chunk).await {
+            Ok(0) | Err(_) => break,
+            Ok(n) => head.extend_from_slice(&chunk[..n]),
+        }
+    }
+    (!head.is_empty()).then(|| String::from_utf8_lossy(&head).into_owned())
+}
+
+async fn serve_stub(
+    mut sock: TcpStream,
+    hits: Arc<Mutex<BTreeMap<String, u64>>>,
+    tls: Arc<StubTls>,
+) {
+    let head = read_head(&mut sock).await.unwrap_or_default();
+    let line = head.lines().next().unwrap_or("");
+    let host = target_host(line).unwrap_or_else(|| "(desconocido)".to_string());
+    *lock(&hits).entry(host.clone()).or_insert(0) += 1;
+
+    let is_connect = line
+        .split_whitespace()
+        .next()
+        .is_some_and(|m| m.eq_ignore_ascii_case("CONNECT"));
+    if !is_connect {
+        let _ = sock
+            .write_all(&canned_response(&host, request_path(line)))
+            .await;
+        let _ = sock.shutdown().await;
+        return;
+    }
+
+    // HTTPS: se abre el túnel y se termina TLS con un certificado de la CA del
+    // stub; la petición de dentro recibe la respuesta enlatada de su host.
+    let acceptor = match tls.acceptor(&host) {
+        Ok(a) => a,
+        Err(e) => {
+            tracing::warn!("upstream stub: sin certificado para {host}: {e}");
+            let _ = sock.write_all(BAD_GATEWAY).await;
+            return;
+        }
+    };
+    if sock
+        .write_all(b"HTTP/1.1 200 Connection established\r\n\r\n")
+        .await
+        .is_err()
+    {
+        return;
+    }
+    let Ok(mut tunnel) = acceptor.accept(sock).await else {
+        return;
+    };
+    let inner = read_head(&mut tunnel).await.unwrap_or_default();
+    let path = request_path(inner.lines().next().unwrap_or(""));
+    let _ = tunnel.write_all(&canned_response(&host, path)).await;
+    let _ = tunnel.shutdown().await;
+}
+
+/// Respuesta si no se puede atender un host.
+const BAD_GATEWAY: &[u8] =
+    b"HTTP/1.1 502 Bad Gateway\r\ncontent-length: 0\r\nconnection: close\r\n\r\n";
+
+/// Ruta de una línea de petición, tanto en forma de origen (`GET /a?b HTTP/1.1`,
+/// dentro del túnel) como absoluta (`GET http://host/a?b HTTP/1.1`).
+fn request_path(request_line: &str) -> &str {
+    let target = request_line.split_whitespace().nth(1).unwrap_or("/");
+    match target.split_once("://") {
+        Some((_, rest)) => rest.find(['/', '?']).map_or("/", |i| &rest[i..]),
+        None => target,
+    }
+}
+
+/// Respuesta enlatada de éxito por host; 404 para hosts sin ella.
+fn canned_response(host: &str, path: &str) -> Vec<u8> {
+    let (status, content_type, body): (&str, &str, &[u8]) = match host {
+        "musicbrainz.org" => ("200 OK", "application/json", MB_BODY.as_bytes()),
+        "lrclib.net" if path.starts_with("/api/search") => {
+            ("200 OK", "application/json", LRCLIB_SEARCH_BODY.as_bytes())
+        }
+        "itunes.apple.com" => ("200 OK", "application/json", ITUNES_BODY.as_bytes()),
+        "coverartarchive.org" => ("200 OK", "image/png", STUB_IMAGE),
+        h if h.ends_with(".mzstatic.com") => ("200 OK", "image/png", STUB_IMAGE),
+        _ => ("404 Not Found", "text/plain", b""),
+    };
+    let mut out = format!(
+        "HTTP/1.1 {status}\r\ncontent-type: {content_type}\r\ncontent-length: {}\r\nconnection: close\r\n\r\n",
+        body.len()
+    )
+    .into_bytes();
+    out.extend_from_slice(body);
+    out
+}
+
+/// Host destino de una línea de petición de proxy: `CONNECT host:443 HTTP/1.1`
+/// (HTTPS) o `GET http://host/ruta HTTP/1.1` (HTTP en forma absoluta).
+fn target_host(request_line: &str) -> Option<String> {
+    let mut parts = request_line.split_whitespace();
+    let method = parts.next()?;
+    let target = parts.next()?;
+    let authority = if method.eq_ignore_ascii_case("CONNECT") {
+        target
+    } else {
+        let (_, rest) = target.split_once("://")?;
+        rest.split(['/', '?']).next()?
+    };
+    let host = authority
+        .rsplit_once(':')
+        .map(|(h, _)| h)
+        .unwrap_or(authority);
+    (!host.is_empty()).then(|| host.to_ascii_lowercase())
+}
+
+// =========================================================================
+// RESULTADOS
+// =========================================================================
+/// Resultado de medir una operación.
+#[derive(Clone, Debug)]
+pub struct OpReport {
+    pub op: BenchOp,
+    pub calls: u64,
+    pub errors: u64,
+    /// Latencias en microsegundos, ordenadas.
+    pub latencies_us: Vec<u64>,
+    pub counters: Counters,
+    /// Salientes por host; `None` sin `--stub-upstream` (no se pueden contar).
+    pub outbound: Option<BTreeMap<String, u64>>,
+}
+
+/// Percentil por rango más cercano sobre una muestra ordenada (`0` si vacía).
+pub fn percentile(sorted: &[u64], p: f64) -> u64 {
+    if sorted.is_empty() {
+        return 0;
+    }
+    let rank = ((p / 100.0) * sorted.len() as f64).ceil() as usize;
+    sorted[rank.clamp(1, sorted.len()) - 1]
+}
+
+fn per_call(total: u64, calls: u64) -> f64 {
+    if calls == 0 {
+        0.0
+    } else {
+        // Dos decimales: suficiente para comparar builds sin ruido en el diff.
+        (total as f64 / calls as f64 * 100.0).round() / 100.0
+    }
+}
+
+/// Informe JSON estable (claves fijas, hosts ordenados) para diffear builds.
+pub fn report_json(spec: &BenchSpec, reports: &[OpReport]) -> serde_json::Value {
+    let ops: Vec<serde_json::Value> = reports
+        .iter()
+        .map(|r| {
+            let lat = &r.latencies_us;
+            let mean = if lat.is_empty() {
+                0
+            } else {
+                lat.iter().sum::<u64>() / lat.len() as u64
+            };
+            let (outbound_per_call, outbound_hosts) = match &r.outbound {
+                Some(hosts) => (
+                    serde_json::json!(per_call(hosts.values().sum(), r.calls)),
+                    serde_json::json!(hosts),
+                ),
+                None => (serde_json::Value::Null, serde_json::Value::Null),
+            };
+            serde_json::json!({
+                "op": r.op.label(),
+                "calls": r.calls,
+                "errors": r.errors,
+                "latency_us": {
+                    "p50": percentile(lat, 50.0),
+                    "p90": percentile(lat, 90.0),
+                    "p99": percentile(lat, 99.0),
+                    "max": lat.last().copied().unwrap_or(0),
+                    "mean": mean,
+                },
+                "allocs_per_call": per_call(r.counters.allocs, r.calls),
+                "alloc_bytes_per_call": per_call(r.counters.alloc_bytes, r.calls),
+                "db_queries_per_call": per_call(r.counters.db_queries, r.calls),
+                "outbound_per_call": outbound_per_call,
+                "outbound_hosts": outbound_hosts,
+            })
+        })
+        .collect();
+
+    serde_json::json!({
+        "version": env!("CARGO_PKG_VERSION"),
+        "upstream": if reports.iter().any(|r| r.outbound.is_some()) { "stub" } else { "live" },
+        "iterations": spec.iterations,
+        "concurrency": spec.concurrency,
+        "warmup": spec.warmup,
+        "ops": ops,
+    })
+}
+
+#[cfg(test)]
+#[allow(clippy::unwrap_used)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn percentil_por_rango_mas_cercano() {
+        let v: Vec<u64> = (1..=100).collect();
+        assert_eq!(percentile(&v, 50.0), 50);
+        assert_eq!(percentile(&v, 99.0), 99);
+        assert_eq!(percentile(&v, 100.0), 100);
+        assert_eq!(percentile(&[7], 99.0), 7);
+        assert_eq!(percentile(&[], 50.0), 0);
+    }
+
+    #[test]
+    fn host_de_connect_y_de_forma_absoluta() {
+        assert_eq!(
+            target_host("CONNECT musicbrainz.org:443 HTTP/1.1").as_deref(),
+            Some("musicbrainz.org")
+        );
+        assert_eq!(
+            target_host("GET http://LRCLIB.net:80/api/get?x=1 HTTP/1.1").as_deref(),
+            Some("lrclib.net")
+        );
+        assert_eq!(
+            target_host("GET http://example.com?q HTTP/1.1").as_deref(),
+            Some("example.com")
+        );
+        assert_eq!(target_host("GET /relativa HTTP/1.1"), None);
+        assert_eq!(target_host(""), None);
+    }
+
+    #[test]
+    fn contadores_restan_sin_desbordar() {
+        let a = Counters {
+            allocs: 10,
+            alloc_bytes: 100,
+            db_queries: 3,
+        };
+        let b = Counters {
+            allocs: 4,
+            alloc_bytes: 40,
+            db_queries: 1,
+        };
+        assert_eq!(
+            a.since(b),
+            Counters {
+                allocs: 6,
+                alloc_bytes: 60,
+                db_queries: 2
+            }
+        );
+        assert_eq!(b.since(a), Counters::default());
+    }
+
+    #[test]
+    fn informe_sin_stub_deja_salientes_en_null() {
+        let spec = BenchSpec {
+            ops: vec![BenchOp::Home],
+            iterations: 2,
+            concurrency: 1,
+            warmup: 0,
+            user_id: 1,
+            playlist: None,
+            mbid: None,
+            query: "x".into(),
+        };
+        let report = OpReport {
+            op: BenchOp::Home,
+            calls: 2,
+            errors: 0,
+            latencies_us: vec![10, 30],
+            counters: Counters {
+                allocs: 5,
+                alloc_bytes: 64,
+                db_queries: 4,
+            },
+            outbound: None,
+        };
+        let json = report_json(&spec, &[report]);
+        assert_eq!(json["upstream"], "live");
+        let op = &json["ops"][0];
+        assert_eq!(op["op"], "home");
+        assert_eq!(op["latency_us"]["p50"], 10);
+        assert_eq!(op["latency_us"]["max"], 30);
+        assert_eq!(op["db_queries_per_call"], 2.0);
+        assert_eq!(op["allocs_per_call"], 2.5);
+        assert!(op["outbound_per_call"].is_null());
+    }
+
+    #[test]
+    fn ruta_de_peticion_en_ambas_formas() {
+        assert_eq!(
+            request_path("GET /ws/2/recording?query=x HTTP/1.1"),
+            "/ws/2/recording?query=x"
+        );
+        assert_eq!(
+            request_path("GET http://lrclib.net/api/search?q=1 HTTP/1.1"),
+            "/api/search?q=1"
+        );
+        assert_eq!(request_path("GET http://example.com HTTP/1.1"), "/");
+        assert_eq!(request_path(""), "/");
+    }
+
+    #[test]
+    fn respuestas_enlatadas_por_host() {
+        for body in [MB_BODY, LRCLIB_SEARCH_BODY, ITUNES_BODY] {
+            serde_json::from_str::<serde_json::Value>(body).unwrap();
+        }
+        let mb = String::from_utf8(canned_response("musicbrainz.org", "/ws/2/recording")).unwrap();
+        assert!(mb.starts_with("HTTP/1.1 200 OK"));
+        assert!(mb.ends_with(MB_BODY));
+        let caa = canned_response("coverartarchive.org", "/release/x/front-500");
+        assert!(caa.ends_with(STUB_IMAGE));
+        assert!(STUB_IMAGE.len() > 100);
+        let otro = String::from_utf8(canned_response("example.com", "/")).unwrap();
+        assert!(otro.starts_with("HTTP/1.1 404"));
+    }
+
+    #[tokio::test]
+    async fn stub_cuenta_por_host_y_responde_en_http() {
+        let stub = StubUpstream::start().unwrap();
+        let mut sock = TcpStream::connect(stub.addr()).await.unwrap();
+        sock.write_all(
+            b"GET http://lrclib.net/api/search?q=x HTTP/1.1\r\nHost: lrclib.net\r\n\r\n",
+        )
+        .await
+        .unwrap();
+        let mut resp = String::new();
+        sock.read_to_string(&mut resp).await.unwrap();
+        assert!(resp.starts_with("HTTP/1.1 200 OK"));
+        assert!(resp.ends_with(LRCLIB_SEARCH_BODY));
+
+        let hits = stub.take_hits();
+        assert_eq!(hits.get("lrclib.net"), Some(&1));
+        assert!(stub.take_hits().is_empty());
+    }
+
+    #[tokio::test]
+    async fn stub_termina_tls_con_su_ca() {
+        let stub = StubUpstream::start().unwrap();
+        let ca = std::fs::read(&stub.ca_file).unwrap();
+        let connector = native_tls::TlsConnector::builder()
+            .disable_built_in_roots(true)
+            .add_root_certificate(native_tls::Certificate::from_pem(&ca).unwrap())
+            .build()
+            .unwrap();
+        let connector = tokio_native_tls::TlsConnector::from(connector);
+
+        let mut sock = TcpStream::connect(stub.addr()).await.unwrap();
+        sock.write_all(
+            b"CONNECT musicbrainz.org:443 HTTP/1.1\r\nHost: musicbrainz.org:443\r\n\r\n",
+        )
+        .await
+        .unwrap();
+        let established = read_head(&mut sock).await.unwrap();
+        assert!(established.starts_with("HTTP/1.1 200"));
+
+        let mut tls = connector.connect("musicbrainz.org", sock).await.unwrap();
+        tls.write_all(
+            b"GET /ws/2/recording?query=x&fmt=json HTTP/1.1\r\nHost: musicbrainz.org\r\n\r\n",
+        )
+        .await
+        .unwrap();
+        let mut resp = Vec::new();
+        tls.read_to_end(&mut resp).await.unwrap();
+        let resp = String::from_utf8(resp).unwrap();
+        assert!(resp.starts_with("HTTP/1.1 200 OK"));
+        assert!(resp.ends_with(MB_BODY));
+        assert_eq!(stub.take_hits().get("musicbrainz.org"), Some(&1));
+    }
+}
@@ -16,11 +16,16 @@
 use clap::{Parser, Subcommand};
 
 use crate::backend::{LocalAdmin, SearchResponse, TidolBackend};
+use crate::bench::{self, BenchOp, BenchSpec};
 use crate::error::{BackendError, BackendResult};
 use crate::logbuf::LogHandle;
 use crate::render::{self, cell, duration, opt, Output};
 
 const DEFAULT_LIMIT: u32 = 50;
+/// Topes del bench: evitan agotar el pool de BD o dejar el REPL minutos colgado
+/// por un cero de más.
+const BENCH_MAX_ITERATIONS: u32 = 100_000;
+const BENCH_MAX_CONCURRENCY: u32 = 256;
 
 // =========================================================================
 // GRAMMAR (clap)
@@ -97,6 +102,26 @@ pub enum Command {
         yes: bool,
     },
 
+    /// Mide operaciones del core en proceso; informe JSON (solo-local).
+    Bench {
+        #[arg(required = true, num_args = 1.., value_enum, value_name = "OP")]
+        ops: Vec<BenchOp>,
+        #[arg(long, value_name = "N", default_value_t = 100)]
+        iterations: u32,
+        #[arg(long, value_name = "N", default_value_t = 1)]
+        concurrency: u32,
+        #[arg(long, value_name = "N", default_value_t = 5)]
+        warmup: u32,
+        #[arg(long, value_name = "ID", default_value_t = 1)]
+        user: i64,
+        #[arg(long, value_name = "ID")]
+        playlist: Option<String>,
+        #[arg(long, value_name = "MBID")]
+        mbid: Option<String>,
+        #[arg(long, value_name = "QUERY", default_value = "radiohead")]
+        query: String,
+    },
+
     /// Ayuda general o de un comando concreto.
     Help { topic: Option<String> },
 
@@ -423,8 +448,8 @@ pub fn execute(cmd: Command, ctx: &mut ExecCtx) -> BackendResult<Output> {
             let p = std::path::PathBuf::from(&path);
             let s = ctx.rt.block_on(admin.import_path(&p))?;
             Ok(Output::Text(format!(
-                "import: {} escaneados, {} importados, {} omitidos",
-                s.scanned, s.imported, s.skipped
+                "import: {} escaneados, {} importados, {} sin cambios, {} duplicados, {} fallidos",
+                s.scanned, s.imported, s.skipped, s.duplicates, s.failed
             )))
         }
 
@@ -460,6 +485,49 @@ pub fn execute(cmd: Command, ctx: &mut ExecCtx) -> BackendResult<Output> {
             Ok(Output::Text(format!("migración '{name}' ejecutada")))
         }
 
+        Command::Bench {
+            ops,
+            iterations,
+            concurrency,
+            warmup,
+            user,
+            playlist,
+            mbid,
+            query,
+        } => {
+            let admin = ctx.require_admin()?;
+            if !(1..=BENCH_MAX_ITERATIONS).contains(&iterations) {
+                return Err(BackendError::Invalid(format!(
+                    "--iterations debe estar entre 1 y {BENCH_MAX_ITERATIONS}"
+                )));
+            }
+            if !(1..=BENCH_MAX_CONCURRENCY).contains(&concurrency) {
+                return Err(BackendError::Invalid(format!(
+                    "--concurrency debe estar entre 1 y {BENCH_MAX_CONCURRENCY}"
+                )));
+            }
+            let mut unique = Vec::with_capacity(ops.len());
+            for op in ops {
+                if !unique.contains(&op) {
+                    unique.push(op);
+                }
+            }
+            let spec = BenchSpec {
+                ops: unique,
+                iterations,
+                concurrency,
+                warmup: warmup.min(BENCH_MAX_ITERATIONS),
+                user_id: user,
+                playlist,
+                mbid,
+                query,
+            };
+            let reports = ctx.rt.block_on(admin.bench(&spec))?;
+            // `{:#}` = JSON con sangría; estable para diffear entre builds.
+            let json = bench::report_json(&spec, &reports);
+            Ok(Output::Text(format!("{json:#}")))
+        }
+
         Command::Help { topic } => Ok(Output::Text(help_text(topic.as_deref()))),
 
         // Interceptados por el loop; brazos defensivos.
@@ -522,6 +590,9 @@ Comandos disponibles (usa `<comando> --help` para el detalle):
     delete artist <id> [--cascade] [--yes]
     delete track <id> [--yes]
     migrate <nombre> [--yes]
+    bench <op...> [--iterations N] [--concurrency N] [--warmup N]
+          [--user ID] [--playlist ID] [--mbid MBID] [--query Q]
+          op: search | suggest | home | cover | lyrics | reorder | play
 
   Meta:
     help [comando]
@@ -670,6 +741,28 @@ mod tests {
         );
     }
 
+    #[test]
+    fn bench_ops_y_defaults() {
+        match cmd("bench search lyrics --mbid m-1 --concurrency 8") {
+            Command::Bench {
+                ops,
+                iterations,
+                concurrency,
+                mbid,
+                ..
+            } => {
+                assert_eq!(ops, vec![BenchOp::Search, BenchOp::Lyrics]);
+                assert_eq!(iterations, 100);
+                assert_eq!(concurrency, 8);
+                assert_eq!(mbid.as_deref(), Some("m-1"));
+            }
+            other => panic!("variante inesperada: {other:?}"),
+        }
+        // op desconocida o ninguna → error recuperable.
+        assert!(matches!(parse("bench wombat"), Parsed::Message(_)));
+        assert!(matches!(parse("bench"), Parsed::Message(_)));
+    }
+
     #[test]
     fn exit_y_quit() {
         assert!(cmd("exit").is_exit());
@@ -779,6 +872,16 @@ mod tests {
                 yes: false,
             },
             Command::Import { path: "/x".into() },
+            Command::Bench {
+                ops: vec![BenchOp::Home],
+                iterations: 1,
+                concurrency: 1,
+                warmup: 0,
+                user: 1,
+                playlist: None,
+                mbid: None,
+                query: "q".into(),
+            },
         ];
         for c in destructivos {
             let r = execute(c, &mut ctx);
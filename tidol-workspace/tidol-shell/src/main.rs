@@ -10,6 +10,7 @@
 #![cfg_attr(test, allow(clippy::unwrap_used))]
 
 mod backend;
+mod bench;
 mod commands;
 mod error;
 mod logbuf;
@@ -28,6 +29,10 @@ use backend::{LocalAdmin, TidolBackend};
 use logbuf::{BufferLayer, LogHandle};
 use repl::Repl;
 
+/// Asignador con contadores para `bench` (inerte fuera de una medición).
+#[global_allocator]
+static ALLOC: bench::CountingAlloc = bench::CountingAlloc;
+
 /// Servicio del keyring (agrupa las credenciales de tidol).
 const KEYRING_SERVICE: &str = "tidol";
 /// Cuenta del keyring por perfil: `<perfil>-token` (el default "prod" da
@@ -72,7 +77,7 @@ fn main() -> ExitCode {
 
     match cli.remote {
         Some(profile) => run_remote(&rt, logs, &profile),
-        None => run_local(&rt, logs),
+        None => run_local(&rt, logs, cli.stub_upstream),
     }
 }
 
@@ -89,6 +94,8 @@ USO:
   tidol-shell --remote [PERFIL] --store-token
                                    Guarda en el keyring el token leído de la env
                                    var TIDOL_PROD_TOKEN (no del prompt ni argv).
+  tidol-shell --stub-upstream      Modo LOCAL con todas las APIs externas
+                                   sustituidas por un stub local (para `bench`).
 
 ENTORNO:
   Local: DATABASE_URL (obligatoria) y las mismas vars que tidol-server (.env).
@@ -98,11 +105,13 @@ ENTORNO:
 struct Cli {
     remote: Option<String>,
     store_token: bool,
+    stub_upstream: bool,
 }
 
 fn parse_cli(args: &[String]) -> Result<Cli, String> {
     let mut remote = None;
     let mut store_token = false;
+    let mut stub_upstream = false;
     let mut it = args.iter().peekable();
     while let Some(a) = it.next() {
         match a.as_str() {
@@ -118,6 +127,7 @@ fn parse_cli(args: &[String]) -> Result<Cli, String> {
                 remote = Some(profile);
             }
             "--store-token" => store_token = true,
+            "--stub-upstream" => stub_upstream = true,
             other => {
                 return Err(format!("argumento desconocido: {other}\n\n{USAGE}"));
             }
@@ -126,9 +136,15 @@ fn parse_cli(args: &[String]) -> Result<Cli, String> {
     if store_token && remote.is_none() {
         remote = Some("prod".to_string());
     }
+    if stub_upstream && remote.is_some() {
+        return Err(format!(
+            "--stub-upstream solo aplica al modo local\n\n{USAGE}"
+        ));
+    }
     Ok(Cli {
         remote,
         store_token,
+        stub_upstream,
     })
 }
 
@@ -144,20 +160,37 @@ fn init_tracing(logs: LogHandle) {
     let fmt = tracing_subscriber::fmt::layer()
         .with_ansi(std::io::stderr().is_terminal())
         .with_writer(std::io::stderr);
-    // `try_init` evita el panic por doble inicialización.
+    // `try_init` evita el panic por doble inicialización. El filtro va por capa
+    // (no global) para que el contador de consultas de `bench` vea los eventos
+    // `sqlx::query` aunque `RUST_LOG` los oculte de la salida.
     let _ = tracing_subscriber::registry()
-        .with(filter)
-        .with(fmt)
-        .with(BufferLayer::new(logs))
+        .with(fmt.and_then(BufferLayer::new(logs)).with_filter(filter))
+        .with(bench::QueryCounter.with_filter(bench::query_counter_filter()))
         .try_init();
 }
 
 // -------------------------------------------------------------------------
 // MODO LOCAL
 // -------------------------------------------------------------------------
-fn run_local(rt: &tokio::runtime::Runtime, logs: LogHandle) -> ExitCode {
+fn run_local(rt: &tokio::runtime::Runtime, logs: LogHandle, stub_upstream: bool) -> ExitCode {
     dotenvy::dotenv().ok();
 
+    // Antes de construir el núcleo: sus clientes HTTP fijan el proxy al crearse.
+    let stub = if stub_upstream {
+        match bench::StubUpstream::start() {
+            Ok(s) => {
+                s.route_process_proxies();
+                Some(Arc::new(s))
+            }
+            Err(e) => {
+                eprintln!("no se pudo abrir el stub de upstream: {e}");
+                return ExitCode::FAILURE;
+            }
+        }
+    } else {
+        None
+    };
+
     let config = match core_config_from_env() {
         Ok(c) => c,
         Err(msg) => {
@@ -185,8 +218,11 @@ fn run_local(rt: &tokio::runtime::Runtime, logs: LogHandle) -> ExitCode {
         redacted.clone(),
         plugins_dir.clone(),
     ));
-    let admin: Box<dyn LocalAdmin> =
-        Box::new(LocalBackend::new(core, started, redacted, plugins_dir));
+    let mut admin_backend = LocalBackend::new(core, started, redacted, plugins_dir);
+    if let Some(stub) = stub {
+        admin_backend = admin_backend.with_stub_upstream(stub);
+    }
+    let admin: Box<dyn LocalAdmin> = Box::new(admin_backend);
 
     let mut repl = Repl::new_local(backend, admin, logs, rt.handle().clone());
     repl.run();
@@ -213,6 +249,20 @@ fn core_config_from_env() -> Result<CoreConfig, String> {
     Ok(CoreConfig {
         database_url,
         database_max_connections,
+        // Igual que el servidor: el shell local también puede leer de réplicas.
+        database_replica_urls: std::env::var("DATABASE_REPLICA_URLS")
+            .ok()
+            .map(|s| {
+                s.split(',')
+                    .map(|u| u.trim().to_string())
+                    .filter(|u| !u.is_empty())
+                    .collect()
+            })
+            .unwrap_or_default(),
+        replica_max_lag_secs: std::env::var("REPLICA_MAX_LAG_SECS")
+            .ok()
+            .and_then(|v| v.parse::<u64>().ok())
+            .unwrap_or(5),
         proxy_pool,
         plugins_dir,
         youtube_api_key: std::env::var("YOUTUBE_API_KEY").unwrap_or_default(),
@@ -220,6 +270,11 @@ fn core_config_from_env() -> Result<CoreConfig, String> {
         spotify_client_secret: std::env::var("SPOTIFY_CLIENT_SECRET").unwrap_or_default(),
         soundcloud_client_id: std::env::var("SOUNDCLOUD_CLIENT_ID").unwrap_or_default(),
         jwt_secret: std::env::var("JWT_SECRET").ok(),
+        // El shell no lanza el rastreador del espejo: eso es cosa del servidor.
+        cc_mirror_sync_hours: 0,
+        redis_url: None,
+        audio_cache_dir: std::env::var("AUDIO_CACHE_DIR")
+            .unwrap_or_else(|_| "storage/audio".to_string()),
     })
 }
 
@@ -406,6 +461,14 @@ mod tests {
         assert_eq!(cli.remote.as_deref(), Some("prod"));
     }
 
+    #[test]
+    fn parse_cli_stub_upstream_solo_local() {
+        let cli = parse_cli(&["--stub-upstream".into()]).unwrap();
+        assert!(cli.stub_upstream);
+        assert!(cli.remote.is_none());
+        assert!(parse_cli(&["--remote".into(), "--stub-upstream".into()]).is_err());
+    }
+
     #[test]
     fn parse_cli_desconocido_es_error() {
         assert!(parse_cli(&["--wat".into()]).is_err());
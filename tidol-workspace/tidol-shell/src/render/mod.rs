@@ -100,6 +100,25 @@ pub fn print_message(msg: &str) {
     println!("{}", msg.trim_end());
 }
 
+/// Línea de progreso en vivo (se reescribe con `\r`). Solo en terminal: al
+/// redirigir a fichero no ensucia la salida, que queda solo con el resultado.
+pub fn print_progress(line: &str) {
+    use std::io::Write;
+    if std::io::stdout().is_terminal() {
+        let mut out = std::io::stdout().lock();
+        let _ = write!(out, "\r\x1b[2K{}", dim(line));
+        let _ = out.flush();
+    }
+}
+
+/// Cierra una secuencia de `print_progress` para que el resultado empiece en
+/// una línea limpia.
+pub fn end_progress() {
+    if std::io::stdout().is_terminal() {
+        println!();
+    }
+}
+
 /// El "error" del usuario también es resultado → va a stdout (la spec reserva
 /// stderr para el logging interno de tracing).
 fn eprintln_stdout(s: &str) {